@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+One entry point for the demo tools, grouped by service:
+
+    python apecx.py transfer upload <client_id> <source:path> <dest:path>
+    python apecx.py search convert export.ris records.json --base-url https://...
+    python apecx.py flow monitor --tag apecx
+    python apecx.py                     # List every command
+    python apecx.py flow                # List the flow commands
+
+Each command runs one of the demo scripts, with the same arguments (and `--help`) as running that script directly.
+
+This file imports only the standard library, and locates scripts without importing them. A command loads only the
+    modules its own script needs: local steps such as `search convert`, `transfer manifest` or `portal index` never
+    import the Globus SDK, so a cron job that runs them starts in tens of milliseconds rather than a few hundred. The
+    commands that do call a service parse their arguments before loading the SDK, so `--help` (or a usage error) is
+    just as quick.
+
+To see where a command's startup time goes, put `--import-times` before it. The command runs normally (in a child
+    process), then the slowest imports are summarized:
+
+    python apecx.py --import-times flow launch --help
+"""
+import os
+import runpy
+import subprocess
+import sys
+import time
+
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# group -> command -> (script path relative to ROOT, one line summary). Commands marked "local" never call a service.
+COMMANDS = {
+    'transfer': {
+        'upload': ('transfer-data/scripts/transfer-filter-upload.py', 'Copy a folder between collections, with filters'),
+        'view': ('transfer-data/scripts/transfer-filter-on-view.py', 'List a remote folder, with filters'),
+        'timer': ('transfer-data/scripts/create_backup_timer.py', 'Schedule a recurring backup transfer'),
+        'download': ('transfer-data/scripts/download_via_https.py', 'Download a file from a collection via HTTPS'),
+        'manifest': ('transfer-data/scripts/make_manifest.py', 'Checksum a staging folder for the validator (local)'),
+    },
+    'search': {
+        'convert': ('search/scripts/ris-to-globus.py', 'Convert an RIS export into search ingest records (local)'),
+        'query': ('search/scripts/sdk-search-example.py', 'Compare public and authenticated queries of an index'),
+    },
+    'portal': {
+        'previews': ('portals-example/scripts/make_previews.py', 'Build thumbnails and previews for portal records'),
+        'index': ('portals-example/scripts/build_static_index.py', 'Build a static, sharded search index (local)'),
+    },
+    'flow': {
+        'deploy': ('flows-compute/flow/make_flow.py', 'Register the example flow and its compute functions, and run it'),
+        'launch': ('flows-compute/flow/launch_batch.py', 'Start one flow run per input, for a large backlog'),
+        'monitor': ('flows-compute/flow/monitor.py', 'Watch many flow runs, and report status changes'),
+        'profile': ('flows-compute/flow/profile_runs.py', 'Find where the time goes in flow runs'),
+        'validate': ('flows-compute/flow/validate_batch.py', 'Run the validation function over many folders directly'),
+        'local': ('flows-compute/flow/local_engine.py', 'Run a flow definition locally, without any services (local)'),
+    },
+}
+
+PROG = os.path.basename(__file__)
+
+
+def usage(group: str = None) -> str:
+    groups = [group] if group else list(COMMANDS)
+    lines = [f'usage: {PROG} [--import-times] {group or "<group>"} <command> [arguments...]', '']
+    for g in groups:
+        lines.append(f'{g}:')
+        for name, (_, summary) in COMMANDS[g].items():
+            lines.append(f'  {name:<10} {summary}')
+        lines.append('')
+    lines.append(f'Run `{PROG} <group> <command> --help` for the arguments of each command.')
+    return '\n'.join(lines)
+
+
+def script_path(group: str, command: str) -> str:
+    return os.path.join(ROOT, COMMANDS[group][command][0])
+
+
+def run(group: str, command: str, argv: list[str]):
+    """Run one command in this process, exactly as if its script had been run directly"""
+    script = script_path(group, command)
+    sys.argv = [script, *argv]
+    # The scripts import their neighbours (eg `from common import ...`), as they would when run directly
+    sys.path.insert(0, os.path.dirname(script))
+    runpy.run_path(script, run_name='__main__')
+
+
+def import_times(argv: list[str], quiet: bool = True) -> (float, int, dict[str, float]):
+    """
+    Run `apecx.py <argv>` in a child process with `python -X importtime`, and measure where its startup time goes
+
+    Returns (wall-clock seconds, exit code, {top level package: cumulative import seconds}). Packages that are
+        imported lazily (eg `globus_sdk` clients, on first use) are counted too. Unless `quiet`, the command's own
+        output is passed through.
+    """
+    cmd = [sys.executable, '-X', 'importtime', os.path.abspath(__file__), *argv]
+    start = time.perf_counter()
+    proc = subprocess.run(cmd, stdout=subprocess.DEVNULL if quiet else None, stderr=subprocess.PIPE, text=True)
+    elapsed = time.perf_counter() - start
+
+    packages = {}
+    for line in proc.stderr.splitlines():
+        # import time:       self [us] |  cumulative | imported package
+        if not line.startswith('import time:'):
+            if not quiet:
+                print(line, file=sys.stderr)
+            continue
+        if 'imported package' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nested imports are indented, and already counted in their parent's cumulative time
+        if name[1:2] == ' ':
+            continue
+        package = name.strip().split('.')[0]
+        packages[package] = packages.get(package, 0.0) + int(cumulative) / 1e6
+    return elapsed, proc.returncode, packages
+
+
+def report_import_times(argv: list[str], top: int = 10):
+    elapsed, returncode, packages = import_times(argv, quiet=False)
+    total = sum(packages.values())
+    print(f'\n{PROG} {" ".join(argv)}: {elapsed * 1000:.0f} ms wall clock, {total * 1000:.0f} ms importing', file=sys.stderr)
+    for package, seconds in sorted(packages.items(), key=lambda kv: -kv[1])[:top]:
+        print(f'  {seconds * 1000:>8.1f} ms  {package}', file=sys.stderr)
+    return returncode
+
+
+def main(argv: list[str]) -> int:
+    profile = '--import-times' in argv[:1]
+    if profile:
+        argv = argv[1:]
+
+    if not argv or argv[0] in ('-h', '--help'):
+        print(usage())
+        return 0
+    group, *rest = argv
+    if group not in COMMANDS:
+        print(usage(), file=sys.stderr)
+        print(f'\n{PROG}: unknown group "{group}"', file=sys.stderr)
+        return 2
+    if not rest or rest[0] in ('-h', '--help'):
+        print(usage(group))
+        return 0
+    command, *rest = rest
+    if command not in COMMANDS[group]:
+        print(usage(group), file=sys.stderr)
+        print(f'\n{PROG}: unknown {group} command "{command}"', file=sys.stderr)
+        return 2
+
+    if profile:
+        return report_import_times([group, command, *rest])
+    run(group, command, rest)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
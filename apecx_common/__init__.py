@@ -0,0 +1,10 @@
+"""
+Helpers shared by the transfer, search, and flows demos
+
+The demo folders are meant to be read (and copied) independently, so they don't depend on each other. The few pieces
+    of plumbing that every demo needs once it grows past "one call at a time" live here instead. Scripts add the
+    repository root to `sys.path` so that this package can be imported without installing anything:
+
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+    from apecx_common import aio
+"""
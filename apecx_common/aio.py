@@ -0,0 +1,185 @@
+"""
+Make independent Globus API calls at the same time, from asyncio code
+
+The Globus SDK is synchronous: each call blocks until the service responds. Most demo scripts make a few calls that
+    don't depend on each other (eg "is the source a mapped collection?" and "is the destination a mapped collection?"),
+    and bulk tools make thousands. Running them one after another means waiting for every round trip in turn.
+
+This module provides an async view of any SDK client:
+
+    transfer = aio.AsyncClient(TransferClient(app=app))
+    source, dest = await asyncio.gather(transfer.get_endpoint(s_coll), transfer.get_endpoint(d_coll))
+
+* Every wrapped client sends its requests through one shared `requests.Session`, so connections (and TLS handshakes)
+    to each Globus service are reused across clients and calls, up to `max_connections` per host
+* Every wrapped client is paced by the shared per-service rate limits in `scheduler`
+* Calls run on one shared, fixed-size thread pool. A bulk tool can have hundreds of calls in flight; they wait their
+    turn for a connection instead of each getting its own thread.
+* `gather` and `map_concurrent` bound how many calls from one batch are outstanding, so a huge batch doesn't queue
+    everything at once
+
+Log in before starting concurrent calls (see `ensure_login`). Otherwise, each call that finds no tokens will start
+    its own login prompt.
+"""
+import asyncio
+import contextvars
+import functools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import typing as t
+
+from . import scheduler, tracing
+
+if t.TYPE_CHECKING:
+    import requests
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONNECTIONS = 32
+
+_lock = threading.Lock()
+_max_connections = DEFAULT_MAX_CONNECTIONS
+_session = None
+_executor = None
+
+
+def configure(max_connections: int = DEFAULT_MAX_CONNECTIONS):
+    """Set the size of the shared connection pool and thread pool. Must be called before the first request."""
+    global _max_connections
+    with _lock:
+        if _session is not None or _executor is not None:
+            raise RuntimeError('The shared connection pool is already in use; call configure() earlier')
+        _max_connections = max_connections
+
+
+def shared_session() -> 'requests.Session':
+    """The HTTP session (and connection pool) shared by every client passed to `share_connections`"""
+    # Imported on first use, so that scripts can import this module before parsing arguments without loading `requests`
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    global _session
+    with _lock:
+        if _session is None:
+            _session = requests.Session()
+            # One pool per host; each pool keeps up to `_max_connections` open connections for reuse
+            adapter = HTTPAdapter(pool_connections=16, pool_maxsize=_max_connections)
+            _session.mount('https://', adapter)
+            _session.mount('http://', adapter)
+        return _session
+
+
+def shared_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            # No point in more threads than connections: extra threads would only wait for a free connection
+            _executor = ThreadPoolExecutor(max_workers=_max_connections, thread_name_prefix='globus-aio')
+        return _executor
+
+
+def share_connections(client):
+    """
+    Send this SDK client's requests through the shared connection pool, and the shared rate limits of
+        `scheduler.install`. Returns the client, for chaining.
+    """
+    transport = getattr(scheduler.install(client), 'transport', None)
+    if transport is None:
+        # Not a globus_sdk client (eg the compute client, which wraps its own): leave its connections alone
+        logger.debug(f'{type(client).__name__} has no SDK transport; it will keep its own connections')
+        return client
+    transport.session = shared_session()
+    return client
+
+
+def ensure_login(app):
+    """Log in (if needed) before making concurrent calls, so that the user sees one prompt rather than several"""
+    if app.login_required():
+        with tracing.span('login'):
+            app.login()
+
+
+async def run(func, *args, **kwargs):
+    """Run any blocking function on the shared thread pool, and await the result"""
+    loop = asyncio.get_running_loop()
+    # Like `asyncio.to_thread`, carry context variables (eg the current tracing span) over to the worker thread
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(shared_executor(), functools.partial(context.run, func, *args, **kwargs))
+
+
+class AsyncClient:
+    """
+    Async view of an SDK client: every method call returns an awaitable instead of blocking
+
+    The wrapped client is still available as `.client`, eg for helper functions that expect a regular SDK client.
+    """
+    def __init__(self, client, share_pool: bool = True):
+        self.client = share_connections(client) if share_pool else client
+
+    def __getattr__(self, name: str):
+        attr = getattr(self.client, name)
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        async def call(*args, **kwargs):
+            return await run(attr, *args, **kwargs)
+        return call
+
+
+async def gather(*aws, limit: int = None, return_exceptions: bool = False) -> list:
+    """Like `asyncio.gather`, but with at most `limit` of the awaitables running at once"""
+    if not limit:
+        return await asyncio.gather(*aws, return_exceptions=return_exceptions)
+
+    slots = asyncio.Semaphore(limit)
+
+    async def bounded(aw):
+        async with slots:
+            return await aw
+
+    return await asyncio.gather(*[bounded(aw) for aw in aws], return_exceptions=return_exceptions)
+
+
+async def map_concurrent(func, items, limit: int = DEFAULT_MAX_CONNECTIONS):
+    """
+    Call a blocking `func(item)` for every item, with at most `limit` calls outstanding at once
+
+    Yields (item, result or exception) pairs as each call finishes, in completion order. Items are read lazily, so
+        `items` may be a generator over millions of entries.
+    """
+    items = iter(items)
+    pending = {}
+
+    def refill():
+        for item in items:
+            task = asyncio.ensure_future(run(func, item))
+            pending[task] = item
+            if len(pending) >= limit:
+                return
+
+    refill()
+    while pending:
+        done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            item = pending.pop(task)
+            error = task.exception()
+            yield item, error if error is not None else task.result()
+        refill()
+
+
+def run_concurrently(*calls) -> list:
+    """
+    For synchronous scripts: run several independent zero-argument callables at once, and return their results in
+        order. The first exception (if any) is raised after every call finishes.
+    """
+    async def main():
+        return await asyncio.gather(*[run(call) for call in calls], return_exceptions=True)
+
+    results = asyncio.run(main())
+    for r in results:
+        if isinstance(r, BaseException):
+            raise r
+    return results
@@ -0,0 +1,35 @@
+"""
+Command line argument validators shared by the demo scripts
+
+Only the standard library is imported here, so that a script can build its parser (and answer `--help`) before
+    loading any Globus SDK modules.
+"""
+
+
+def str_ne(value):
+    """Validator rejects empty strings"""
+    if not value:
+        raise ValueError("Must not be an empty string")
+    return value
+
+
+def parse_target(location: str) -> (str, str):
+    """
+    Allow CLI-friendly `source:path` syntax for copies. Path is required.
+    """
+    loc = location.split(':')
+    if len(loc) != 2:
+        # Mapped collections present the path on the filesystem, rather than just the directories a user can see
+        # We want to be careful to avoid requesting a transfer of "way too much" by accident, so user must always specify path
+        raise ValueError("Must specify `source:path`")
+
+    coll, path = loc
+    return coll, path
+
+
+def parse_optional_target(location: str) -> (str, str):
+    """Allow CLI-friendly `source[:path]` syntax for read-only operations, where path is optional (default `/`)"""
+    loc = location.split(':')
+    coll = loc[0]
+    path = loc[1] if len(loc) > 1 else '/'
+    return coll, path
@@ -0,0 +1,245 @@
+"""
+Pace every Globus API call made by this process, per service, and back off together when a service pushes back
+
+Globus services answer "too many requests" with HTTP 429 (or 503 while overloaded), usually with a `Retry-After`
+    header. The SDK retries a few times on its own, but each client does so independently: twenty threads polling
+    Transfer will all retry at once, and all be throttled again. Clients installed with this scheduler instead share,
+    per service (transfer, search, flows, auth, ...):
+
+* A token bucket: on average `rate` calls per second, in bursts of up to `burst`
+* A concurrency limit: at most `max_concurrent` calls in flight at once
+* A pause: when any call is throttled, *every* call to that service waits out the `Retry-After` period (or a jittered
+    exponential backoff, if the service didn't say how long), instead of only the call that was throttled
+* Counters of calls, throttled responses, retries, and time spent waiting, so batch tools can tune their parallelism
+
+Usage:
+    client = scheduler.install(TransferClient(app=app))
+    ...
+    print(scheduler.format_stats())
+
+The default limits are conservative values for demos, not published service limits. Tune them for your workload with
+    `scheduler.configure('transfer', rate=..., max_concurrent=...)`.
+"""
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+import logging
+import os
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+
+logger = logging.getLogger(__name__)
+
+# {service: (calls per second, burst, max concurrent calls)}
+DEFAULT_LIMITS = {
+    'transfer': (10, 20, 8),
+    'search': (20, 40, 16),
+    'flows': (5, 10, 8),
+    'auth': (10, 20, 8),
+    'compute': (10, 20, 8),
+    'timer': (5, 10, 4),
+}
+FALLBACK_LIMITS = (10, 20, 8)
+
+# Statuses that mean "slow down", as opposed to "something is broken"
+THROTTLE_STATUSES = {429, 503}
+
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 60.0
+
+# Set this to a file name to record every API response to it, for replay by the stand-in service (see `standin`)
+RECORD_ENV = 'APECX_RECORD'
+
+
+def service_name(url: str) -> str:
+    """
+    `https://transfer.api.globus.org/v0.10/...` -> `transfer`. Other hosts (eg HTTPS collections) use the hostname,
+        except for the local stand-in service (see `standin`), which serves each service under `/<service>/...`.
+    """
+    parsed = urlparse(url)
+    host = parsed.hostname or ''
+    if host.endswith('.globus.org'):
+        return host.split('.')[0]
+    prefix = parsed.path.lstrip('/').split('/')[0]
+    if prefix in DEFAULT_LIMITS:
+        return prefix
+    return host
+
+
+def parse_retry_after(value: str) -> float:
+    """Seconds to wait, from a `Retry-After` header (either a number of seconds or an HTTP date)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def response_attributes(resp, streamed: bool = False) -> dict:
+    """Status and sizes of one HTTP exchange, for tracing spans"""
+    body = resp.request.body if resp.request is not None else None
+    if streamed:
+        # Reading the body here would consume it before the caller can
+        response_size = int(resp.headers.get('Content-Length', -1))
+    else:
+        response_size = len(resp.content)
+    return {
+        'http.status_code': resp.status_code,
+        'http.request.body.size': len(body) if body else 0,
+        'http.response.body.size': response_size,
+    }
+
+
+def backoff_delay(attempt: int, base: float = BACKOFF_BASE, cap: float = BACKOFF_CAP) -> float:
+    """Exponential backoff with "full jitter": callers that failed together spread out instead of retrying in lockstep"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class ServiceLimiter:
+    """Rate limit, concurrency limit, shared pause, and counters for one service"""
+    def __init__(self, name: str, rate: float, burst: int, max_concurrent: int):
+        self.name = name
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.slots = threading.BoundedSemaphore(max_concurrent)
+        self.max_concurrent = max_concurrent
+        self.lock = threading.Lock()
+        self.counts = {'calls': 0, 'throttled': 0, 'retried': 0, 'wait_s': 0.0}
+
+    def acquire_token(self):
+        """Block until this service is not paused and a token is available"""
+        start = time.monotonic()
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    self.counts['calls'] += 1
+                    self.counts['wait_s'] += now - start
+                    return
+                wait = max(self.paused_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(wait)
+
+    def pause(self, seconds: float):
+        """Hold back every call to this service for a while. Pauses only ever get longer, never shorter."""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            # Don't let a burst of saved-up tokens hit the service the moment the pause ends
+            self.tokens = min(self.tokens, 1.0)
+
+    def count(self, key: str):
+        with self.lock:
+            self.counts[key] += 1
+
+
+class Scheduler:
+    """Per-service limiters for the whole process. Most code should use the module-level functions instead."""
+    def __init__(self, limits: dict = None):
+        self.limits = dict(DEFAULT_LIMITS, **(limits or {}))
+        self.services = {}
+        self.lock = threading.Lock()
+
+    def configure(self, service: str, rate: float = None, burst: int = None, max_concurrent: int = None):
+        """Change the limits for one service. Must be called before that service is first used."""
+        with self.lock:
+            if service in self.services:
+                raise RuntimeError(f'Service "{service}" is already in use; configure it before making calls')
+            default_rate, default_burst, default_concurrent = self.limits.get(service, FALLBACK_LIMITS)
+            self.limits[service] = (
+                rate or default_rate,
+                burst or default_burst,
+                max_concurrent or default_concurrent,
+            )
+
+    def get(self, service: str) -> ServiceLimiter:
+        with self.lock:
+            if service not in self.services:
+                self.services[service] = ServiceLimiter(service, *self.limits.get(service, FALLBACK_LIMITS))
+            return self.services[service]
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {name: dict(limiter.counts) for name, limiter in self.services.items()}
+
+
+_scheduler = Scheduler()
+# Called with the final response of every scheduled call
+_response_hooks = []
+_checked_record_env = False
+
+
+def add_response_hook(func):
+    _response_hooks.append(func)
+
+
+def observe(resp):
+    """
+    Pass a response that didn't come through an installed client (eg a plain `requests` download from an HTTPS
+        collection) to the response hooks, so that it is recorded like every other call
+    """
+    _record_from_env()
+    for hook in _response_hooks:
+        hook(resp)
+
+
+def configure(service: str, rate: float = None, burst: int = None, max_concurrent: int = None):
+    _scheduler.configure(service, rate=rate, burst=burst, max_concurrent=max_concurrent)
+
+
+def install(client):
+    """Route an SDK client's calls through the shared scheduler. Returns the client, for chaining."""
+    old = getattr(client, 'transport', None)
+    if old is None:
+        # Not a globus_sdk client (eg the compute client, which wraps its own)
+        logger.debug(f'{type(client).__name__} has no SDK transport; its calls are not scheduled')
+        return client
+    # Kept in its own module, so that importing this one (eg for `ServiceLimiter`) doesn't load the SDK's HTTP stack
+    from .transport import ScheduledTransport
+    if isinstance(old, ScheduledTransport):
+        return client
+    _record_from_env()
+
+    transport = ScheduledTransport(_scheduler, verify_ssl=old.verify_ssl, http_timeout=old.http_timeout)
+    # Keep the connection pool, user agent, and client info that the client already set up
+    transport.session = old.session
+    transport._user_agent = old._user_agent
+    transport.globus_client_info = old.globus_client_info
+    client.transport = transport
+    return client
+
+
+def _record_from_env():
+    global _checked_record_env
+    if _checked_record_env:
+        return
+    _checked_record_env = True
+    fn = os.environ.get(RECORD_ENV)
+    if fn:
+        from .standin import Recorder
+        logger.info(f'Recording API responses to {fn}')
+        add_response_hook(Recorder(fn))
+
+
+def stats() -> dict:
+    """Counters for each service used so far: {service: {calls, throttled, retried, wait_s}}"""
+    return _scheduler.stats()
+
+
+def format_stats() -> str:
+    lines = [f"{'Service':<12} {'calls':>7} {'throttled':>9} {'retried':>7} {'waited s':>9}"]
+    for name, c in sorted(stats().items()):
+        lines.append(f"{name:<12} {c['calls']:>7} {c['throttled']:>9} {c['retried']:>7} {c['wait_s']:>9.1f}")
+    return '\n'.join(lines)
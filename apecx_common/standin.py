@@ -0,0 +1,599 @@
+"""
+A local, offline stand-in for the Globus services used by the demos, for benchmarks and experiments
+
+Performance work on the demo scripts can't be measured against live services: results depend on the network, other
+    users, and rate limits, and a benchmark of a million files would create a million real things. This module runs a
+    small HTTP server that answers like Transfer, Search, Flows, and an HTTPS collection would, with:
+
+* Synthetic responses, generated on demand, so that listings of 10^6 files or ingests of 10^6 records don't need to
+    exist in memory or on disk
+* Replay of recorded responses. Run any script with `APECX_RECORD=cassette.jsonl` set to record the real responses
+    it gets (see `scheduler.RECORD_ENV`), then start the stand-in with `--replay cassette.jsonl`. Requests that match
+    a recording get the recorded answer (in order, repeating the last one); everything else is synthetic. Downloads
+    from an HTTPS collection are recorded by file path, status, and size rather than contents: replay answers with
+    the recorded status and a file of the recorded size, filled with synthetic bytes.
+* Injected latency (per request, with jitter), bandwidth limits (for every response body), and errors (a fraction of
+    requests get a 503 or 429 with a `Retry-After` header)
+
+Each service is served under its own prefix (`/transfer/`, `/search/`, `/flows/`, `/https/<collection>/`). Point the
+    SDK at it with the environment variables from `service_urls()`, eg:
+
+    python -m apecx_common.standin --port 8765 --latency 0.05 --error-rate 0.01
+    export GLOBUS_SDK_SERVICE_URL_TRANSFER=http://127.0.0.1:8765/transfer/   (and so on; see the startup output)
+
+No authentication is needed or checked: use clients without an app, eg `TransferClient()`.
+"""
+import argparse
+import bisect
+from dataclasses import dataclass
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+import uuid
+
+
+SERVICES = ['transfer', 'search', 'flows']
+
+
+@dataclass
+class StandInConfig:
+    latency: float = 0.0  # Seconds added to every response
+    jitter: float = 0.0  # Up to this many extra seconds, at random
+    bandwidth: float = 0.0  # Bytes per second for each response body; 0 is unlimited
+    error_rate: float = 0.0  # Fraction of requests that fail with `error_status`
+    error_status: int = 503
+    retry_after: int = 0  # Seconds, sent with injected errors
+    file_size: int = 1024 * 1024  # Size of every file served by the HTTPS collection
+    listing_size: int = 1000  # Number of files in every folder listed via Transfer `ls`
+    task_duration: float = 1.0  # Seconds until a transfer task succeeds
+    run_duration: float = 2.0  # Seconds until a flow run succeeds
+    seed: int = 0
+
+
+#######################
+# Record / replay
+def _request_key(method: str, service: str, path: str, query: dict) -> str:
+    return f"{method} {service} {path} {json.dumps(query, sort_keys=True)}"
+
+
+def collection_file_path(url: str) -> str:
+    """
+    The file path of a download from an HTTPS collection (`https://g-XXXX.data.globus.org/a/b.dat` -> `/a/b.dat`, and
+        the same from the stand-in's `/https/<collection>/a/b.dat`), or None for any other URL
+    """
+    parsed = urlparse(url)
+    if (parsed.hostname or '').endswith('.data.globus.org'):
+        return parsed.path or '/'
+    service, _, rest = parsed.path.lstrip('/').partition('/')
+    if service == 'https':
+        _, _, file_path = rest.partition('/')
+        return '/' + file_path
+    return None
+
+
+class Recorder:
+    """A `scheduler` response hook that appends each response to a JSON lines "cassette" file"""
+    def __init__(self, fn: str):
+        self.lock = threading.Lock()
+        self.f = open(fn, 'a', buffering=1)
+
+    def __call__(self, resp):
+        from .scheduler import service_name
+
+        url = urlparse(resp.request.url)
+        file_path = collection_file_path(resp.request.url)
+        if file_path is not None:
+            # A file download, usually streamed: reading the body here would consume it before the caller can, and
+            #   would put whole files in the cassette. The size is enough to replay it.
+            entry = {
+                'method': resp.request.method,
+                'service': 'https',
+                'path': file_path,
+                'query': dict(parse_qsl(url.query)),
+                'status': resp.status_code,
+                'content_type': resp.headers.get('Content-Type', 'application/octet-stream'),
+                'size': int(resp.headers.get('Content-Length', -1)),
+            }
+            with self.lock:
+                self.f.write(json.dumps(entry) + '\n')
+            return
+
+        service = service_name(resp.request.url)
+        path = url.path
+        if not (url.hostname or '').endswith('.globus.org') and path.lstrip('/').startswith(service + '/'):
+            # Recorded from a stand-in: store the path as the real service would see it
+            path = path.lstrip('/')[len(service):]
+        entry = {
+            'method': resp.request.method,
+            'service': service,
+            'path': path,
+            'query': dict(parse_qsl(url.query)),
+            'status': resp.status_code,
+            'content_type': resp.headers.get('Content-Type', 'application/json'),
+            'body': resp.text,
+        }
+        with self.lock:
+            self.f.write(json.dumps(entry) + '\n')
+
+
+class Cassette:
+    """Recorded responses, looked up by exact request (method, path, and query), then by method and path only"""
+    def __init__(self, fn: str = None):
+        self.exact = {}
+        self.by_path = {}
+        self.cursors = {}
+        self.lock = threading.Lock()
+        if fn:
+            with open(fn, 'r') as f:
+                for line in f:
+                    if line.strip():
+                        self.add(json.loads(line))
+
+    def add(self, entry: dict):
+        key = _request_key(entry['method'], entry['service'], entry['path'], entry.get('query', {}))
+        self.exact.setdefault(key, []).append(entry)
+        self.by_path.setdefault(_request_key(entry['method'], entry['service'], entry['path'], {}), []).append(entry)
+
+    def match(self, method: str, service: str, path: str, query: dict) -> dict:
+        for key, table in (
+            (_request_key(method, service, path, query), self.exact),
+            (_request_key(method, service, path, {}), self.by_path),
+        ):
+            entries = table.get(key)
+            if entries:
+                with self.lock:
+                    i = self.cursors.get(key, 0)
+                    self.cursors[key] = i + 1
+                return entries[min(i, len(entries) - 1)]
+        return None
+
+
+#######################
+# Synthetic services
+class StandInState:
+    """Everything the synthetic services remember. Sized by what was created, never by what was listed."""
+    def __init__(self, config: StandInConfig):
+        self.config = config
+        self.lock = threading.Lock()
+        self.tasks = {}  # task_id -> {created, items}
+        self.flows = {}  # flow_id -> flow document
+        self.runs = {}  # run_id -> run document (plus `_created`)
+        # Runs in the order they were started, which is also the order of `_created`. Listings page through this by
+        #   index, so a page costs the same no matter how many runs came before it.
+        self.run_order = []
+        self.run_created = []
+        self.indexed = {}  # index_id -> number of ingested entries
+        self.requests = 0
+
+    def run_status(self, run: dict) -> str:
+        return 'SUCCEEDED' if time.monotonic() - run['_created'] >= self.config.run_duration else 'ACTIVE'
+
+    def public_run(self, run: dict) -> dict:
+        doc = {k: v for k, v in run.items() if not k.startswith('_')}
+        doc['status'] = self.run_status(run)
+        return doc
+
+
+def _now_iso(offset: float = 0) -> str:
+    return time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(time.time() + offset)) + '+00:00'
+
+
+def transfer_endpoint(state, handler, m, query, body):
+    coll_id = m['id']
+    return 200, {
+        'DATA_TYPE': 'endpoint',
+        'id': coll_id,
+        'display_name': f'Stand-in collection {coll_id}',
+        'entity_type': 'GCSv5_guest_collection',
+        'high_assurance': False,
+        'subscription_id': 'standin-subscription',
+        'https_server': f'{handler.base_url}/https/{coll_id}',
+    }
+
+
+def transfer_submission_id(state, handler, m, query, body):
+    return 200, {'DATA_TYPE': 'submission_id', 'value': str(uuid.uuid4())}
+
+
+def transfer_submit(state, handler, m, query, body):
+    task_id = str(uuid.uuid4())
+    with state.lock:
+        state.tasks[task_id] = {'created': time.monotonic(), 'items': len((body or {}).get('DATA', []))}
+    return 202, {
+        'DATA_TYPE': 'transfer_result',
+        'code': 'Accepted',
+        'task_id': task_id,
+        'submission_id': (body or {}).get('submission_id'),
+    }
+
+
+def transfer_task(state, handler, m, query, body):
+    task = state.tasks.get(m['id'])
+    if task is None:
+        return 404, {'code': 'TaskNotFound', 'message': f"Task {m['id']} not found"}
+    done = time.monotonic() - task['created'] >= state.config.task_duration
+    return 200, {
+        'DATA_TYPE': 'task',
+        'task_id': m['id'],
+        'status': 'SUCCEEDED' if done else 'ACTIVE',
+        'subtasks_total': task['items'],
+        'subtasks_succeeded': task['items'] if done else 0,
+    }
+
+
+def transfer_ls(state, handler, m, query, body):
+    total = state.config.listing_size
+    offset = int(query.get('offset', 0))
+    limit = min(int(query.get('limit', 100000)), 100000)
+    end = min(total, offset + limit)
+    data = [
+        {
+            'DATA_TYPE': 'file',
+            'name': f'file-{i:07d}.dat',
+            'type': 'file',
+            'size': state.config.file_size,
+            'last_modified': '2025-01-01 00:00:00+00:00',
+            'permissions': '0644',
+        }
+        for i in range(offset, end)
+    ]
+    return 200, {
+        'DATA_TYPE': 'file_list',
+        'path': query.get('path', '/'),
+        'endpoint': m['id'],
+        'DATA': data,
+        'length': len(data),
+        'total': total,
+        'offset': offset,
+        'limit': limit,
+        'has_next_page': end < total,
+    }
+
+
+def transfer_mkdir(state, handler, m, query, body):
+    return 202, {'DATA_TYPE': 'mkdir_result', 'code': 'DirectoryCreated', 'message': 'The directory was created'}
+
+
+def search_query(state, handler, m, query, body):
+    total = state.indexed.get(m['index'], 0)
+    limit = int((body or {}).get('limit', query.get('limit', 10)))
+    count = min(limit, total, 10)
+    gmeta = [
+        {
+            'subject': f'standin-record-{i}',
+            'entries': [{'entry_id': None, 'content': {'title': f'Record {i}'}, 'matched_principal_sets': []}],
+        }
+        for i in range(count)
+    ]
+    return 200, {'@datatype': 'GSearchResult', 'total': total, 'count': count, 'gmeta': gmeta,
+                 'has_next_page': total > count, 'offset': 0}
+
+
+def search_ingest(state, handler, m, query, body):
+    ingest_data = (body or {}).get('ingest_data', {})
+    count = len(ingest_data.get('gmeta', [])) if 'gmeta' in ingest_data else 1
+    with state.lock:
+        state.indexed[m['index']] = state.indexed.get(m['index'], 0) + count
+    return 200, {'task_id': str(uuid.uuid4()), 'acknowledged': True, 'success': True, 'num_documents_ingested': count}
+
+
+def search_task(state, handler, m, query, body):
+    return 200, {'task_id': m['id'], 'state': 'SUCCESS', 'state_description': 'Task succeeded'}
+
+
+def flows_create(state, handler, m, query, body):
+    flow_id = str(uuid.uuid4())
+    flow = dict(body or {}, id=flow_id, created_at=_now_iso())
+    with state.lock:
+        state.flows[flow_id] = flow
+    return 201, flow
+
+
+def flows_update(state, handler, m, query, body):
+    flow = state.flows.get(m['id'])
+    if flow is None:
+        return 404, {'code': 'NOT_FOUND', 'description': f"Flow {m['id']} not found"}
+    flow.update(body or {})
+    return 200, flow
+
+
+def flows_delete(state, handler, m, query, body):
+    with state.lock:
+        flow = state.flows.pop(m['id'], None)
+    return (200, flow) if flow else (404, {'code': 'NOT_FOUND'})
+
+
+def flows_run(state, handler, m, query, body):
+    body = body or {}
+    run_id = str(uuid.uuid4())
+    run = {
+        'run_id': run_id,
+        'action_id': run_id,
+        'flow_id': m['id'],
+        'label': body.get('label'),
+        'tags': body.get('tags', []),
+        'start_time': _now_iso(),
+        '_created': time.monotonic(),
+    }
+    with state.lock:
+        state.runs[run_id] = run
+        state.run_order.append(run)
+        state.run_created.append(run['_created'])
+    return 201, state.public_run(run)
+
+
+def flows_list_runs(state, handler, m, query, body):
+    statuses = set(filter(None, query.get('filter_status', '').split(',')))
+    tags = set(filter(None, query.get('filter_tags', '').split(',')))
+    flow_ids = set(filter(None, query.get('filter_flow_id', '').split(',')))
+    per_page = int(query.get('per_page', 50))
+    # The marker is the index (in `run_order`) of the first run for the next page
+    start = int(query.get('marker') or 0)
+
+    with state.lock:
+        n_runs = len(state.run_order)
+        if statuses and 'SUCCEEDED' not in statuses:
+            # Every run lasts `run_duration`, so the unfinished runs are exactly the most recently started ones
+            cutoff = time.monotonic() - state.config.run_duration
+            start = max(start, bisect.bisect_right(state.run_created, cutoff, 0, n_runs))
+
+    def matches(r):
+        return ((not flow_ids or r['flow_id'] in flow_ids)
+                and (not tags or tags.issubset(r['tags']))
+                and (not statuses or state.run_status(r) in statuses))
+
+    # Runs are only ever appended, so reading entries below `n_runs` needs no lock
+    page = []
+    i = start
+    while i < n_runs and len(page) < per_page:
+        if matches(state.run_order[i]):
+            page.append(state.run_order[i])
+        i += 1
+    # Skip ahead to the next match, so that the last page isn't followed by an empty one
+    while i < n_runs and not matches(state.run_order[i]):
+        i += 1
+    has_next = i < n_runs
+    return 200, {
+        'runs': [state.public_run(r) for r in page],
+        'has_next_page': has_next,
+        'marker': str(i) if has_next else None,
+    }
+
+
+def flows_get_run(state, handler, m, query, body):
+    run = state.runs.get(m['id'])
+    if run is None:
+        return 404, {'code': 'NOT_FOUND', 'description': f"Run {m['id']} not found"}
+    return 200, state.public_run(run)
+
+
+def flows_run_logs(state, handler, m, query, body):
+    run = state.runs.get(m['id'])
+    if run is None:
+        return 404, {'code': 'NOT_FOUND'}
+    # Two states that split the run's duration, so that profile_runs has something to measure
+    elapsed = min(time.monotonic() - run['_created'], state.config.run_duration)
+    start = time.time() - (time.monotonic() - run['_created'])
+
+    def at(offset):
+        return time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(start + offset)) + f'.{int((offset % 1) * 1e6):06d}+00:00'
+
+    entries = [{'code': 'FlowStarted', 'time': at(0), 'details': {}}]
+    half = state.config.run_duration / 2
+    for i, name in enumerate(['StandInFirstStep', 'StandInSecondStep']):
+        if elapsed >= i * half:
+            entries.append({'code': 'ActionStarted', 'time': at(i * half), 'details': {'state_name': name}})
+        if elapsed >= (i + 1) * half:
+            entries.append({'code': 'ActionCompleted', 'time': at((i + 1) * half), 'details': {'state_name': name}})
+    if state.run_status(run) == 'SUCCEEDED':
+        entries.append({'code': 'FlowSucceeded', 'time': at(state.config.run_duration), 'details': {}})
+    return 200, {'entries': entries, 'has_next_page': False, 'marker': None}
+
+
+ROUTES = [
+    ('GET', 'transfer', r'/v0\.10/endpoint/(?P<id>[^/]+)', transfer_endpoint),
+    ('GET', 'transfer', r'/v0\.10/submission_id', transfer_submission_id),
+    ('POST', 'transfer', r'/v0\.10/transfer', transfer_submit),
+    ('GET', 'transfer', r'/v0\.10/task/(?P<id>[^/]+)', transfer_task),
+    ('GET', 'transfer', r'/v0\.10/operation/endpoint/(?P<id>[^/]+)/ls', transfer_ls),
+    ('POST', 'transfer', r'/v0\.10/operation/endpoint/(?P<id>[^/]+)/mkdir', transfer_mkdir),
+    ('GET', 'search', r'/v1/index/(?P<index>[^/]+)/search', search_query),
+    ('POST', 'search', r'/v1/index/(?P<index>[^/]+)/search', search_query),
+    ('POST', 'search', r'/v1/index/(?P<index>[^/]+)/ingest', search_ingest),
+    ('GET', 'search', r'/v1/task/(?P<id>[^/]+)', search_task),
+    ('POST', 'flows', r'/flows', flows_create),
+    ('PUT', 'flows', r'/flows/(?P<id>[^/]+)', flows_update),
+    ('DELETE', 'flows', r'/flows/(?P<id>[^/]+)', flows_delete),
+    ('POST', 'flows', r'/flows/(?P<id>[^/]+)/run', flows_run),
+    ('GET', 'flows', r'/runs', flows_list_runs),
+    ('GET', 'flows', r'/runs/(?P<id>[^/]+)', flows_get_run),
+    ('GET', 'flows', r'/runs/(?P<id>[^/]+)/log', flows_run_logs),
+]
+_COMPILED = [(method, service, re.compile(pattern + '/?$'), func) for method, service, pattern, func in ROUTES]
+
+
+#######################
+# HTTP server
+class StandInHandler(BaseHTTPRequestHandler):
+    # Keep-alive, so that clients' connection pools work as they would against the real services
+    protocol_version = 'HTTP/1.1'
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.dispatch('GET')
+
+    def do_POST(self):
+        self.dispatch('POST')
+
+    def do_PUT(self):
+        self.dispatch('PUT')
+
+    def do_DELETE(self):
+        self.dispatch('DELETE')
+
+    def dispatch(self, method: str):
+        config = self.server.config
+        state = self.server.state
+        url = urlparse(self.path)
+        query = dict(parse_qsl(url.query))
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+        with state.lock:
+            state.requests += 1
+
+        if config.latency or config.jitter:
+            time.sleep(config.latency + random.uniform(0, config.jitter))
+        if config.error_rate and random.random() < config.error_rate:
+            return self.send_json(config.error_status, {'code': 'StandInInjectedError', 'message': 'Injected error'},
+                                  {'Retry-After': str(config.retry_after)})
+
+        service, _, rest = url.path.lstrip('/').partition('/')
+        path = '/' + rest
+        if service == 'https':
+            recorded = self.server.cassette.match(method, service, collection_file_path(url.path), query)
+            if recorded is None:
+                return self.send_file(path)
+            if recorded['status'] // 100 != 2:
+                return self.send_json(recorded['status'], {'code': 'Replayed', 'message': 'Recorded error response'})
+            size = recorded['size'] if recorded.get('size', -1) >= 0 else None
+            return self.send_file(path, size=size, content_type=recorded['content_type'])
+
+        recorded = self.server.cassette.match(method, service, path, query)
+        if recorded is not None:
+            return self.send_body(recorded['status'], recorded['body'].encode('utf-8'), recorded['content_type'])
+
+        for route_method, route_service, pattern, func in _COMPILED:
+            if route_method == method and route_service == service:
+                m = pattern.match(path)
+                if m:
+                    try:
+                        body = json.loads(raw) if raw else None
+                    except ValueError:
+                        return self.send_json(400, {'code': 'BadRequest', 'message': 'Body is not valid JSON'})
+                    status, doc = func(state, self, m.groupdict(), query, body)
+                    return self.send_json(status, doc)
+        return self.send_json(404, {'code': 'NotFound', 'message': f'The stand-in does not implement {method} {url.path}'})
+
+    def send_json(self, status: int, doc: dict, headers: dict = None):
+        self.send_body(status, json.dumps(doc).encode('utf-8'), 'application/json', headers)
+
+    def send_body(self, status: int, body: bytes, content_type: str, headers: dict = None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.write_limited(body)
+
+    def send_file(self, path: str, size: int = None, content_type: str = 'application/octet-stream'):
+        """
+        An HTTPS collection: every file exists (unless "missing" is in its name), with deterministic contents
+
+        `size` (default: the configured `file_size`) is given when replaying a recorded download.
+        """
+        _, _, file_path = path.lstrip('/').partition('/')
+        if size is None:
+            if not file_path or 'missing' in file_path:
+                return self.send_json(404, {'code': 'NotFound', 'message': f'No such file: /{file_path}'})
+            size = self.server.config.file_size
+        block = hashlib.sha256(f'{self.server.config.seed}:{file_path}'.encode('utf-8')).digest() * 2048  # 64 KiB
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(size))
+        self.end_headers()
+        sent = 0
+        while sent < size:
+            chunk = block[:min(len(block), size - sent)]
+            self.write_limited(chunk)
+            sent += len(chunk)
+
+    def write_limited(self, data: bytes):
+        bandwidth = self.server.config.bandwidth
+        if not bandwidth:
+            self.wfile.write(data)
+            return
+        # Pace the body in slices, so that a slow link looks slow all the way through rather than stalling at the end
+        step = max(1024, int(bandwidth / 20))
+        for i in range(0, len(data), step):
+            start = time.monotonic()
+            piece = data[i:i + step]
+            self.wfile.write(piece)
+            remaining = len(piece) / bandwidth - (time.monotonic() - start)
+            if remaining > 0:
+                time.sleep(remaining)
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Benchmarks open many connections at once
+    request_queue_size = 1024
+
+    def __init__(self, address, config: StandInConfig = None, cassette: Cassette = None):
+        super().__init__(address, StandInHandler)
+        self.config = config or StandInConfig()
+        self.state = StandInState(self.config)
+        self.cassette = cassette or Cassette()
+        random.seed(self.config.seed)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+
+def service_urls(base_url: str) -> dict:
+    """Environment variables that point the Globus SDK at a stand-in server"""
+    return {f'GLOBUS_SDK_SERVICE_URL_{s.upper()}': f'{base_url}/{s}/' for s in SERVICES}
+
+
+def start(config: StandInConfig = None, cassette: Cassette = None, host: str = '127.0.0.1', port: int = 0) -> StandInServer:
+    """Start a stand-in server on a background thread. Call `.shutdown()` when done."""
+    server = StandInServer((host, port), config, cassette)
+    threading.Thread(target=server.serve_forever, name='standin', daemon=True).start()
+    return server
+
+
+def parse_args():
+    defaults = StandInConfig()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=0, help='Port to listen on (default: any free port)')
+    parser.add_argument('--replay', help='Cassette of recorded responses (JSON lines) to answer from first')
+    parser.add_argument('--latency', type=float, default=defaults.latency, help='Seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=defaults.jitter, help='Up to this many more seconds, at random')
+    parser.add_argument('--bandwidth', type=float, default=defaults.bandwidth, help='Bytes/s per response; 0 is unlimited')
+    parser.add_argument('--error-rate', type=float, default=defaults.error_rate, help='Fraction of requests that fail')
+    parser.add_argument('--error-status', type=int, default=defaults.error_status, help='Status for injected errors')
+    parser.add_argument('--retry-after', type=int, default=defaults.retry_after, help='Retry-After for injected errors')
+    parser.add_argument('--file-size', type=int, default=defaults.file_size, help='Bytes per file on the HTTPS collection')
+    parser.add_argument('--listing-size', type=int, default=defaults.listing_size, help='Files per folder listing')
+    parser.add_argument('--task-duration', type=float, default=defaults.task_duration, help='Seconds per transfer task')
+    parser.add_argument('--run-duration', type=float, default=defaults.run_duration, help='Seconds per flow run')
+    parser.add_argument('--seed', type=int, default=defaults.seed)
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    config = StandInConfig(**{k: v for k, v in vars(args).items() if k in StandInConfig.__dataclass_fields__})
+    server = StandInServer((args.host, args.port), config, Cassette(args.replay))
+    print(f'Listening on {server.base_url}', flush=True)
+    for name, value in service_urls(server.base_url).items():
+        print(f'export {name}={value}', flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
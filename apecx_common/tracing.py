@@ -0,0 +1,190 @@
+"""
+Timed spans around Globus API calls and slow local steps, to see where a script's wall-clock time goes
+
+Tracing is off unless a script is run with `--trace`. When off, `span()` costs about as much as an empty `with`
+    block, so the hooks can stay in place permanently.
+
+    --trace spans.jsonl     Append one JSON object per finished span to this file
+    --trace otel            Send spans to OpenTelemetry. Requires `opentelemetry-sdk`; spans go to an OTLP collector
+                                if `opentelemetry-exporter-otlp` is installed (configure it with the usual
+                                `OTEL_EXPORTER_OTLP_*` environment variables), or are printed to the console otherwise.
+
+Every SDK client installed with `scheduler.install` (or `aio.share_connections`) gets one span per API call, with the
+    service, method, path, final status code, request/response sizes, and how many times the call was retried. The
+    span covers every attempt, including time spent waiting for the rate limit or backing off between retries. Scripts
+    add their own spans around file I/O and multi-call steps:
+
+    with tracing.span('download_file', url=url) as s:
+        ...
+        s.set(bytes=total)
+
+A JSON lines span looks like:
+    {"name": "transfer GET", "span_id": "...", "parent_id": "...", "start": 1714000000.123, "duration_s": 0.21,
+     "status": "ok", "attributes": {"http.status_code": 200, "http.response.body.size": 1532, ...}}
+"""
+import atexit
+import contextlib
+import contextvars
+import json
+import os
+import threading
+import time
+
+
+TRACE_HELP = 'Record timed spans: a JSON lines file to append to, or "otel" to export via OpenTelemetry'
+
+_exporter = None
+_current = contextvars.ContextVar('apecx_span', default=None)
+
+
+class Span:
+    __slots__ = ('name', 'span_id', 'parent_id', 'start', 'start_ns', 'duration_s', 'status', 'attributes')
+
+    def __init__(self, name: str, parent_id: str = None, **attributes):
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.start = time.time()
+        self.start_ns = time.perf_counter_ns()
+        self.duration_s = None
+        self.status = 'ok'
+        self.attributes = attributes
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> dict:
+        return {
+            'name': self.name,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'start': self.start,
+            'duration_s': self.duration_s,
+            'status': self.status,
+            'attributes': self.attributes,
+        }
+
+
+class _NoopSpan:
+    """Returned when tracing is off, so instrumented code never needs to check"""
+    def set(self, **attributes):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+# Exporters are told when each span starts (for exporters that must see parents first), and again when it ends
+class JSONLinesExporter:
+    def __init__(self, fn: str):
+        self.lock = threading.Lock()
+        # Line buffered: a span is on disk as soon as it ends, even if the script crashes later
+        self.f = open(fn, 'a', buffering=1)
+
+    def start(self, span: Span):
+        pass
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_dict(), default=str)
+        with self.lock:
+            self.f.write(line + '\n')
+
+    def close(self):
+        self.f.close()
+
+
+class OpenTelemetryExporter:
+    """Mirrors each span in OpenTelemetry, with the same start and end times"""
+    def __init__(self):
+        try:
+            from opentelemetry import trace
+            from opentelemetry.sdk.resources import Resource
+            from opentelemetry.sdk.trace import TracerProvider
+            from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+        except ImportError:
+            raise SystemExit('--trace otel requires the OpenTelemetry SDK: pip install opentelemetry-sdk')
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+            span_exporter = OTLPSpanExporter()
+        except ImportError:
+            span_exporter = ConsoleSpanExporter()
+
+        self.trace = trace
+        self.provider = TracerProvider(resource=Resource.create({'service.name': 'apecx-demos'}))
+        self.provider.add_span_processor(BatchSpanProcessor(span_exporter))
+        self.tracer = self.provider.get_tracer(__name__)
+        # Our open span IDs -> OpenTelemetry spans, so that children can be linked to their parents
+        self.spans = {}
+        self.lock = threading.Lock()
+
+    def start(self, span: Span):
+        with self.lock:
+            parent = self.spans.get(span.parent_id)
+        context = self.trace.set_span_in_context(parent) if parent is not None else None
+        otel_span = self.tracer.start_span(span.name, context=context, start_time=int(span.start * 1e9))
+        with self.lock:
+            self.spans[span.span_id] = otel_span
+
+    def export(self, span: Span):
+        with self.lock:
+            otel_span = self.spans.pop(span.span_id, None)
+        if otel_span is None:
+            return
+        # OpenTelemetry only accepts primitive attribute values
+        otel_span.set_attributes({k: v for k, v in span.attributes.items() if isinstance(v, (str, bool, int, float))})
+        if span.status != 'ok':
+            otel_span.set_status(self.trace.Status(self.trace.StatusCode.ERROR, span.status))
+        otel_span.end(end_time=int((span.start + span.duration_s) * 1e9))
+
+    def close(self):
+        self.provider.shutdown()
+
+
+def enable(destination: str):
+    """Start recording spans to a JSON lines file, or to OpenTelemetry if `destination` is "otel". None: do nothing."""
+    global _exporter
+    if not destination:
+        return
+    disable()
+    _exporter = OpenTelemetryExporter() if destination == 'otel' else JSONLinesExporter(destination)
+    # Flush whatever is buffered when the script exits
+    atexit.register(disable)
+
+
+def disable():
+    global _exporter
+    if _exporter is not None:
+        _exporter.close()
+    _exporter = None
+
+
+def enabled() -> bool:
+    return _exporter is not None
+
+
+@contextlib.contextmanager
+def span(name: str, **attributes):
+    """
+    Time a block of code. Exceptions are recorded as the span status (and re-raised).
+
+    Spans started inside another span (in the same thread or asyncio task) record it as their parent.
+    """
+    if _exporter is None:
+        yield _NOOP
+        return
+
+    parent = _current.get()
+    s = Span(name, parent.span_id if parent else None, **attributes)
+    token = _current.set(s)
+    _exporter.start(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.status = f'error: {type(e).__name__}'
+        raise
+    finally:
+        s.duration_s = (time.perf_counter_ns() - s.start_ns) / 1e9
+        _current.reset(token)
+        exporter = _exporter
+        if exporter is not None:
+            exporter.export(s)
@@ -0,0 +1,88 @@
+"""
+The SDK transport behind `scheduler.install`
+
+Kept apart from `scheduler` because the SDK's HTTP stack (`requests` and friends) takes a noticeable fraction of a
+    second to import. Scripts import `scheduler` for its limiters and counters while parsing arguments; this module is
+    only loaded once a client is actually installed.
+"""
+import logging
+import random
+import threading
+from urllib.parse import urlparse
+
+from globus_sdk.transport import RequestsTransport, RetryCheckResult, RetryContext
+
+from . import tracing
+from .scheduler import (
+    BACKOFF_CAP,
+    THROTTLE_STATUSES,
+    Scheduler,
+    _response_hooks,
+    backoff_delay,
+    parse_retry_after,
+    response_attributes,
+    service_name,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+class ScheduledTransport(RequestsTransport):
+    """
+    An SDK transport that sends every request (and every retry) through the shared scheduler
+
+    The SDK's own retry loop still decides *whether* to retry; this class decides *when* each attempt may be sent.
+    """
+    def __init__(self, scheduler: Scheduler, max_sleep: float = BACKOFF_CAP, **kwargs):
+        self.scheduler = scheduler
+        # Which service the current thread's request is for, so that retry hooks can find its limiter
+        self._local = threading.local()
+        super().__init__(retry_backoff=self._backoff, max_sleep=max_sleep, **kwargs)
+
+    def register_default_retry_checks(self):
+        # Runs first, so it sees every response before the SDK's checks decide whether to retry
+        self.register_retry_check(self.check_throttled)
+        super().register_default_retry_checks()
+
+    def request(self, method, url, *args, **kwargs):
+        limiter = self.scheduler.get(service_name(url))
+        self._local.limiter = limiter
+        self._local.retries = 0
+        with tracing.span(f'{limiter.name} {method}', **{'http.method': method, 'url.path': urlparse(url).path}) as s:
+            with limiter.slots:
+                limiter.acquire_token()
+                resp = super().request(method, url, *args, **kwargs)
+            for hook in _response_hooks:
+                hook(resp)
+            s.set(**response_attributes(resp, streamed=kwargs.get('stream', False)), retries=self._local.retries)
+            return resp
+
+    def check_throttled(self, ctx: RetryContext) -> RetryCheckResult:
+        resp = ctx.response
+        if resp is not None and resp.status_code in THROTTLE_STATUSES:
+            limiter = self._local.limiter
+            limiter.count('throttled')
+            delay = parse_retry_after(resp.headers.get('Retry-After'))
+            if delay is None:
+                delay = backoff_delay(ctx.attempt)
+            else:
+                # The SDK only understands whole seconds; an HTTP date would otherwise be ignored
+                ctx.backoff = delay
+            logger.info(f'{limiter.name} throttled the request ({resp.status_code}); pausing calls for {delay:.1f}s')
+            limiter.pause(delay)
+        return RetryCheckResult.no_decision
+
+    def _backoff(self, ctx: RetryContext) -> float:
+        if ctx.backoff is not None:
+            # Honor Retry-After, plus a little jitter so that everyone who was told "30s" doesn't return at once
+            return ctx.backoff + random.uniform(0, min(1.0, ctx.backoff * 0.1))
+        return backoff_delay(ctx.attempt)
+
+    def _retry_sleep(self, ctx: RetryContext):
+        limiter = self._local.limiter
+        limiter.count('retried')
+        self._local.retries += 1
+        super()._retry_sleep(ctx)
+        # The retry is a new call as far as the service is concerned
+        limiter.acquire_token()
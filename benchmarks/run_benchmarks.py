@@ -0,0 +1,502 @@
+"""
+End-to-end benchmarks of the demo scripts, run against the local stand-in service (no Globus account needed)
+
+Each benchmark drives the real functions from one demo script, with SDK clients pointed at `apecx_common.standin`:
+
+* download: `download_via_https` - look up the collection's HTTPS server, then download many files
+* transfer: `transfer-filter-upload` - both collection lookups, build a large filtered transfer, submit it, and poll
+    until done; then page through a large `ls` listing
+* ingest: `ris-to-globus` - parse a synthetic RIS export, build search records, write the ingest document, and
+    ingest it into a search index in batches
+* flows: `make_flow` - create the flow, start many runs, and wait for them all with the run monitor
+* manifest: `make_flow` - stream a large manifest with the compute functions' JSON reader, after checking that the
+    reader agrees with `json.loads` on random documents split at every possible chunk boundary
+* startup: `apecx.py` - how long each command takes to start (`<group> <command> --help`), and which imports that time
+    goes to. No stand-in needed: this is the fixed cost a cron job pays before doing any work.
+
+Results report throughput and latency percentiles, and can be saved as JSON to compare before/after a change:
+
+    python benchmarks/run_benchmarks.py --records 100000 --items 100000 --listing 1000000 --json before.json
+    python benchmarks/run_benchmarks.py download --latency 0.05 --bandwidth 50e6 --error-rate 0.01
+
+The stand-in runs in a separate process, so that its work doesn't compete with the client for the GIL.
+"""
+import argparse
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import importlib.util
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SCRIPT_DIRS = [
+    ROOT,
+    os.path.join(ROOT, 'transfer-data', 'scripts'),
+    os.path.join(ROOT, 'search', 'scripts'),
+    os.path.join(ROOT, 'flows-compute', 'flow'),
+]
+for d in SCRIPT_DIRS:
+    if d not in sys.path:
+        sys.path.insert(0, d)
+
+BENCHMARKS = ['download', 'transfer', 'ingest', 'flows', 'manifest', 'startup']
+# Benchmarks that don't need the stand-in service
+LOCAL_BENCHMARKS = {'manifest', 'startup'}
+COLLECTION_ID = 'c0ffee00-0000-4000-8000-000000000001'
+DEST_COLLECTION_ID = 'c0ffee00-0000-4000-8000-000000000002'
+INDEX_ID = 'c0ffee00-0000-4000-8000-00000000000a'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('benchmarks', nargs='*', help=f'Which benchmarks to run: {", ".join(BENCHMARKS)} (default: all)')
+    parser.add_argument('--files', type=int, default=200, help='Files to download')
+    parser.add_argument('--file-size', type=int, default=1024 * 1024, help='Bytes per downloaded file')
+    parser.add_argument('--items', type=int, default=10000, help='Items in the submitted transfer')
+    parser.add_argument('--listing', type=int, default=100000, help='Files in the listed folder')
+    parser.add_argument('--records', type=int, default=10000, help='RIS records to convert and ingest')
+    parser.add_argument('--ingest-batch', type=int, default=1000, help='Records per ingest request')
+    parser.add_argument('--runs', type=int, default=200, help='Flow runs to start and wait for')
+    parser.add_argument('--manifest-entries', type=int, default=100000, help='Entries in the streamed manifest')
+    parser.add_argument('--fuzz-docs', type=int, default=500, help='Random documents for the manifest reader check')
+    parser.add_argument('--startup-runs', type=int, default=5, help='Times to start each command')
+    parser.add_argument('--workers', type=int, default=16, help='Concurrent downloads / run launches')
+    parser.add_argument('--latency', type=float, default=0.0, help='Stand-in latency per request, in seconds')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Stand-in random extra latency, in seconds')
+    parser.add_argument('--bandwidth', type=float, default=0.0, help='Stand-in bytes/s per response (0: unlimited)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of stand-in requests that fail')
+    parser.add_argument('--demo-limits', help='Keep the scheduler\'s default per-service rate limits', action='store_true')
+    parser.add_argument('--json', help='Also write the results to this file')
+    args = parser.parse_args()
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f'Unknown benchmark(s): {", ".join(sorted(unknown))}')
+    return args
+
+
+def load_script(path: str, name: str):
+    """Import a demo script by path (several have dashes in their names)"""
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, path))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def percentiles(values: list[float]) -> dict:
+    if not values:
+        return {'p50_ms': None, 'p95_ms': None, 'max_ms': None}
+    if len(values) == 1:
+        p50 = p95 = values[0]
+    else:
+        q = statistics.quantiles(values, n=100, method='inclusive')
+        p50, p95 = q[49], q[94]
+    return {'p50_ms': p50 * 1000, 'p95_ms': p95 * 1000, 'max_ms': max(values) * 1000}
+
+
+def result(name: str, count: int, unit: str, elapsed: float, latencies: list[float] = None, **extra) -> dict:
+    return {
+        'benchmark': name,
+        'count': count,
+        'unit': unit,
+        'elapsed_s': elapsed,
+        'per_s': count / elapsed if elapsed else None,
+        **percentiles(latencies or []),
+        **extra,
+    }
+
+
+#######################
+# Stand-in service
+def start_standin(args, listing_size: int, file_size: int):
+    cmd = [
+        sys.executable, '-m', 'apecx_common.standin',
+        '--latency', str(args.latency),
+        '--jitter', str(args.jitter),
+        '--bandwidth', str(args.bandwidth),
+        '--error-rate', str(args.error_rate),
+        '--file-size', str(file_size),
+        '--listing-size', str(listing_size),
+        '--task-duration', '0.5',
+        '--run-duration', '1.0',
+    ]
+    proc = subprocess.Popen(cmd, cwd=ROOT, stdout=subprocess.PIPE, text=True)
+    first = proc.stdout.readline().strip()
+    if not first.startswith('Listening on '):
+        proc.kill()
+        raise SystemExit(f'Could not start the stand-in service: {first!r}')
+    return proc, first[len('Listening on '):]
+
+
+def configure_clients(args, base_url: str):
+    from apecx_common import scheduler, standin
+
+    os.environ.update(standin.service_urls(base_url))
+    if not args.demo_limits:
+        # Measure the scripts, not the demo's deliberately conservative rate limits
+        for service in standin.SERVICES:
+            scheduler.configure(service, rate=1e6, burst=10000, max_concurrent=64)
+
+
+#######################
+# Benchmarks
+def bench_download(args) -> list[dict]:
+    from globus_sdk import TransferClient
+    from apecx_common import scheduler
+
+    download = load_script('transfer-data/scripts/download_via_https.py', 'download_via_https')
+    client = scheduler.install(TransferClient())
+    base_url = client.get_endpoint(COLLECTION_ID)['https_server']
+
+    latencies = []
+    failures = 0
+
+    def one(i, folder):
+        start = time.perf_counter()
+        ok = download.download_file(base_url, f'/bench/file-{i:07d}.dat', os.path.join(folder, f'{i}.dat'))
+        latencies.append(time.perf_counter() - start)
+        return ok
+
+    with tempfile.TemporaryDirectory() as folder:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            failures = sum(1 for ok in pool.map(lambda i: one(i, folder), range(args.files)) if not ok)
+        elapsed = time.perf_counter() - start
+
+    mib = (args.files - failures) * args.file_size / 2 ** 20
+    return [result('download', args.files, 'files', elapsed, latencies, failed=failures, mib_per_s=mib / elapsed)]
+
+
+def bench_transfer(args) -> list[dict]:
+    from globus_sdk import TransferClient
+    from apecx_common import aio
+    import common
+
+    upload = load_script('transfer-data/scripts/transfer-filter-upload.py', 'transfer_filter_upload')
+    client = aio.share_connections(TransferClient())
+    results = []
+
+    start = time.perf_counter()
+    aio.run_concurrently(
+        lambda: common.requires_data_access_scope(client, COLLECTION_ID),
+        lambda: common.requires_data_access_scope(client, DEST_COLLECTION_ID),
+    )
+    lookups = time.perf_counter() - start
+
+    build_start = time.perf_counter()
+    options = common.build_transfer_options(COLLECTION_ID, '/bench/0', DEST_COLLECTION_ID, '/bench/0')
+    for i in range(1, args.items):
+        options.add_item(f'/bench/{i}', f'/bench/{i}', recursive=True)
+    options = upload.add_demo_filters(options)
+    build = time.perf_counter() - build_start
+
+    submit_start = time.perf_counter()
+    task_id = client.submit_transfer(options)['task_id']
+    submit = time.perf_counter() - submit_start
+    status = upload.report_result(client, task_id, delay_sec=0.1)
+    elapsed = time.perf_counter() - start
+    results.append(result('transfer', args.items, 'items', elapsed, lookup_s=lookups, build_s=build, submit_s=submit,
+                          status=status))
+
+    # Page through a (very) large folder listing, as a portal or sync tool would
+    latencies = []
+    offset = 0
+    start = time.perf_counter()
+    while True:
+        page_start = time.perf_counter()
+        page = client.operation_ls(COLLECTION_ID, path='/bench/', limit=100000, offset=offset)
+        latencies.append(time.perf_counter() - page_start)
+        offset += page['length']
+        if not page['has_next_page'] or not page['length']:
+            break
+    results.append(result('transfer ls', offset, 'entries', time.perf_counter() - start, latencies, pages=len(latencies)))
+    return results
+
+
+def synthetic_ris(count: int) -> str:
+    """A Zotero-style RIS export, with enough variety to exercise every branch of the conversion"""
+    lines = []
+    for i in range(count):
+        lines += [
+            'TY  - JOUR',
+            f'TI  - Synthetic article {i}',
+            f'AU  - Author {i % 97}, A.',
+            f'DA  - {2000 + i % 25}/{1 + i % 12:02d}/',
+            f'DO  - 10.5555/bench.{i}',
+            f'KW  - {"hidden" if i % 10 == 0 else "public"}',
+            f'KW  - topic-{i % 13}',
+            f'L1  - files/article-{i}.pdf',
+            f'L1  - files/{"plotly-" if i % 3 == 0 else ""}data-{i}.json',
+            f'AB  - Abstract for article {i}. ' + 'Lorem ipsum dolor sit amet. ' * 5,
+            'ER  - ',
+            '',
+        ]
+    return '\n'.join(lines)
+
+
+def bench_ingest(args) -> list[dict]:
+    import rispy
+    from globus_sdk import SearchClient
+    from apecx_common import aio
+
+    ris = load_script('search/scripts/ris-to-globus.py', 'ris_to_globus')
+    client = aio.share_connections(SearchClient())
+    results = []
+
+    with tempfile.TemporaryDirectory() as folder:
+        in_fn = os.path.join(folder, 'in.ris')
+        out_fn = os.path.join(folder, 'out.json')
+        with open(in_fn, 'w') as f:
+            f.write(synthetic_ris(args.records))
+
+        # The same steps as the script's __main__
+        start = time.perf_counter()
+        with open(in_fn, 'r') as f:
+            entries = rispy.load(f)
+        parsed = time.perf_counter()
+        records = [
+            ris.citation_to_gingest(
+                ris.build_record(ris.cleanup_citation('https://standin.example/', r)),
+                admin_group_urn='urn:globus:groups:id:bench',
+            )
+            for r in entries
+        ]
+        built = time.perf_counter()
+        with open(out_fn, 'w') as f:
+            json.dump(ris.to_gingest_payload(records), f, indent=2)
+        written = time.perf_counter()
+        size_mib = os.path.getsize(out_fn) / 2 ** 20
+
+    results.append(result('ingest convert', len(records), 'records', written - start, parse_s=parsed - start,
+                          build_s=built - parsed, write_s=written - built, output_mib=size_mib))
+
+    # Ingest in batches, several at once
+    batches = [records[i:i + args.ingest_batch] for i in range(0, len(records), args.ingest_batch)]
+    latencies = []
+
+    def ingest(batch):
+        batch_start = time.perf_counter()
+        client.ingest(INDEX_ID, ris.to_gingest_payload(batch))
+        latencies.append(time.perf_counter() - batch_start)
+
+    async def ingest_all():
+        async for _, outcome in aio.map_concurrent(ingest, batches, limit=args.workers):
+            if isinstance(outcome, BaseException):
+                raise outcome
+
+    start = time.perf_counter()
+    asyncio.run(ingest_all())
+    elapsed = time.perf_counter() - start
+    total = client.search(INDEX_ID, 'article')['total']
+    results.append(result('ingest upload', len(records), 'records', elapsed, latencies, batches=len(batches),
+                          indexed=total))
+    return results
+
+
+def bench_flows(args) -> list[dict]:
+    from globus_sdk import FlowsClient, SpecificFlowClient
+    from apecx_common import aio
+
+    import make_flow
+    from monitor import RunMonitor
+
+    fc = aio.share_connections(FlowsClient())
+    reg = {'functions': {}, 'flows': {}}
+    flow_def, schema_def = make_flow.get_example_flow(
+        os.path.join(make_flow.DATA_DIR, 'validate_in_place', 'flow.json'),
+        os.path.join(make_flow.DATA_DIR, 'validate_in_place', 'input_schema.json'),
+    )
+    start = time.perf_counter()
+    flow_id = make_flow.ensure_flow(fc, 'validate_in_place', flow_def, schema_def, reg)
+    deploy = time.perf_counter() - start
+
+    sfc = aio.share_connections(SpecificFlowClient(flow_id))
+    latencies = []
+
+    def launch(i):
+        launch_start = time.perf_counter()
+        run_id, _ = make_flow.run_flow(sfc, {'bench': i}, label=f'bench {i}', tags=['apecx', 'apecx-bench'])
+        latencies.append(time.perf_counter() - launch_start)
+        return run_id
+
+    async def launch_all():
+        run_ids = []
+        async for i, outcome in aio.map_concurrent(launch, range(args.runs), limit=args.workers):
+            if isinstance(outcome, BaseException):
+                raise outcome
+            run_ids.append(outcome)
+        return run_ids
+
+    start = time.perf_counter()
+    run_ids = asyncio.run(launch_all())
+    launched = time.perf_counter() - start
+
+    monitor = RunMonitor(fc, run_ids, min_delay=0.2, max_delay=1.0)
+
+    async def wait_all():
+        async for _ in monitor.watch():
+            pass
+
+    asyncio.run(wait_all())
+    done = time.perf_counter() - start
+    finished = sum(1 for s in monitor.runs.values() if s['status'] == 'SUCCEEDED')
+    return [
+        result('flows launch', args.runs, 'runs', launched, latencies, deploy_s=deploy),
+        result('flows complete', args.runs, 'runs', done, succeeded=finished, monitor_api_calls=monitor.api_calls),
+    ]
+
+
+def random_json_array(rng) -> str:
+    """A small JSON array, heavy on what is easy to split badly: numbers with fractions and exponents, escapes, and
+        multi-byte characters"""
+    def value(depth):
+        kind = rng.choice(['int', 'float', 'exp', 'str', 'const'] + (['list', 'dict'] if depth < 2 else []))
+        if kind == 'int':
+            return str(rng.randint(-10 ** 6, 10 ** 6))
+        if kind == 'float':
+            return f'{rng.uniform(-1e3, 1e3):.{rng.randint(1, 6)}f}'
+        if kind == 'exp':
+            return f'{rng.randint(1, 9)}{rng.choice(["", ".5", ".25"])}{rng.choice("eE")}{rng.choice(["", "+", "-"])}{rng.randint(0, 30)}'
+        if kind == 'str':
+            return json.dumps(''.join(rng.choice('ab\\"é€😀 ') for _ in range(rng.randint(0, 6))), ensure_ascii=rng.random() < 0.3)
+        if kind == 'const':
+            return rng.choice(['true', 'false', 'null'])
+        if kind == 'list':
+            return '[' + ', '.join(value(depth + 1) for _ in range(rng.randint(0, 3))) + ']'
+        return '{' + ', '.join(f'"k{i}": {value(depth + 1)}' for i in range(rng.randint(0, 3))) + '}'
+
+    space = lambda: rng.choice(['', ' ', '\n'])  # noqa: E731
+    return '[' + space() + (space() + ',' + space()).join(value(0) for _ in range(rng.randint(0, 5))) + space() + ']'
+
+
+def check_manifest_reader(iter_json_array, docs: int, seed: int = 0):
+    """Every document must give the same items as `json.loads`, however the file is split into chunks"""
+    import io
+    import random
+
+    rng = random.Random(seed)
+    for _ in range(docs):
+        doc = random_json_array(rng)
+        raw = doc.encode('utf-8')
+        expected = json.loads(doc)
+        for chunk_size in range(1, min(len(raw), 8) + 1):
+            try:
+                got = list(iter_json_array(io.BytesIO(raw), chunk_size=chunk_size))
+            except ValueError as e:
+                got = e
+            if got != expected:
+                raise SystemExit(f'Manifest reader disagrees with json.loads at chunk_size={chunk_size}: {doc!r} -> {got!r}')
+
+
+def bench_manifest(args) -> list[dict]:
+    import make_flow
+
+    start = time.perf_counter()
+    check_manifest_reader(make_flow._iter_json_array, args.fuzz_docs)
+    results = [result('manifest check', args.fuzz_docs, 'docs', time.perf_counter() - start)]
+
+    with tempfile.TemporaryDirectory() as folder:
+        fn = os.path.join(folder, 'manifest.json')
+        with open(fn, 'w') as f:
+            json.dump([
+                {'path': f'data/run-{i // 1000:04d}/file-{i:07d}.dat', 'size': i * 37, 'md5': f'{i:032x}'}
+                for i in range(args.manifest_entries)
+            ], f)
+        start = time.perf_counter()
+        with open(fn, 'rb') as f:
+            count = sum(1 for _ in make_flow._iter_json_array(f))
+        elapsed = time.perf_counter() - start
+        results.append(result('manifest stream', count, 'entries', elapsed,
+                              mib_per_s=os.path.getsize(fn) / 2 ** 20 / elapsed))
+    return results
+
+
+def bench_startup(args) -> list[dict]:
+    import apecx
+
+    def time_command(cmd: list[str]) -> list[float]:
+        latencies = []
+        for _ in range(args.startup_runs):
+            start = time.perf_counter()
+            subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    # The interpreter's own startup, which no command can beat
+    latencies = time_command([sys.executable, '-c', 'pass'])
+    results = [result('startup python', len(latencies), 'runs', sum(latencies), latencies)]
+
+    for group, commands in apecx.COMMANDS.items():
+        for command in commands:
+            argv = [group, command, '--help']
+            latencies = time_command([sys.executable, apecx.__file__, *argv])
+            _, _, packages = apecx.import_times(argv)
+            slowest = max(packages, key=packages.get)
+            results.append(result(
+                f'startup {group} {command}', len(latencies), 'runs', sum(latencies), latencies,
+                import_ms=sum(packages.values()) * 1000,
+                slowest=f'{slowest} ({packages[slowest] * 1000:.0f} ms)',
+                globus_sdk='globus_sdk' in packages,
+            ))
+    return results
+
+
+RUNNERS = {
+    'download': bench_download,
+    'transfer': bench_transfer,
+    'ingest': bench_ingest,
+    'flows': bench_flows,
+    'manifest': bench_manifest,
+    'startup': bench_startup,
+}
+
+
+def format_results(results: list[dict]) -> str:
+    lines = [f"{'Benchmark':<26} {'count':>9} {'unit':<8} {'elapsed s':>9} {'per s':>10} {'p50 ms':>8} {'p95 ms':>8}  details"]
+    for r in results:
+        per_s = f"{r['per_s']:>10.1f}" if r['per_s'] else f"{'-':>10}"
+        p50 = f"{r['p50_ms']:>8.1f}" if r['p50_ms'] is not None else f"{'-':>8}"
+        p95 = f"{r['p95_ms']:>8.1f}" if r['p95_ms'] is not None else f"{'-':>8}"
+        common_keys = {'benchmark', 'count', 'unit', 'elapsed_s', 'per_s', 'p50_ms', 'p95_ms', 'max_ms'}
+        details = ', '.join(
+            f'{k}={v:.3g}' if isinstance(v, float) else f'{k}={v}'
+            for k, v in r.items() if k not in common_keys
+        )
+        lines.append(f"{r['benchmark']:<26} {r['count']:>9} {r['unit']:<8} {r['elapsed_s']:>9.2f} {per_s} {p50} {p95}  {details}")
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    selected = args.benchmarks or BENCHMARKS
+
+    from apecx_common import scheduler
+
+    results = []
+    proc = None
+    try:
+        for name in selected:
+            if name not in LOCAL_BENCHMARKS and proc is None:
+                proc, base_url = start_standin(args, listing_size=args.listing, file_size=args.file_size)
+                configure_clients(args, base_url)
+            print(f'Running {name}...', flush=True)
+            results.extend(RUNNERS[name](args))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    print()
+    print(format_results(results))
+    if proc is not None:
+        print()
+        print(scheduler.format_stats())
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'args': vars(args), 'results': results, 'scheduler': scheduler.stats()}, f, indent=2)
+        print(f'Wrote results to {args.json}')
@@ -0,0 +1,252 @@
+"""
+Start one flow run per input, for thousands of inputs, without launching anything twice
+
+`make_flow.run_flow` starts a single run. For a backlog (eg one run per dataset folder), this script:
+
+* Streams run inputs from a JSON lines file (one input body per line), so the backlog never needs to fit in memory
+* Validates each input locally against the flow's `input_schema.json`, so a typo fails here rather than in the service
+* Gives each input a deterministic label and tag, derived from a hash of the input. Inputs that already have an
+    active or succeeded run with that tag are skipped, so re-running the script is safe.
+* Starts runs concurrently, under a configurable rate limit
+* Appends every launched run to a checkpoint file as it goes. After a crash, re-run the same command: inputs whose
+    checkpointed run is still active (or succeeded) are skipped, while inputs whose run has since FAILED or ENDED are
+    launched again. Most runs are confirmed by the same bulk listing; only the rest are looked up one by one.
+
+This script is called via CLI, eg:
+    python launch_batch.py inputs.jsonl --flow validate_in_place --rate 2 --checkpoint launched.jsonl
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import json
+import logging
+import os
+import threading
+import typing as t
+
+from make_flow import DATA_DIR, DEMO_CLIENT_ID, run_flow
+import registry
+from apecx_common import scheduler, tracing  # make_flow puts the repository root on sys.path
+
+if t.TYPE_CHECKING:
+    from globus_sdk import FlowsClient, SpecificFlowClient
+
+
+logger = logging.getLogger(__name__)
+
+BATCH_TAG = 'apecx-batch'
+# A run in one of these states means "this input is handled"; FAILED/ENDED inputs may be launched again
+DONE_OR_RUNNING = ['ACTIVE', 'INACTIVE', 'SUCCEEDED']
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('inputs', help='JSON lines file, one run input body per line')
+    parser.add_argument('--flow', default='validate_in_place', help='Name of a flow deployed by make_flow.py')
+    parser.add_argument('--flow-id', help='Use this flow ID instead of looking up --flow in the local registry')
+    parser.add_argument('--label-prefix', default='batch', help='Prefix for the deterministic run labels')
+    parser.add_argument('--rate', type=float, default=1.0, help='Max runs started per second')
+    parser.add_argument('--burst', type=int, default=5, help='Max runs started at once after an idle period')
+    parser.add_argument('--workers', type=int, default=8, help='Max concurrent run_flow requests')
+    parser.add_argument('--checkpoint', default='launched.jsonl', help='Append-only record of launched runs')
+    parser.add_argument('--dry-run', help='Validate and de-duplicate inputs, but do not start runs', action='store_true')
+    parser.add_argument('-v', help='Verbose output', action='store_true')
+    parser.add_argument('--trace', help=tracing.TRACE_HELP)
+    return parser.parse_args()
+
+
+def input_key(body: dict) -> str:
+    """A stable ID for an input: the same body always gets the same key, regardless of key order or whitespace"""
+    canonical = json.dumps(body, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:24]
+
+
+def key_tag(key: str) -> str:
+    return f'input-{key}'
+
+
+def load_checkpoint(fn: str) -> dict:
+    """{input key: run ID} for every run in the checkpoint file. If an input was launched more than once, the latest."""
+    if not os.path.exists(fn):
+        return {}
+    runs = {}
+    with open(fn, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                # A crash mid-write can leave a partial final line; everything before it is still valid
+                try:
+                    record = json.loads(line)
+                    runs[record['key']] = record['run_id']
+                except (ValueError, KeyError):
+                    logger.warning(f'Ignoring malformed checkpoint line: {line[:80]}')
+    return runs
+
+
+def find_launched_keys(client: 'FlowsClient', flow_id: str) -> set:
+    """Keys of inputs that already have an active or succeeded batch run, per the service (one paginated listing)"""
+    keys = set()
+    marker = None
+    while True:
+        resp = client.list_runs(
+            filter_flow_id=flow_id,
+            marker=marker,
+            query_params={'filter_tags': BATCH_TAG, 'filter_status': ','.join(DONE_OR_RUNNING)},
+        )
+        for run in resp.data.get('runs', []):
+            if run.get('status') not in DONE_OR_RUNNING:
+                continue
+            for tag in run.get('tags', []):
+                if tag.startswith('input-'):
+                    keys.add(tag[len('input-'):])
+        if not resp.data.get('has_next_page'):
+            return keys
+        marker = resp.data['marker']
+
+
+def confirm_checkpointed(client: 'FlowsClient', checkpointed: dict, launched: set, workers: int = 8) -> set:
+    """
+    Keys from the checkpoint whose run is still active or succeeded, and so should not be launched again
+
+    Runs already in `launched` (the service's own listing) need no further calls. The rest are looked up one by one:
+        usually they FAILED or ENDED, and their input is launched again. A run that was started moments ago may not
+        be listed yet, which is why we don't just relaunch everything missing from the listing.
+    """
+    from globus_sdk import GlobusAPIError
+
+    unconfirmed = {key: run_id for key, run_id in checkpointed.items() if key not in launched}
+
+    def status(run_id):
+        try:
+            return client.get_run(run_id).data['status']
+        except GlobusAPIError as e:
+            if e.http_status != 404:
+                raise e
+            # Deleted, or started by someone else's credentials; either way, nothing to wait for
+            return None
+
+    keys = set()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for (key, run_id), run_status in zip(unconfirmed.items(), pool.map(status, unconfirmed.values())):
+            if run_status in DONE_OR_RUNNING:
+                keys.add(key)
+            else:
+                logger.info(f'Input {key}: checkpointed run {run_id} is {run_status or "gone"}; it will be launched again')
+    return keys
+
+
+def iter_inputs(fn: str, schema: dict):
+    """Yield (line number, key, body) for each valid input. Invalid lines are logged and skipped."""
+    import jsonschema
+
+    validator = jsonschema.Draft7Validator(schema)
+    with open(fn, 'r') as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                body = json.loads(line)
+            except ValueError as e:
+                logger.error(f'Line {line_no}: not valid JSON ({e})')
+                continue
+            errors = sorted(validator.iter_errors(body), key=lambda e: list(e.path))
+            if errors:
+                logger.error(f'Line {line_no}: input does not match the flow input schema: {errors[0].message}')
+                continue
+            yield line_no, input_key(body), body
+
+
+def launch_all(sfc: 'SpecificFlowClient', inputs, skip: set, checkpoint_fn: str, limiter: scheduler.ServiceLimiter,
+               label_prefix: str = 'batch', workers: int = 8, dry_run: bool = False) -> dict:
+    """Start a run for every input not in `skip`. Returns counts of what happened."""
+    counts = {'launched': 0, 'skipped': 0, 'failed': 0}
+    lock = threading.Lock()
+    # Never queue more work than the pool can pick up soon; the input file may be huge
+    slots = threading.BoundedSemaphore(workers * 2)
+
+    with open(checkpoint_fn, 'a') as checkpoint:
+        def launch(line_no, key, body):
+            try:
+                limiter.acquire_token()
+                run_id, status = run_flow(
+                    sfc,
+                    body,
+                    label=f'{label_prefix} {key}',
+                    tags=['apecx', BATCH_TAG, key_tag(key)],
+                )
+            except Exception as e:
+                logger.error(f'Line {line_no}: could not start run: {e}')
+                with lock:
+                    counts['failed'] += 1
+                return
+            finally:
+                slots.release()
+
+            with lock:
+                counts['launched'] += 1
+                checkpoint.write(json.dumps({'key': key, 'run_id': run_id, 'status': status, 'line': line_no}) + '\n')
+                # Flush every record: the checkpoint is only useful if it survives a crash
+                checkpoint.flush()
+                os.fsync(checkpoint.fileno())
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for line_no, key, body in inputs:
+                if key in skip:
+                    counts['skipped'] += 1
+                    continue
+                # The same input may appear twice in one file
+                skip.add(key)
+                if dry_run:
+                    counts['launched'] += 1
+                    continue
+                slots.acquire()
+                pool.submit(launch, line_no, key, body)
+    return counts
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    if args.v:
+        logging.basicConfig(level=logging.INFO)
+    tracing.enable(args.trace)
+
+    flow_id = args.flow_id
+    if not flow_id:
+        entry = registry.load_registry()['flows'].get(args.flow)
+        if not entry:
+            raise SystemExit(f'Flow "{args.flow}" is not in the local registry; deploy it with make_flow.py or pass --flow-id')
+        flow_id = entry['id']
+
+    with open(os.path.join(DATA_DIR, args.flow, 'input_schema.json'), 'r') as f:
+        schema = json.load(f)
+
+    from globus_sdk import FlowsClient, SpecificFlowClient, UserApp
+
+    app = UserApp(client_id=DEMO_CLIENT_ID)
+    fc = scheduler.install(FlowsClient(app=app))
+    sfc = scheduler.install(SpecificFlowClient(flow_id, app=app))
+
+    checkpointed = load_checkpoint(args.checkpoint)
+    logger.info(f'{len(checkpointed)} inputs already launched according to {args.checkpoint}')
+    skip = find_launched_keys(fc, flow_id)
+    skip |= confirm_checkpointed(fc, checkpointed, skip, workers=args.workers)
+    logger.info(f'{len(skip)} inputs have an active or succeeded run (checkpoint + service)')
+
+    counts = launch_all(
+        sfc,
+        iter_inputs(args.inputs, schema),
+        skip,
+        args.checkpoint,
+        # The same token bucket the scheduler uses per service, here to pace run starts specifically
+        scheduler.ServiceLimiter('run_flow', rate=args.rate, burst=args.burst, max_concurrent=args.workers),
+        label_prefix=args.label_prefix,
+        workers=args.workers,
+        dry_run=args.dry_run,
+    )
+    print(f"Launched {counts['launched']}, skipped {counts['skipped']} already launched, {counts['failed']} failed to start")
+    if args.v:
+        # Many throttled calls mean --rate or --workers is higher than the service will accept
+        print(scheduler.format_stats())
+    if not args.dry_run:
+        print(f'Watch progress with: python monitor.py --flow-id {flow_id} --tag {BATCH_TAG}')
@@ -0,0 +1,615 @@
+"""
+Run a flow definition locally, with in-process stand-ins for the Globus action providers
+
+Every change to `flow.json` normally costs an `update_flow` call plus a live run that takes minutes (most of it spent
+    waiting on transfers). While iterating on the *logic* of a flow (choices, expressions, paths), that's slow. This
+    module interprets the same JSON definitions on your own computer, in milliseconds:
+
+* States: `Action`, `Choice` (including `And`/`Or`/`Not`), `ExpressionEval`, `Pass`, `Wait`, `Fail`
+* `Parameters` with `.$` (JSONPath) and `.=` (expression) keys, `ResultPath`, `Catch`, `ExceptionOnActionFailure`
+* `InputPath` on `Pass` and `Action` states (for an `Action`, the action's body when it has no `Parameters`)
+* `ActionUrl`s are dispatched to plain python callables. Stand-ins are provided for transfer stat/mkdir/transfer
+    (backed by local folders), compute (backed by local python functions) and search ingest (kept in memory).
+
+Every step is timed, so the result doubles as a profile of the flow logic. This is *not* a faithful copy of the hosted
+    service (permissions, retries, real transfer behavior, and many expression functions are missing). Use it to catch
+    logic errors before deploying, then test for real.
+
+This script can be called via CLI, eg:
+    python local_engine.py data/validate_in_place/flow.json input.json \\
+        --collection dba0d7c0-...=/tmp/source --collection e0bf746e-...=/share/gcs-demo \\
+        --function 1234-...=make_flow:_file_validation_func
+"""
+import argparse
+import ast
+import fnmatch
+import importlib
+import json
+import logging
+import os
+import re
+import shutil
+import sys
+import time
+import typing as t
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from apecx_common import tracing  # noqa: E402
+
+
+logger = logging.getLogger(__name__)
+
+
+class FlowFailed(Exception):
+    """A `Fail` state was reached, or an error was not caught"""
+    def __init__(self, error: str, cause: str = None):
+        super().__init__(f'{error}: {cause}')
+        self.error = error
+        self.cause = cause
+
+
+class ActionFailed(Exception):
+    """Raised by an action stand-in to report a failed action. `details` is stored as the action's result details."""
+    def __init__(self, details: dict = None, code: str = 'ActionFailedException'):
+        super().__init__(details)
+        self.details = details or {}
+        self.code = code
+
+
+#######################
+# JSONPath (the small subset used by flow definitions: `$`, `.key` and `[index]`)
+PATH_TOKEN_RE = re.compile(r'\.([^.\[\]]+)|\[(\d+)\]')
+
+
+def parse_path(path: str) -> list:
+    if not path.startswith('$'):
+        raise ValueError(f'Not a JSONPath: {path}')
+    parts = []
+    pos = 1
+    while pos < len(path):
+        m = PATH_TOKEN_RE.match(path, pos)
+        if not m:
+            raise ValueError(f'Unsupported JSONPath syntax: {path}')
+        parts.append(m.group(1) if m.group(1) is not None else int(m.group(2)))
+        pos = m.end()
+    return parts
+
+
+def get_path(doc, path: str):
+    value = doc
+    for part in parse_path(path):
+        try:
+            value = value[part]
+        except (KeyError, IndexError, TypeError):
+            raise FlowFailed('States.Runtime', f'Path {path} does not exist in the run state')
+    return value
+
+
+def set_path(doc: dict, path: str, value) -> dict:
+    """Returns the new state document (replaced entirely when the path is `$`)"""
+    parts = parse_path(path)
+    if not parts:
+        return value
+    target = doc
+    for part in parts[:-1]:
+        target = target.setdefault(part, {})
+    target[parts[-1]] = value
+    return doc
+
+
+#######################
+# Expressions (`.=` keys). A python-like subset, with dict keys readable as attributes and backtick JSONPaths.
+BACKTICK_RE = re.compile(r'`([^`]*)`')
+
+
+class _Evaluator:
+    BIN_OPS = {
+        ast.Add: lambda a, b: a + b,
+        ast.Sub: lambda a, b: a - b,
+        ast.Mult: lambda a, b: a * b,
+        ast.Div: lambda a, b: a / b,
+        ast.Mod: lambda a, b: a % b,
+    }
+    CMP_OPS = {
+        ast.Eq: lambda a, b: a == b,
+        ast.NotEq: lambda a, b: a != b,
+        ast.Lt: lambda a, b: a < b,
+        ast.LtE: lambda a, b: a <= b,
+        ast.Gt: lambda a, b: a > b,
+        ast.GtE: lambda a, b: a >= b,
+        ast.In: lambda a, b: a in b,
+        ast.NotIn: lambda a, b: a not in b,
+        ast.Is: lambda a, b: a is b,
+        ast.IsNot: lambda a, b: a is not b,
+    }
+    FUNCTIONS = {
+        'len': len, 'str': str, 'int': int, 'float': float, 'bool': bool,
+        'min': min, 'max': max, 'abs': abs, 'round': round,
+    }
+
+    def __init__(self, names: dict):
+        self.names = names
+
+    def eval(self, node):
+        method = getattr(self, f'_{type(node).__name__}', None)
+        if method is None:
+            raise FlowFailed('States.Runtime', f'Unsupported expression syntax: {type(node).__name__}')
+        return method(node)
+
+    def _Expression(self, node):
+        return self.eval(node.body)
+
+    def _Constant(self, node):
+        return node.value
+
+    def _Name(self, node):
+        if node.id in ('True', 'False', 'None'):
+            return {'True': True, 'False': False, 'None': None}[node.id]
+        if node.id not in self.names:
+            raise FlowFailed('States.Runtime', f'Unknown name in expression: {node.id}')
+        return self.names[node.id]
+
+    def _Attribute(self, node):
+        value = self.eval(node.value)
+        if isinstance(value, dict):
+            if node.attr not in value:
+                raise FlowFailed('States.Runtime', f'Unknown key in expression: {node.attr}')
+            return value[node.attr]
+        raise FlowFailed('States.Runtime', f'Cannot read .{node.attr} of a {type(value).__name__}')
+
+    def _Subscript(self, node):
+        return self.eval(node.value)[self.eval(node.slice)]
+
+    def _List(self, node):
+        return [self.eval(e) for e in node.elts]
+
+    def _Tuple(self, node):
+        return tuple(self.eval(e) for e in node.elts)
+
+    def _Dict(self, node):
+        return {self.eval(k): self.eval(v) for k, v in zip(node.keys, node.values)}
+
+    def _BoolOp(self, node):
+        if isinstance(node.op, ast.And):
+            result = True
+            for v in node.values:
+                result = self.eval(v)
+                if not result:
+                    return result
+            return result
+        result = False
+        for v in node.values:
+            result = self.eval(v)
+            if result:
+                return result
+        return result
+
+    def _UnaryOp(self, node):
+        value = self.eval(node.operand)
+        if isinstance(node.op, ast.Not):
+            return not value
+        elif isinstance(node.op, ast.USub):
+            return -value
+        return value
+
+    def _BinOp(self, node):
+        op = self.BIN_OPS.get(type(node.op))
+        if op is None:
+            raise FlowFailed('States.Runtime', f'Unsupported operator: {type(node.op).__name__}')
+        return op(self.eval(node.left), self.eval(node.right))
+
+    def _Compare(self, node):
+        left = self.eval(node.left)
+        for op, comparator in zip(node.ops, node.comparators):
+            right = self.eval(comparator)
+            if not self.CMP_OPS[type(op)](left, right):
+                return False
+            left = right
+        return True
+
+    def _IfExp(self, node):
+        return self.eval(node.body) if self.eval(node.test) else self.eval(node.orelse)
+
+    def _Call(self, node):
+        if not isinstance(node.func, ast.Name) or node.func.id not in self.FUNCTIONS:
+            raise FlowFailed('States.Runtime', 'Only simple built-in functions can be called in expressions')
+        return self.FUNCTIONS[node.func.id](*[self.eval(a) for a in node.args])
+
+
+def evaluate_expression(expr: str, state: dict):
+    names = dict(state)
+
+    def substitute(m):
+        # Bind each backtick JSONPath to a placeholder name, rather than pasting its value into the source text
+        name = f'__path_{len(names)}'
+        names[name] = get_path(state, m.group(1))
+        return name
+
+    source = BACKTICK_RE.sub(substitute, expr)
+    try:
+        tree = ast.parse(source.strip(), mode='eval')
+    except SyntaxError as e:
+        raise FlowFailed('States.Runtime', f'Invalid expression {expr!r}: {e}')
+    return _Evaluator(names).eval(tree)
+
+
+def resolve_parameters(template, state: dict):
+    """Fill in `.$` (path) and `.=` (expression) keys, recursively"""
+    if isinstance(template, list):
+        return [resolve_parameters(v, state) for v in template]
+    if not isinstance(template, dict):
+        return template
+
+    result = {}
+    for key, value in template.items():
+        if key.endswith('.$'):
+            result[key[:-2]] = get_path(state, value)
+        elif key.endswith('.='):
+            result[key[:-2]] = evaluate_expression(value, state)
+        else:
+            result[key] = resolve_parameters(value, state)
+    return result
+
+
+#######################
+# Choice rules
+COMPARATORS = {
+    'StringEquals': lambda a, b: isinstance(a, str) and a == b,
+    'StringLessThan': lambda a, b: isinstance(a, str) and a < b,
+    'StringGreaterThan': lambda a, b: isinstance(a, str) and a > b,
+    'StringMatches': lambda a, b: isinstance(a, str) and fnmatch.fnmatchcase(a, b),
+    'NumericEquals': lambda a, b: isinstance(a, (int, float)) and a == b,
+    'NumericLessThan': lambda a, b: isinstance(a, (int, float)) and a < b,
+    'NumericLessThanEquals': lambda a, b: isinstance(a, (int, float)) and a <= b,
+    'NumericGreaterThan': lambda a, b: isinstance(a, (int, float)) and a > b,
+    'NumericGreaterThanEquals': lambda a, b: isinstance(a, (int, float)) and a >= b,
+    'BooleanEquals': lambda a, b: isinstance(a, bool) and a == b,
+    'IsNull': lambda a, b: (a is None) == b,
+    'IsString': lambda a, b: isinstance(a, str) == b,
+    'IsNumeric': lambda a, b: isinstance(a, (int, float)) == b,
+    'IsBoolean': lambda a, b: isinstance(a, bool) == b,
+}
+
+
+def rule_matches(rule: dict, state: dict) -> bool:
+    if 'And' in rule:
+        return all(rule_matches(r, state) for r in rule['And'])
+    if 'Or' in rule:
+        return any(rule_matches(r, state) for r in rule['Or'])
+    if 'Not' in rule:
+        return not rule_matches(rule['Not'], state)
+
+    variable = rule['Variable']
+    try:
+        value = get_path(state, variable)
+        present = True
+    except FlowFailed:
+        value, present = None, False
+
+    if 'IsPresent' in rule:
+        return present == rule['IsPresent']
+    if not present:
+        # Same as the hosted service: comparing a missing variable is an error, not "false"
+        raise FlowFailed('States.Runtime', f'Choice variable {variable} does not exist in the run state')
+
+    for key, compare in COMPARATORS.items():
+        if key in rule:
+            return compare(value, rule[key])
+        if f'{key}Path' in rule:
+            return compare(value, get_path(state, rule[f'{key}Path']))
+    raise FlowFailed('States.Runtime', f'Unsupported choice rule: {sorted(rule)}')
+
+
+#######################
+# The engine
+class LocalFlowEngine:
+    def __init__(self, definition: dict, actions: dict[str, t.Callable] = None, flow_id: str = None):
+        """
+        :param definition: A flow definition, as in `flow.json`
+        :param actions: {ActionUrl: callable(parameters: dict) -> details dict}. Raise ActionFailed to fail an action.
+        """
+        self.definition = definition
+        self.actions = actions or {}
+        self.flow_id = flow_id or str(uuid.uuid4())
+
+    def run(self, flow_input: dict, run_id: str = None, max_steps: int = 1000) -> dict:
+        """
+        Execute the flow. Never raises for flow-level failures; check the returned `status`.
+
+        Returns {run_id, status, output, error, steps: [{state, type, duration_ms, ...}], duration_ms}
+        """
+        run_id = run_id or str(uuid.uuid4())
+        state = json.loads(json.dumps(flow_input))
+        state['_context'] = {'flow_id': self.flow_id, 'run_id': run_id}
+
+        steps = []
+        status, error = 'SUCCEEDED', None
+        current = self.definition['StartAt']
+        start = time.perf_counter()
+        try:
+            for _ in range(max_steps):
+                step_def = self.definition['States'][current]
+                step_start = time.perf_counter()
+                step = {'state': current, 'type': step_def['Type']}
+                try:
+                    with tracing.span(f'state {current}', type=step_def['Type']):
+                        state, next_state = self.execute_state(current, step_def, state, step)
+                finally:
+                    step['duration_ms'] = (time.perf_counter() - step_start) * 1000
+                    steps.append(step)
+                    logger.debug(f"{current} ({step['type']}) took {step['duration_ms']:.2f} ms")
+                if next_state is None:
+                    break
+                current = next_state
+            else:
+                raise FlowFailed('States.Runtime', f'Exceeded {max_steps} steps; is there a loop?')
+        except FlowFailed as e:
+            status, error = 'FAILED', {'error': e.error, 'cause': e.cause, 'state': current}
+
+        if isinstance(state, dict):
+            state.pop('_context', None)
+        return {
+            'run_id': run_id,
+            'status': status,
+            'output': state,
+            'error': error,
+            'steps': steps,
+            'duration_ms': (time.perf_counter() - start) * 1000,
+        }
+
+    def execute_state(self, name: str, step_def: dict, state: dict, step: dict) -> (dict, str):
+        """Run one state. Returns (new state, name of next state or None at the end)."""
+        kind = step_def['Type']
+        next_state = None if step_def.get('End') else step_def.get('Next')
+
+        if kind == 'Pass':
+            value = get_path(state, step_def['InputPath']) if 'InputPath' in step_def else state
+            if 'Parameters' in step_def:
+                value = resolve_parameters(step_def['Parameters'], state)
+            elif 'Result' in step_def:
+                value = step_def['Result']
+            return set_path(state, step_def.get('ResultPath', '$'), json.loads(json.dumps(value))), next_state
+
+        if kind == 'ExpressionEval':
+            value = resolve_parameters(step_def.get('Parameters', {}), state)
+            return set_path(state, step_def.get('ResultPath', '$'), value), next_state
+
+        if kind == 'Choice':
+            for rule in step_def.get('Choices', []):
+                if rule_matches(rule, state):
+                    step['choice'] = rule['Next']
+                    return state, rule['Next']
+            if 'Default' not in step_def:
+                raise FlowFailed('States.NoChoiceMatched', f'No choice matched in {name}')
+            step['choice'] = step_def['Default']
+            return state, step_def['Default']
+
+        if kind == 'Wait':
+            # Simulated: record how long the hosted service would wait, but don't actually sleep
+            step['simulated_wait_sec'] = step_def.get('Seconds') or get_path(state, step_def.get('SecondsPath', '$'))
+            return state, next_state
+
+        if kind == 'Fail':
+            raise FlowFailed(step_def.get('Error', 'States.Fail'), step_def.get('Cause'))
+
+        if kind == 'Action':
+            state, catch_next = self.execute_action(name, step_def, state, step)
+            # A matching `Catch` overrides the state's own Next
+            return state, catch_next or next_state
+
+        raise FlowFailed('States.Runtime', f'Unsupported state type {kind} in {name}')
+
+    def execute_action(self, name: str, step_def: dict, state: dict, step: dict) -> (dict, str):
+        """Returns (new state, name of the `Catch` target if an error was caught, else None)"""
+        url = step_def['ActionUrl']
+        step['action_url'] = url
+        handler = self.actions.get(url.rstrip('/'))
+        if handler is None:
+            raise FlowFailed('ActionUnableToRun', f'No local stand-in registered for {url}')
+
+        if 'Parameters' in step_def or 'InputPath' not in step_def:
+            params = resolve_parameters(step_def.get('Parameters', {}), state)
+        else:
+            # As in the hosted service, an Action uses either `Parameters` or `InputPath` to build the action's body
+            params = json.loads(json.dumps(get_path(state, step_def['InputPath'])))
+        result = {'action_id': str(uuid.uuid4()), 'status': 'SUCCEEDED', 'details': None}
+        try:
+            result['details'] = handler(params)
+        except ActionFailed as e:
+            step['failed'] = True
+            result.update(status='FAILED', details=e.details)
+            if step_def.get('ExceptionOnActionFailure'):
+                return self.handle_error(name, step_def, state, e.code, e.details, step)
+        except FlowFailed:
+            raise
+        except Exception as e:
+            # A crash in the stand-in is "unable to run", same as an unreachable action provider
+            logger.exception(f'Local stand-in for {url} raised an error')
+            return self.handle_error(name, step_def, state, 'ActionUnableToRun', {'message': str(e)}, step)
+
+        return set_path(state, step_def.get('ResultPath', '$'), result), None
+
+    def handle_error(self, name: str, step_def: dict, state: dict, code: str, details: dict, step: dict) -> (dict, str):
+        for catcher in step_def.get('Catch', []):
+            errors = catcher.get('ErrorEquals', [])
+            if code in errors or 'States.ALL' in errors:
+                step['caught'] = code
+                state = set_path(state, catcher.get('ResultPath', '$'), {'Error': code, 'Cause': details})
+                return state, catcher['Next']
+        raise FlowFailed(code, json.dumps(details))
+
+
+#######################
+# Stand-ins for Globus action providers
+TRANSFER_STAT_URL = 'https://transfer.actions.globus.org/stat'
+TRANSFER_MKDIR_URL = 'https://transfer.actions.globus.org/mkdir'
+TRANSFER_URL = 'https://transfer.actions.globus.org/transfer'
+COMPUTE_URL = 'https://compute.actions.globus.org'
+SEARCH_INGEST_URL = 'https://actions.globus.org/search/ingest'
+
+
+class LocalTransfer:
+    """Pretend each collection ID is a local folder"""
+    def __init__(self, collections: dict[str, str]):
+        self.collections = collections
+
+    def local_path(self, endpoint_id: str, path: str) -> str:
+        if endpoint_id not in self.collections:
+            raise ActionFailed({'code': 'EndpointNotFound', 'message': f'No local folder for collection {endpoint_id}'})
+        root = os.path.realpath(self.collections[endpoint_id])
+        fn = os.path.realpath(os.path.join(root, path.lstrip('/')))
+        if os.path.commonpath([fn, root]) != root:
+            raise ActionFailed({'code': 'PermissionDenied', 'message': f'{path} is outside the collection'})
+        return fn
+
+    def stat(self, params: dict) -> dict:
+        fn = self.local_path(params['endpoint_id'], params['path'])
+        if not os.path.exists(fn):
+            raise ActionFailed({'code': 'NotFound', 'message': f"{params['path']} does not exist"})
+        st = os.stat(fn)
+        return {
+            'name': os.path.basename(fn.rstrip('/')),
+            'type': 'dir' if os.path.isdir(fn) else 'file',
+            'size': st.st_size,
+            'last_modified': time.strftime('%Y-%m-%d %H:%M:%S+00:00', time.gmtime(st.st_mtime)),
+        }
+
+    def mkdir(self, params: dict) -> dict:
+        fn = self.local_path(params['endpoint_id'], params['path'])
+        if os.path.exists(fn):
+            raise ActionFailed({'code': 'ExternalError.MkdirFailed.Exists', 'message': f"{params['path']} exists"})
+        os.makedirs(fn)
+        return {'code': 'DirectoryCreated'}
+
+    @staticmethod
+    def _included(name: str, is_dir: bool, rules: list[dict]) -> bool:
+        # First matching rule wins; anything not matched is included (same as Transfer)
+        for rule in rules:
+            rule_type = rule.get('type')
+            if rule_type and rule_type != ('dir' if is_dir else 'file'):
+                continue
+            if fnmatch.fnmatchcase(name, rule['name']):
+                return rule['method'] == 'include'
+        return True
+
+    def transfer(self, params: dict) -> dict:
+        rules = params.get('filter_rules', [])
+        files = 0
+        nbytes = 0
+        for item in params['DATA']:
+            src = self.local_path(params['source_endpoint'], item['source_path'])
+            dst = self.local_path(params['destination_endpoint'], item['destination_path'])
+            if not os.path.exists(src):
+                raise ActionFailed({'code': 'NotFound', 'message': f"{item['source_path']} does not exist"})
+            if os.path.isfile(src):
+                os.makedirs(os.path.dirname(dst), exist_ok=True)
+                shutil.copy2(src, dst)
+                files, nbytes = files + 1, nbytes + os.path.getsize(src)
+                continue
+            for dirpath, dirnames, filenames in os.walk(src):
+                dirnames[:] = [d for d in dirnames if self._included(d, True, rules)]
+                for fn in filenames:
+                    if not self._included(fn, False, rules):
+                        continue
+                    rel = os.path.relpath(os.path.join(dirpath, fn), src)
+                    os.makedirs(os.path.dirname(os.path.join(dst, rel)), exist_ok=True)
+                    shutil.copy2(os.path.join(dirpath, fn), os.path.join(dst, rel))
+                    files, nbytes = files + 1, nbytes + os.path.getsize(os.path.join(dirpath, fn))
+        return {'status': 'SUCCEEDED', 'files_transferred': files, 'bytes_transferred': nbytes}
+
+
+class LocalCompute:
+    """Pretend each registered function UUID is a local python function"""
+    def __init__(self, functions: dict[str, t.Callable]):
+        self.functions = functions
+
+    def __call__(self, params: dict) -> dict:
+        func = self.functions.get(params['function'])
+        if func is None:
+            raise ActionFailed({'message': f"No local function for {params['function']}"}, code='ActionUnableToRun')
+        try:
+            output = func(*params.get('args', []), **params.get('kwargs', {}))
+        except Exception as e:
+            raise ActionFailed({'message': f'{type(e).__name__}: {e}'})
+        return {'results': [{'output': output}]}
+
+
+class LocalSearch:
+    """Keep ingested documents in memory, so a test can inspect them"""
+    def __init__(self):
+        self.ingested = []
+
+    def ingest(self, params: dict) -> dict:
+        self.ingested.append(params)
+        return {'index': params.get('search_index'), 'subject': params.get('subject')}
+
+
+def default_actions(collections: dict[str, str] = None, functions: dict[str, t.Callable] = None) -> dict:
+    transfer = LocalTransfer(collections or {})
+    search = LocalSearch()
+    return {
+        TRANSFER_STAT_URL: transfer.stat,
+        TRANSFER_MKDIR_URL: transfer.mkdir,
+        TRANSFER_URL: transfer.transfer,
+        COMPUTE_URL: LocalCompute(functions or {}),
+        SEARCH_INGEST_URL: search.ingest,
+    }
+
+
+def format_timings(result: dict) -> str:
+    lines = [f"{'State':<28} {'Type':<15} {'ms':>10}"]
+    for step in result['steps']:
+        note = step.get('choice') or step.get('caught') or ('FAILED' if step.get('failed') else '')
+        lines.append(f"{step['state']:<28} {step['type']:<15} {step['duration_ms']:>10.3f}  {note}")
+    lines.append(f"{'Total':<44} {result['duration_ms']:>10.3f}")
+    return '\n'.join(lines)
+
+
+def parse_mapping(value: str) -> (str, str):
+    """Parse CLI `key=value` pairs"""
+    key, sep, rest = value.partition('=')
+    if not sep or not key or not rest:
+        raise ValueError('Must specify `id=value`')
+    return key, rest
+
+
+def load_function(spec: str) -> t.Callable:
+    module_name, _, func_name = spec.partition(':')
+    return getattr(importlib.import_module(module_name), func_name)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('flow', help='Path to a flow definition, eg data/validate_in_place/flow.json')
+    parser.add_argument('input', help='Path to a JSON file with the run input')
+    parser.add_argument('--collection', action='append', default=[], type=parse_mapping, help='COLLECTION_ID=/local/folder')
+    parser.add_argument('--function', action='append', default=[], type=parse_mapping, help='FUNCTION_UUID=module:function')
+    parser.add_argument('-v', help='Verbose output', action='store_true')
+    parser.add_argument('--trace', help=tracing.TRACE_HELP)
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    if args.v:
+        logging.basicConfig(level=logging.DEBUG)
+    tracing.enable(args.trace)
+
+    with open(args.flow, 'r') as f:
+        definition = json.load(f)
+    with open(args.input, 'r') as f:
+        flow_input = json.load(f)
+
+    engine = LocalFlowEngine(definition, default_actions(
+        collections=dict(args.collection),
+        functions={func_id: load_function(spec) for func_id, spec in args.function},
+    ))
+    result = engine.run(flow_input)
+
+    print(format_timings(result))
+    print(f"Run {result['run_id']} {result['status']}")
+    if result['error']:
+        print(json.dumps(result['error'], indent=2))
+    else:
+        print(json.dumps(result['output'], indent=2))
@@ -8,61 +8,381 @@ Generate and run an example workflow with the following steps:
 """
 
 
+import argparse
+import ast
+import asyncio
+import inspect
 import json
+import linecache
 import logging
+import os
 from pprint import pp
-import time
+import sys
+import textwrap
 import typing as t
 
-from globus_sdk import FlowsClient, UserApp, GlobusHTTPResponse, FlowsAPIError, SpecificFlowClient
-from globus_compute_sdk import Client as ComputeClient
+from monitor import wait_for_runs
+import registry
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from apecx_common import aio, tracing  # noqa: E402
+
+if t.TYPE_CHECKING:
+    # The SDKs are slow to import, so they are loaded only where used: after parsing arguments (so `--help` is
+    #   instant), and only the compute SDK when deploying (launch_batch, monitor and profile_runs import this module
+    #   for run_flow and friends)
+    from globus_compute_sdk import Client as ComputeClient
+    from globus_sdk import FlowsClient, SpecificFlowClient
 
 
 logger = logging.getLogger(__name__)
 
+# The Globus oauth native/thick client used by this demo. Substitute your own.
+DEMO_CLIENT_ID = "5f4fc571-4fa2-4d84-ab6e-567d5245af7a"
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+# Example flows managed by this script, by name. Each has a `flow.json` and `input_schema.json` in `data/<name>/`.
+FLOWS = {
+    'validate_in_place': {'title': 'Example flow: validate in place'},
+    'transfer_with_filters': {'title': 'Example flow: transfer with filters'},
+}
+
 #######################
 # Compute functions used to add custom logic into a single step of the workflow
 ######################
-def _file_validation_func(gcs_root=None, path: str=None):
+def _iter_json_array(f, on_chunk=None, chunk_size=64 * 1024):
+    """
+    Yield the items of a top-level JSON array one at a time, holding at most ~one item + one chunk in memory
+
+    Accepts the same documents as `json.load` would for a list: `[`, items separated by exactly one `,`, then `]` and
+        nothing else. `on_chunk` is called with every raw chunk read (eg to hash the file along the way).
+    """
+    import codecs
+    import json
+    import re
+
+    decoder = json.JSONDecoder()
+    # What may still follow a number's digits, up to the end of the buffer
+    number_tail = re.compile(r'[0-9.eE+-]*\Z')
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    buf = ''
+    pos = 0
+    eof = False
+    expect = 'open'
+
+    def fill():
+        nonlocal buf, pos, eof
+        chunk = f.read(chunk_size)
+        if on_chunk is not None:
+            on_chunk(chunk)
+        eof = not chunk
+        # Drop everything already consumed, so the buffer never grows with the size of the file
+        buf = buf[pos:] + text_decoder.decode(chunk, final=eof)
+        pos = 0
+
+    while True:
+        while pos < len(buf) and buf[pos] in ' \t\r\n':
+            pos += 1
+        if pos >= len(buf):
+            if eof:
+                if expect == 'end':
+                    return
+                raise ValueError('Manifest ended before the closing "]"')
+            fill()
+            continue
+
+        c = buf[pos]
+        if expect == 'open':
+            if c != '[':
+                raise ValueError('Manifest must be a JSON list of file entries')
+            expect = 'first'
+            pos += 1
+            continue
+        if expect == 'end':
+            raise ValueError(f'Unexpected {c!r} after the closing "]"')
+        if expect == 'separator':
+            if c not in ',]':
+                raise ValueError(f'Expected "," or "]" after a manifest entry, found {c!r}')
+            expect = 'end' if c == ']' else 'item'
+            pos += 1
+            continue
+        if c == ']' and expect == 'first':
+            expect = 'end'
+            pos += 1
+            continue
+        if c in ',]':
+            raise ValueError(f'Expected a manifest entry, found {c!r}')
+
+        try:
+            item, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            # Most likely the item is split across chunks; read more and retry. At EOF it's genuinely malformed.
+            if eof:
+                raise
+            fill()
+            continue
+        if not eof and (end == len(buf) or (isinstance(item, (int, float)) and number_tail.match(buf, end))):
+            # A number that runs to the end of the buffer may be truncated: `12` of `1234`, or `1` of `1e5` when the
+            #   chunk ends after `1e`. Read more and decode it again.
+            fill()
+            continue
+        pos = end
+        expect = 'separator'
+        yield item
+
+
+def _with_helpers(*helpers: t.Callable):
+    """
+    Ship module-level helper functions along with a compute function
+
+    Globus Compute sends a function to the endpoint as its own source code, and runs it in an empty namespace, so a
+        compute function can't call other functions from this file. This rebuilds the function with each helper's
+        definition at the top of its body. The rebuilt source is what gets registered (and hashed by `registry`), so
+        changing a helper re-registers every function that uses it.
+    """
+    def decorate(func: t.Callable) -> t.Callable:
+        lines = textwrap.dedent(inspect.getsource(func)).splitlines()
+        node = ast.parse('\n'.join(lines)).body[0]
+        body = node.body
+        has_docstring = isinstance(body[0], ast.Expr) and isinstance(body[0].value, ast.Constant) and len(body) > 1
+        insert_at = (body[1] if has_docstring else body[0]).lineno - 1
+        indent = ' ' * body[0].col_offset
+
+        helper_src = ''.join(textwrap.indent(textwrap.dedent(inspect.getsource(h)), indent) + '\n' for h in helpers)
+        # Skip the decorator lines: the endpoint runs the source as-is, where this decorator doesn't exist
+        src = '\n'.join(lines[node.lineno - 1:insert_at]) + '\n' + helper_src + '\n'.join(lines[insert_at:]) + '\n'
+
+        # Keep the source findable by `inspect`, which is how the compute SDK (and `registry`) read functions
+        filename = f'<compute function {func.__name__}>'
+        linecache.cache[filename] = (len(src), None, src.splitlines(True), filename)
+        # A module name that can't be imported makes dill serialize the function by value, as it does for `__main__`,
+        #   rather than as a reference to this file (which the endpoint doesn't have)
+        namespace = {'__name__': filename}
+        exec(compile(src, filename, 'exec'), namespace)
+        return namespace[func.__name__]
+    return decorate
+
+
+@_with_helpers(_iter_json_array)
+def _file_validation_func(gcs_root=None, path: str=None, max_errors: int=20, max_workers: int=16):
     """
     Read an input file at an agreed-upon location accessible to this function
 
     If we want to make this workflow generic, expect that every file validation function will return {status, message, data}.
         Normal file validation errors will fail via `message`, though workflows can also choose to define exception handlers.
+
+    The manifest is a JSON list with one entry per file, eg `[{"path": "a/b.csv", "size": 123}, ...]` (a bare string is
+        shorthand for `{"path": ...}`). Paths are relative to the dataset folder. Manifests can describe millions of
+        files, so we parse them incrementally and return a compact summary instead of echoing the manifest back:
+        everything in `data` ends up in flow state, which has a size limit.
     """
+    from collections import deque
+    from concurrent.futures import ThreadPoolExecutor
+    import hashlib
     import json
     import os
 
     if not gcs_root or not path:
         raise Exception("No input folder specified")
 
-    manifest_fn = os.path.join(gcs_root, path, "manifest.json")
+    dataset_dir = os.path.realpath(os.path.join(gcs_root, path))
+    manifest_fn = os.path.join(dataset_dir, "manifest.json")
     if not os.path.exists(manifest_fn):
         return {
         'status': 'failure',
         'message': f'Manifest file could not be located at {manifest_fn}',
     }
 
-    # The first stab at validation will be: "if a manifest.json file exists, then this can be imported to search"
-    with open(manifest_fn, 'r') as f:
-        manifest = json.load(f)
+    digest = hashlib.sha256()
+
+    def check_entry(entry):
+        """Returns None if the entry is OK, or an error dict"""
+        if isinstance(entry, str):
+            entry = {'path': entry}
+        if not isinstance(entry, dict) or not isinstance(entry.get('path'), str):
+            return {'error': 'invalid', 'entry': entry}
+
+        fn = os.path.realpath(os.path.join(dataset_dir, entry['path']))
+        if os.path.commonpath([fn, dataset_dir]) != dataset_dir:
+            # Never stat things outside the dataset folder on behalf of a manifest author
+            return {'error': 'invalid', 'path': entry['path'], 'detail': 'Path is outside the dataset folder'}
+        try:
+            st = os.stat(fn)
+        except FileNotFoundError:
+            return {'error': 'missing', 'path': entry['path']}
+        except OSError as e:
+            # eg a path through a regular file (`f1.txt/x`), or a folder we may not read: a bad entry, not a crashed task
+            return {'error': 'unreadable', 'path': entry['path'], 'detail': e.strerror}
+        expected = entry.get('size')
+        if expected is not None and st.st_size != expected:
+            return {'error': 'size_mismatch', 'path': entry['path'], 'expected': expected, 'actual': st.st_size}
+        return None
+
+    counts = {'ok': 0, 'missing': 0, 'unreadable': 0, 'size_mismatch': 0, 'invalid': 0}
+    errors = []
+
+    def record(result):
+        if result is None:
+            counts['ok'] += 1
+            return
+        counts[result['error']] += 1
+        if len(errors) < max_errors:
+            errors.append(result)
+
+    # Network filesystems have high per-stat latency, so keep a bounded number of stat calls in flight
+    try:
+        with open(manifest_fn, 'rb') as f, ThreadPoolExecutor(max_workers=max_workers) as pool:
+            pending = deque()
+            for entry in _iter_json_array(f, on_chunk=digest.update):
+                pending.append(pool.submit(check_entry, entry))
+                if len(pending) >= max_workers * 4:
+                    record(pending.popleft().result())
+            while pending:
+                record(pending.popleft().result())
+    except ValueError as e:
+        # json.JSONDecodeError is a ValueError too
+        return {
+            'status': 'failure',
+            'message': f'Manifest file at {manifest_fn} is not valid: {e}',
+        }
+
+    n_entries = sum(counts.values())
+    n_failed = n_entries - counts['ok']
     return {
-        'status': 'success',
-        'message': 'File validated successfully',
+        'status': 'success' if n_failed == 0 else 'failure',
+        'message': 'File validated successfully' if n_failed == 0 else f'{n_failed} of {n_entries} manifest entries failed validation',
         'data': {
-            'size': len(manifest),
-            'manifest': manifest
+            'size': n_entries,
+            'counts': counts,
+            'errors': errors,
+            'manifest_sha256': digest.hexdigest(),
         }
     }
 
 
-def _to_search_entry():
-    """A compute function that combines dataset + metadata info"""
+@_with_helpers(_iter_json_array)
+def _to_search_entry(gcs_root=None, path: str=None, dataset: str=None, subject_prefix: str='', base_url: str='',
+                     visible_to: list[str]=None, batch_size: int=1000, output_folder: str='_search'):
+    """
+    A compute function that combines dataset + metadata info
+
+    Builds one Globus Search entry per manifest entry (same shape as `search/scripts/ris-to-globus.py`), and writes
+        them as GMetaList batch files next to the data, under `{gcs_root}/{output_folder}/{path}/`. Only the batch
+        locations and counts are returned: a manifest with a million files would never fit in flow state, but a list
+        of batch file paths does.
+
+    Batch paths are returned relative to `gcs_root`, ie as paths on the collection, so that a later step can
+        transfer or ingest them. The output folder is replaced as a whole, and only on success, so it never holds a
+        mix of batches from different runs.
+
+    `path` is where this run's copy of the files is (a temporary, per-run folder), but records describe the files
+        where they live for good: `dataset` is the folder on the source collection, and `base_url` that collection's
+        HTTPS URL. Subjects are `{subject_prefix}{dataset}/{file path within the dataset}`, so every run over the same
+        dataset produces the same subjects, and re-ingesting updates records instead of duplicating them.
+    """
+    import json
+    import os
+    import shutil
+    import tempfile
+
+    if not gcs_root or not path:
+        raise Exception("No input folder specified")
+
+    visible_to = visible_to or ['public']
+    dataset = '/' + (dataset or path).strip('/')
+    dataset_dir = os.path.realpath(os.path.join(gcs_root, path))
+    manifest_fn = os.path.join(dataset_dir, "manifest.json")
+    if not os.path.exists(manifest_fn):
+        return {
+            'status': 'failure',
+            'message': f'Manifest file could not be located at {manifest_fn}',
+        }
+
+    def to_record(entry) -> dict:
+        if isinstance(entry, str):
+            entry = {'path': entry}
+        rel_fn = entry['path'].lstrip('/')
+        collection_path = f"{dataset.rstrip('/')}/{rel_fn}"
+        content = {
+            'dataset': dataset,
+            'file': entry,
+            'files': [rel_fn],
+            # Static search portal UI prefers empty strings instead of null
+            'sample_file': rel_fn,
+            'sample_file_url': f"{base_url.rstrip('/')}/{collection_path.lstrip('/')}" if base_url else "",
+            'sample_plot_url': "",
+            'keywords': entry.get('keywords', []),
+        }
+        return {
+            "id": "file_record",
+            "subject": f"{subject_prefix}{collection_path}",
+            "visible_to": visible_to,
+            "content": content,
+        }
+
+    out_dir = os.path.join(gcs_root, output_folder, path.strip('/'))
+    os.makedirs(os.path.dirname(out_dir), exist_ok=True)
+    # Write into a fresh sibling folder, and swap it into place only once every batch is written: a failed run leaves
+    #   the previous output alone, and a rerun that yields fewer batches doesn't leave stale ones behind
+    tmp_dir = tempfile.mkdtemp(prefix=f'.{os.path.basename(out_dir)}.', dir=os.path.dirname(out_dir))
+    # mkdtemp makes a private folder; the batches must stay readable by the collection (eg for a later transfer)
+    os.chmod(tmp_dir, 0o755)
+    batches = []
+    count = 0
+
+    def write_batch(records):
+        batch_name = f'batch-{len(batches):05d}.json'
+        with open(os.path.join(tmp_dir, batch_name), 'w') as out:
+            json.dump({"ingest_type": "GMetaList", "ingest_data": {"gmeta": records}}, out)
+        batches.append('/' + os.path.relpath(os.path.join(out_dir, batch_name), gcs_root))
+
+    try:
+        with open(manifest_fn, 'rb') as f:
+            records = []
+            for entry in _iter_json_array(f):
+                records.append(to_record(entry))
+                count += 1
+                if len(records) >= batch_size:
+                    write_batch(records)
+                    records = []
+            if records:
+                write_batch(records)
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        return {
+            'status': 'failure',
+            'message': f'Could not build search entries from {manifest_fn}: {e}',
+        }
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    if os.path.exists(out_dir):
+        # A directory can only be renamed over an empty one, so move the previous output aside first
+        old_dir = tempfile.mkdtemp(prefix=f'.{os.path.basename(out_dir)}.old.', dir=os.path.dirname(out_dir))
+        os.replace(out_dir, os.path.join(old_dir, 'previous'))
+        os.replace(tmp_dir, out_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+    else:
+        os.replace(tmp_dir, out_dir)
+
+    return {
+        'status': 'success',
+        'message': f'Wrote {count} search entries in {len(batches)} batch file(s)',
+        'data': {
+            'dataset': path,
+            'count': count,
+            'batch_size': batch_size,
+            'folder': '/' + os.path.relpath(out_dir, gcs_root),
+            'batches': batches,
+        }
+    }
 
 
 #######
 # Workflow
-def get_example_flow(src_fn, schema_fn, func_id):
+def get_example_flow(src_fn, schema_fn, func_id=None):
     """Load a specific example workflow definition, and fill in the placeholders for assets created by this script"""
     with open(src_fn, 'r') as f:
         flow = json.load(f)
@@ -75,32 +395,38 @@ def get_example_flow(src_fn, schema_fn, func_id):
     return flow, schema
 
 
-def register_function(client: ComputeClient, func: t.Callable) -> str:
+def register_function(client: 'ComputeClient', func: t.Callable) -> str:
     """
     Register a function and return the uuid
 
     TODO: Add permissions controls (like groups)
     """
-    func_id = client.register_function(func, public=False)
+    # The compute client doesn't use the shared SDK transport, so its calls are timed here instead
+    with tracing.span('compute register_function', function=func.__name__):
+        func_id = client.register_function(func, public=False)
     logger.info(f'Registered function  "{func.__name__}" {func_id}')
     return func_id
 
 
-def register_flow(client: FlowsClient, flow_def: dict, schema_def: dict) -> str:
+def register_flow(client: 'FlowsClient', flow_def: dict, schema_def: dict, title: str="Example flow") -> str:
+    from globus_sdk import FlowsAPIError
+
     try:
-        resp = client.create_flow("Example flow", flow_def, schema_def, keywords=['apecx', 'apecx-demo'])
+        resp = client.create_flow(title, flow_def, schema_def, keywords=['apecx', 'apecx-demo'])
     except FlowsAPIError as e:
         # Provide additional info for debugging
         pp(e.errors, sort_dicts=False, indent=2)
         raise e
 
-    if resp.http_status != 200:
+    if resp.http_status // 100 != 2:
         raise Exception(f"Could not create flow: {resp.http_status} (code {resp.http_reason})")
 
     return resp.data['id']
 
 
-def update_flow(client: FlowsClient, flow_id, flow_def: dict, schema_def: dict) -> str:
+def update_flow(client: 'FlowsClient', flow_id, flow_def: dict, schema_def: dict) -> str:
+    from globus_sdk import FlowsAPIError
+
     try:
         resp = client.update_flow(flow_id, definition=flow_def, input_schema=schema_def)
     except FlowsAPIError as e:
@@ -108,12 +434,57 @@ def update_flow(client: FlowsClient, flow_id, flow_def: dict, schema_def: dict)
         pp(e.errors, sort_dicts=False, indent=2)
         raise e
 
-    if resp.http_status != 200:
+    if resp.http_status // 100 != 2:
         raise Exception(f"Could not update existing flow {flow_id}: {resp.http_status} (code {resp.http_reason})")
 
     return resp.data['id']
 
-def run_flow(client: SpecificFlowClient, body: dict, label: str=None, tags: list[str]=None) -> (str, str):
+
+def ensure_function(client: 'ComputeClient', func: t.Callable, reg: dict, force: bool=False) -> str:
+    """Register a function only if its source code changed since the last time this script registered it"""
+    src_hash = registry.function_hash(func)
+    func_id, is_current = registry.lookup(reg, 'functions', func.__name__, src_hash)
+    if is_current and not force:
+        logger.info(f'Function "{func.__name__}" is unchanged; reusing {func_id}')
+        return func_id
+
+    func_id = register_function(client, func)
+    registry.remember(reg, 'functions', func.__name__, func_id, src_hash)
+    return func_id
+
+
+def ensure_flow(client: 'FlowsClient', name: str, flow_def: dict, schema_def: dict, reg: dict, force: bool=False) -> str:
+    """Create or update a flow by name, only making API calls when the definition or schema changed"""
+    from globus_sdk import FlowsAPIError
+
+    title = FLOWS[name]['title']
+    def_hash = registry.definition_hash(title, flow_def, schema_def)
+    flow_id, is_current = registry.lookup(reg, 'flows', name, def_hash)
+    if is_current and not force:
+        logger.info(f'Flow "{name}" is unchanged; reusing {flow_id}')
+        return flow_id
+
+    if flow_id is None:
+        flow_id = register_flow(client, flow_def, schema_def, title=title)
+        logger.info(f'Registered flow "{name}" {flow_id}')
+    else:
+        try:
+            flow_id = update_flow(client, flow_id, flow_def, schema_def)
+            logger.info(f'Updated flow "{name}" {flow_id}')
+        except FlowsAPIError as e:
+            if e.http_status != 404:
+                raise e
+            # Someone deleted the flow (eg via the webapp) since we last saw it. Start over with a new one.
+            logger.warning(f'Flow "{name}" {flow_id} no longer exists; registering a new flow')
+            flow_id = register_flow(client, flow_def, schema_def, title=title)
+
+    registry.remember(reg, 'flows', name, flow_id, def_hash)
+    return flow_id
+
+
+def run_flow(client: 'SpecificFlowClient', body: dict, label: str=None, tags: list[str]=None) -> (str, str):
+    from globus_sdk import FlowsAPIError
+
     try:
         resp = client.run_flow(body, label=label, tags=tags)
     except FlowsAPIError as e:
@@ -121,56 +492,91 @@ def run_flow(client: SpecificFlowClient, body: dict, label: str=None, tags: list
         pp(e.errors, sort_dicts=False, indent=2)
         raise e
 
-    if resp.http_status != 201:
+    if resp.http_status // 100 != 2:
         raise Exception(f"Could not run flow: {resp.http_status} (code {resp.http_reason})")
 
     logger.info(f'Initiated flow "{resp.data["run_id"]}"')
     return resp.data['run_id'], resp.data['status']
 
 
-def check_flow_status(client: FlowsClient, run_id: str) -> str:
-    status = 'ACTIVE'
-    while status == 'ACTIVE':
-        time.sleep(15)
-        run = client.get_run(run_id)
-        status = run.data['status']
+def check_flow_status(client: 'FlowsClient', run_id: str, flow_id: str = None) -> str:
+    """
+    Wait for one run to finish. To watch many runs at once, use `monitor.RunMonitor` directly.
+
+    Pass the run's flow when known: the monitor lists unfinished runs in bulk, and without a filter that listing
+        covers every unfinished run the user can see, across all flows.
+    """
+    status = asyncio.run(wait_for_runs(client, [run_id], flow_id=flow_id))[run_id]
 
     logger.info(f'Run id {run_id} had final resolved status "{status}"')
     return status
 
 
-def cleanup(cc: ComputeClient, fc: FlowsClient, func_ids: list[str], flow_id: str):
+def cleanup(cc: 'ComputeClient', fc: 'FlowsClient', func_ids: list[str], flow_id: str):
     """Clean up resources created for this demo, to leave a clean slate at end of script"""
     cc.delete_function(func_id)
     fc.delete_flow(flow_id)
 
 
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('flow', nargs='?', default='validate_in_place', choices=sorted(FLOWS), help='Which example flow to deploy')
+    parser.add_argument('--registry', default=registry.DEFAULT_REGISTRY_FN, help='Local file that remembers registered IDs')
+    parser.add_argument(
+        '--adopt',
+        metavar='FLOW_ID',
+        help='Manage an existing flow (eg one created before the registry existed) instead of creating a new one'
+    )
+    parser.add_argument('--force', help='Re-register the function and update the flow even if unchanged', action='store_true')
+    parser.add_argument('--input', help='JSON file with the run input. Required to run flows other than validate_in_place.')
+    parser.add_argument('--no-run', help='Only register/update; do not start a run', action='store_true')
+    parser.add_argument('--trace', help=tracing.TRACE_HELP)
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
+    args = parse_args()
     logging.basicConfig(level=logging.INFO)
+    tracing.enable(args.trace)
+
+    from globus_compute_sdk import Client as ComputeClient
+    from globus_sdk import FlowsClient, SpecificFlowClient, UserApp
 
-    EXISTING_FLOW_ID = '8f62db7d-ac7f-4bba-9292-2fa3a26fb5ee' # None
-    app = UserApp(client_id="5f4fc571-4fa2-4d84-ab6e-567d5245af7a")
+    app = UserApp(client_id=DEMO_CLIENT_ID)
     cc = ComputeClient(app=app)
-    fc = FlowsClient(app=app)
+    fc = aio.share_connections(FlowsClient(app=app))
+
+    reg = registry.load_registry(args.registry)
+    if args.adopt:
+        # An empty hash never matches, so the adopted flow will be updated to the current definition
+        registry.remember(reg, 'flows', args.flow, args.adopt, '')
 
-    func_id = register_function(cc, _file_validation_func)
     flow_def, schema_def = get_example_flow(
-        'data/validate_in_place/flow.json',
-        'data/validate_in_place/input_schema.json',
-        func_id
+        os.path.join(DATA_DIR, args.flow, 'flow.json'),
+        os.path.join(DATA_DIR, args.flow, 'input_schema.json'),
     )
-    if EXISTING_FLOW_ID is None:
-        # For exploratory purposes only: easier to re-define one flow in place while debugging
-        flow_id = register_flow(fc, flow_def, schema_def)
-    else:
-        flow_id = update_flow(fc, EXISTING_FLOW_ID, flow_def, schema_def)
-
-    # If creating a new flow, this might trigger re-auth
-    sfc = SpecificFlowClient(flow_id, app=app)
-
-    run_id, start_status = run_flow(
-        sfc,
-        {
+    # Function IDs are passed in as run input, so the flow definition doesn't depend on them: register both functions
+    #   and create/update the flow at the same time (after a single login)
+    aio.ensure_login(app)
+    try:
+        func_id, search_func_id, flow_id = aio.run_concurrently(
+            lambda: ensure_function(cc, _file_validation_func, reg, force=args.force),
+            lambda: ensure_function(cc, _to_search_entry, reg, force=args.force),
+            lambda: ensure_flow(fc, args.flow, flow_def, schema_def, reg, force=args.force),
+        )
+    finally:
+        # Save whatever was registered, even if a later step failed, so that we don't re-create it next time
+        registry.save_registry(reg, args.registry)
+
+    print(f'Flow "{args.flow}": {flow_id}')
+    if args.no_run:
+        raise SystemExit(0)
+
+    if args.input:
+        with open(args.input, 'r') as f:
+            run_input = json.load(f)
+    elif args.flow == 'validate_in_place':
+        run_input = {
             "source": {
                 "id": "dba0d7c0-1f63-44d1-bcd0-76865d3d44a0",  # GUEST collection
                 "path": "/2025-04-flows-demo/source"  # A folder
@@ -189,7 +595,22 @@ if __name__ == "__main__":
                 "gcs_root": '/share/gcs-demo',
             },
             "validation_function_uuid": func_id,
-        },
+            "search_entry_function_uuid": search_func_id,
+            "search": {
+                "subject_prefix": "globus://dba0d7c0-1f63-44d1-bcd0-76865d3d44a0",
+                # HTTPS URL of the source collection, as shown on app.globus.org. Substitute your own.
+                "base_url": "https://g-REPLACEME.data.globus.org",
+            },
+        }
+    else:
+        raise SystemExit(f'Provide run input for flow "{args.flow}" via --input')
+
+    # If creating a new flow, this might trigger re-auth
+    sfc = aio.share_connections(SpecificFlowClient(flow_id, app=app))
+
+    run_id, start_status = run_flow(
+        sfc,
+        run_input,
         label="Test run",
         tags=['apecx', 'apecx-demo'],
     )
@@ -198,7 +619,9 @@ if __name__ == "__main__":
         final_status = start_status
         print(f'Run {run_id} failed with status {final_status}')
     else:
-        final_status = check_flow_status(fc, run_id)
+        with tracing.span('check_flow_status', run_id=run_id) as span:
+            final_status = check_flow_status(fc, run_id, flow_id=flow_id)
+            span.set(run_status=final_status)
 
     print('See web logs: ', f'https://app.globus.org/runs/{run_id}/logs')
 
@@ -0,0 +1,254 @@
+"""
+Watch many flow runs at once, and report status changes as they happen
+
+Polling `get_run` for every run every few seconds works for one run, but a batch of a thousand runs would make a
+    thousand API calls per poll. Instead, this monitor:
+
+* Lists runs in bulk (filtered by flow and/or tag, eg the `apecx` tags that `make_flow.run_flow` applies), and only
+    asks for ACTIVE/INACTIVE runs. One paginated call covers every run that is still going.
+* Updates every tracked run that appears in the listing from that one listing
+* Calls `get_run` only for tracked runs that have disappeared from that listing (ie, they just finished), to learn
+    their final status
+* Backs off while nothing changes: the listing is repeated less often (up to `max_delay`) until some run changes
+    status. Lookups of runs that left the listing back off separately, per run.
+
+Status changes are yielded from an async generator, so a batch tool can react to each completion as it happens:
+
+    async for event in RunMonitor(fc, run_ids, tags=['apecx']).watch():
+        print(event['run_id'], event['previous'], '->', event['status'])
+
+This script can also be called via CLI, eg:
+    python monitor.py --tag apecx      # Every run with this tag that is unfinished right now
+    python monitor.py RUN_ID [RUN_ID ...]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import time
+import typing as t
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from apecx_common import scheduler, tracing  # noqa: E402
+
+if t.TYPE_CHECKING:
+    from globus_sdk import FlowsClient
+
+
+logger = logging.getLogger(__name__)
+
+# INACTIVE runs are waiting on a human (eg re-consent) and may resume, so they are not final
+FINAL_STATUSES = {'SUCCEEDED', 'FAILED', 'ENDED'}
+UNFINISHED_STATUSES = ['ACTIVE', 'INACTIVE']
+
+
+class RunMonitor:
+    def __init__(self, client: 'FlowsClient', run_ids: list[str] = None, flow_id: str = None, tags: list[str] = None,
+                 min_delay: float = 5, max_delay: float = 300, backoff: float = 1.5, max_concurrent_gets: int = 8):
+        """
+        :param run_ids: The runs to watch. If omitted, watch every unfinished run that matches flow_id/tags.
+        :param flow_id: Narrow the bulk listing to one flow
+        :param tags: Narrow the bulk listing to runs with these tags
+        :param min_delay: Seconds between listings, right after any run changed status
+        :param max_delay: Upper bound on seconds between listings while nothing changes
+        :param max_concurrent_gets: Max simultaneous `get_run` calls for runs that just left the unfinished listing
+        """
+        self.client = client
+        self.flow_id = flow_id
+        self.tags = tags
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.backoff = backoff
+        self.max_concurrent_gets = max_concurrent_gets
+
+        # {run_id: {status, delay, next_check}}. `delay`/`next_check` only apply to `get_run` lookups of runs that are
+        #   missing from the listing; runs in the listing are all updated together, on the listing's own schedule.
+        self.runs = {}
+        for run_id in run_ids or []:
+            self.track(run_id)
+        self.discover = not run_ids
+        self.list_delay = min_delay
+        self.next_list = 0.0
+        # Run IDs in the most recent listing
+        self.listed = set()
+
+        # How many API calls we made, so batch tools can confirm that monitoring stays cheap
+        self.api_calls = 0
+
+    def track(self, run_id: str, status: str = None):
+        if run_id not in self.runs:
+            self.runs[run_id] = {'status': status, 'delay': self.min_delay, 'next_check': 0.0}
+
+    def _list_unfinished(self) -> dict:
+        """One bulk listing of unfinished runs: {run_id: run document}. Blocking; call via a thread."""
+        query_params = {'filter_status': ','.join(UNFINISHED_STATUSES)}
+        if self.tags:
+            query_params['filter_tags'] = ','.join(self.tags)
+
+        runs = {}
+        marker = None
+        while True:
+            self.api_calls += 1
+            resp = self.client.list_runs(filter_flow_id=self.flow_id, marker=marker, query_params=query_params)
+            for run in resp.data.get('runs', []):
+                runs[run['run_id']] = run
+            if not resp.data.get('has_next_page'):
+                return runs
+            marker = resp.data['marker']
+
+    def _get_run(self, run_id: str) -> dict:
+        self.api_calls += 1
+        return self.client.get_run(run_id).data
+
+    def _schedule_listing(self, changed: bool, now: float):
+        self.list_delay = self.min_delay if changed else min(self.list_delay * self.backoff, self.max_delay)
+        self.next_list = now + self.list_delay * random.uniform(0.9, 1.1)
+
+    def _schedule_lookup(self, run_id: str, now: float):
+        """Back off the next `get_run` for a run that is missing from the listing, but not (yet) known to be final"""
+        state = self.runs[run_id]
+        state['delay'] = min(state['delay'] * self.backoff, self.max_delay)
+        # Jitter keeps runs that finished together from being looked up in lockstep forever
+        state['next_check'] = now + state['delay'] * random.uniform(0.8, 1.2)
+
+    def _update(self, run_id: str, run: dict):
+        """Record the latest status for a run, and return an event if it changed"""
+        state = self.runs[run_id]
+        previous = state['status']
+        status = run['status']
+        state['status'] = status
+        if status == previous:
+            return None
+        return {
+            'run_id': run_id,
+            'previous': previous,
+            'status': status,
+            'final': status in FINAL_STATUSES,
+            'label': run.get('label'),
+            'run': run,
+        }
+
+    def pending(self) -> list[str]:
+        return [r for r, s in self.runs.items() if s['status'] not in FINAL_STATUSES]
+
+    def _due_lookups(self, now: float) -> list[str]:
+        """Unfinished runs that are missing from the latest listing, and due for a `get_run`"""
+        return [r for r in self.pending() if r not in self.listed and self.runs[r]['next_check'] <= now]
+
+    def next_wakeup(self) -> float:
+        missing = [self.runs[r]['next_check'] for r in self.pending() if r not in self.listed]
+        return min([self.next_list, *missing])
+
+    async def poll_once(self) -> list[dict]:
+        """List unfinished runs if the listing is due, and look up runs that left it. Returns status change events."""
+        from globus_sdk import GlobusAPIError
+
+        now = time.monotonic()
+        events = []
+        if self.discover or self.next_list <= now:
+            try:
+                listing = await asyncio.to_thread(self._list_unfinished)
+            except GlobusAPIError as e:
+                if e.http_status not in scheduler.THROTTLE_STATUSES:
+                    raise e
+                # Still throttled after retries; the runs are unaffected, so back off and list again later
+                logger.warning(f'Flows service is busy ({e.http_status}); postponing this check')
+                self._schedule_listing(False, now)
+                return []
+            if self.discover:
+                # Watch whatever is unfinished right now; runs started later need a new monitor
+                for run_id in listing:
+                    self.track(run_id)
+                self.discover = False
+
+            self.listed = set()
+            for run_id, run in listing.items():
+                if run_id not in self.runs:
+                    continue
+                self.listed.add(run_id)
+                events.append(self._update(run_id, run))
+                # If this run drops out of a later listing, look it up straight away
+                self.runs[run_id].update(delay=self.min_delay, next_check=0.0)
+            self._schedule_listing(any(events), now)
+
+        # Runs missing from the unfinished listing have (most likely) just finished: look them up individually, a few
+        #   at a time
+        missing = self._due_lookups(now)
+        limit = asyncio.Semaphore(self.max_concurrent_gets)
+
+        async def get_run(run_id):
+            async with limit:
+                return await self._get_run_safe(run_id)
+
+        for run_id, run in zip(missing, await asyncio.gather(*[get_run(r) for r in missing])):
+            event = self._update(run_id, run) if run is not None else None
+            events.append(event)
+            if self.runs[run_id]['status'] not in FINAL_STATUSES:
+                # Not in the listing, but not final either (eg the listing lagged behind): try again later
+                self._schedule_lookup(run_id, now)
+        events = [e for e in events if e]
+        if events:
+            # Something is happening: list again soon
+            self._schedule_listing(True, now)
+        return events
+
+    async def _get_run_safe(self, run_id: str) -> dict:
+        from globus_sdk import GlobusAPIError
+
+        try:
+            return await asyncio.to_thread(self._get_run, run_id)
+        except GlobusAPIError as e:
+            logger.warning(f'Could not get status of run {run_id}: {e.http_status} {e.code}')
+            return None
+
+    async def watch(self):
+        """Yield status change events until every tracked run has a final status"""
+        while True:
+            for event in await self.poll_once():
+                yield event
+
+            pending = self.pending()
+            if not pending:
+                return
+
+            await asyncio.sleep(max(0.0, self.next_wakeup() - time.monotonic()))
+
+
+async def wait_for_runs(client: 'FlowsClient', run_ids: list[str], **kwargs) -> dict:
+    """Block until every run has a final status. Returns {run_id: status}."""
+    monitor = RunMonitor(client, run_ids, **kwargs)
+    async for event in monitor.watch():
+        logger.info(f'Run {event["run_id"]}: {event["previous"] or "(new)"} -> {event["status"]}')
+    return {run_id: state['status'] for run_id, state in monitor.runs.items()}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('run_ids', nargs='*', help='Runs to watch. If omitted, watch all currently unfinished runs matching --tag/--flow-id.')
+    parser.add_argument('--tag', action='append', dest='tags', help='Only runs with this tag. May be repeated.')
+    parser.add_argument('--flow-id', help='Only runs of this flow')
+    parser.add_argument('--max-delay', type=float, default=300, help='Max seconds between checks while no run changes')
+    parser.add_argument('-v', help='Verbose output', action='store_true')
+    parser.add_argument('--trace', help=tracing.TRACE_HELP)
+    return parser.parse_args()
+
+
+async def main(args):
+    from globus_sdk import FlowsClient, UserApp
+    from make_flow import DEMO_CLIENT_ID
+
+    fc = scheduler.install(FlowsClient(app=UserApp(client_id=DEMO_CLIENT_ID)))
+    monitor = RunMonitor(fc, args.run_ids, flow_id=args.flow_id, tags=args.tags, max_delay=args.max_delay)
+    async for event in monitor.watch():
+        print(f'{event["run_id"]}  {event["previous"] or "-":>9} -> {event["status"]:<9}  {event["label"] or ""}')
+    print(f'All runs finished ({monitor.api_calls} API calls)')
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    if args.v:
+        logging.basicConfig(level=logging.INFO)
+    tracing.enable(args.trace)
+    asyncio.run(main(args))
@@ -0,0 +1,240 @@
+"""
+Find out where the time goes in flow runs, by rebuilding a per-state timeline from the run logs
+
+When a run of (say) `validate_in_place` takes ten minutes, the web logs show each event, but not which *step* is slow
+    across many runs: is it the stat calls, the transfer, or the compute validation? This script pages through the
+    logs of one or many runs, pairs up each `<Type>Started` event with the matching completion event, and reports:
+
+* Per-state latency percentiles across all runs (plus `(between states)`: time the service spent between one state
+    finishing and the next one starting)
+* A CSV of every state span, for your own analysis
+* "Folded stacks" (`flow;state milliseconds` per line), which flame graph tools such as `flamegraph.pl` or
+    speedscope can render directly
+
+This script is called via CLI, eg:
+    python profile_runs.py RUN_ID [RUN_ID ...] --csv spans.csv --folded runs.folded
+    python profile_runs.py --flow-id FLOW_ID --tag apecx --limit 200
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import csv
+from datetime import datetime
+import logging
+import os
+import statistics
+import sys
+import typing as t
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from apecx_common import scheduler, tracing  # noqa: E402
+
+if t.TYPE_CHECKING:
+    from globus_sdk import FlowsClient
+
+
+logger = logging.getLogger(__name__)
+
+GAP_STATE = '(between states)'
+# Events that close a state. Everything else that ends with one of these is treated as a completion, too.
+END_SUFFIXES = ('Completed', 'Failed', 'Caught', 'Errored', 'TimedOut')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('run_ids', nargs='*', help='Runs to profile. If omitted, list finished runs via --flow-id/--tag.')
+    parser.add_argument('--flow-id', help='Profile runs of this flow')
+    parser.add_argument('--tag', action='append', dest='tags', help='Only runs with this tag. May be repeated.')
+    parser.add_argument('--limit', type=int, default=100, help='Max number of runs to profile when listing')
+    parser.add_argument('--csv', help='Write every state span to this CSV file')
+    parser.add_argument('--folded', help='Write folded stacks (for flame graph tools) to this file')
+    parser.add_argument('--workers', type=int, default=8, help='How many runs to fetch logs for at once')
+    parser.add_argument('-v', help='Verbose output', action='store_true')
+    parser.add_argument('--trace', help=tracing.TRACE_HELP)
+    return parser.parse_args()
+
+
+def parse_time(value: str) -> datetime:
+    return datetime.fromisoformat(value)
+
+
+#######################
+# Fetching
+def fetch_run_logs(client: 'FlowsClient', run_id: str, page_size: int = 100) -> list[dict]:
+    """All log entries for one run, oldest first"""
+    entries = []
+    marker = None
+    while True:
+        resp = client.get_run_logs(run_id, limit=page_size, marker=marker)
+        entries.extend(resp.data.get('entries', []))
+        if not resp.data.get('has_next_page'):
+            return entries
+        marker = resp.data['marker']
+
+
+def find_runs(client: 'FlowsClient', flow_id: str = None, tags: list[str] = None, limit: int = 100) -> list[dict]:
+    """Recent finished runs, so that we profile complete timelines"""
+    query_params = {'filter_status': 'SUCCEEDED,FAILED'}
+    if tags:
+        query_params['filter_tags'] = ','.join(tags)
+
+    runs = []
+    marker = None
+    while len(runs) < limit:
+        resp = client.list_runs(filter_flow_id=flow_id, marker=marker, query_params=query_params)
+        runs.extend(resp.data.get('runs', []))
+        if not resp.data.get('has_next_page'):
+            break
+        marker = resp.data['marker']
+    return runs[:limit]
+
+
+#######################
+# Timelines
+def build_timeline(run_id: str, entries: list[dict]) -> list[dict]:
+    """
+    Pair start/end log events into spans: [{run_id, state, type, start, end, duration_s, outcome}]
+
+    Gaps between one state ending and the next starting are included as `(between states)` spans, since that is
+        time the run spent that no single state accounts for.
+    """
+    spans = []
+    open_states = {}
+    last_end = None
+    for entry in sorted(entries, key=lambda e: e['time']):
+        code = entry.get('code', '')
+        details = entry.get('details') or {}
+        state = details.get('state_name')
+        when = parse_time(entry['time'])
+
+        if code == 'FlowStarted':
+            last_end = when
+            continue
+        if state is None:
+            continue
+
+        if code.endswith('Started'):
+            if last_end is not None and when > last_end:
+                spans.append(make_span(run_id, GAP_STATE, 'Gap', last_end, when, 'n/a'))
+            open_states[state] = (code[:-len('Started')], when)
+        elif code.endswith(END_SUFFIXES) and state in open_states:
+            state_type, start = open_states.pop(state)
+            outcome = next(s for s in END_SUFFIXES if code.endswith(s))
+            spans.append(make_span(run_id, state, state_type, start, when, outcome))
+            last_end = when
+    return spans
+
+
+def make_span(run_id: str, state: str, state_type: str, start: datetime, end: datetime, outcome: str) -> dict:
+    return {
+        'run_id': run_id,
+        'state': state,
+        'type': state_type,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'duration_s': (end - start).total_seconds(),
+        'outcome': outcome,
+    }
+
+
+#######################
+# Reports
+def percentile(values: list[float], p: int) -> float:
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method='inclusive')[p - 1]
+
+
+def aggregate(spans: list[dict]) -> list[dict]:
+    """Per-state latency summary, slowest (by total time) first"""
+    by_state = {}
+    for s in spans:
+        by_state.setdefault(s['state'], []).append(s['duration_s'])
+
+    rows = []
+    for state, durations in by_state.items():
+        rows.append({
+            'state': state,
+            'count': len(durations),
+            'total_s': sum(durations),
+            'p50_s': percentile(durations, 50),
+            'p90_s': percentile(durations, 90),
+            'p99_s': percentile(durations, 99),
+            'max_s': max(durations),
+        })
+    return sorted(rows, key=lambda r: -r['total_s'])
+
+
+def format_summary(rows: list[dict]) -> str:
+    lines = [f"{'State':<30} {'n':>5} {'total s':>10} {'p50 s':>9} {'p90 s':>9} {'p99 s':>9} {'max s':>9}"]
+    for r in rows:
+        lines.append(
+            f"{r['state']:<30} {r['count']:>5} {r['total_s']:>10.1f} {r['p50_s']:>9.2f} {r['p90_s']:>9.2f} "
+            f"{r['p99_s']:>9.2f} {r['max_s']:>9.2f}"
+        )
+    return '\n'.join(lines)
+
+
+def write_csv(spans: list[dict], fn: str):
+    with open(fn, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=['run_id', 'state', 'type', 'start', 'end', 'duration_s', 'outcome'])
+        writer.writeheader()
+        writer.writerows(spans)
+
+
+def write_folded(spans: list[dict], fn: str, root: str = 'flow'):
+    """Folded stack format: one `frame;frame value` line per stack. Values are integer milliseconds, summed over runs."""
+    totals = {}
+    for s in spans:
+        key = f"{root};{s['state']}"
+        totals[key] = totals.get(key, 0) + s['duration_s'] * 1000
+    with open(fn, 'w') as f:
+        for key, ms in sorted(totals.items()):
+            f.write(f'{key} {round(ms)}\n')
+
+
+def profile_runs(client: 'FlowsClient', run_ids: list[str], workers: int = 8) -> list[dict]:
+    """Fetch logs for every run (a few at a time) and return all state spans"""
+    def one(run_id):
+        try:
+            return build_timeline(run_id, fetch_run_logs(client, run_id))
+        except Exception:
+            logger.exception(f'Could not read logs for run {run_id}')
+            return []
+
+    spans = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for run_spans in pool.map(one, run_ids):
+            spans.extend(run_spans)
+    return spans
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    if args.v:
+        logging.basicConfig(level=logging.INFO)
+    tracing.enable(args.trace)
+
+    from globus_sdk import FlowsClient, UserApp
+    from make_flow import DEMO_CLIENT_ID
+
+    fc = scheduler.install(FlowsClient(app=UserApp(client_id=DEMO_CLIENT_ID)))
+
+    run_ids = args.run_ids
+    if not run_ids:
+        if not (args.flow_id or args.tags):
+            raise SystemExit('Specify run IDs, or --flow-id/--tag to find runs')
+        run_ids = [r['run_id'] for r in find_runs(fc, flow_id=args.flow_id, tags=args.tags, limit=args.limit)]
+    logger.info(f'Profiling {len(run_ids)} run(s)')
+
+    spans = profile_runs(fc, run_ids, workers=args.workers)
+    if not spans:
+        raise SystemExit('No state timings found in the run logs')
+
+    print(format_summary(aggregate(spans)))
+
+    if args.csv:
+        write_csv(spans, args.csv)
+        print(f'Wrote {len(spans)} spans to {args.csv}')
+    if args.folded:
+        write_folded(spans, args.folded)
+        print(f'Wrote folded stacks to {args.folded}')
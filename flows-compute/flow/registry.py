@@ -0,0 +1,67 @@
+"""
+Remember which compute functions and flows this demo has already registered, keyed by a hash of their contents
+
+Registering a function or updating a flow is slow, and each call creates (or changes) a remote resource. We only
+    need to make those calls when the function source code, or the flow definition/schema, actually changed.
+
+The registry is a small local JSON file:
+    {
+        "functions": {"<name>": {"id": "<uuid>", "hash": "<sha256>"}},
+        "flows": {"<name>": {"id": "<uuid>", "hash": "<sha256>"}}
+    }
+
+It is local state (IDs belong to whoever ran the script), so it should not be committed.
+"""
+import hashlib
+import inspect
+import json
+import os
+import textwrap
+import typing as t
+
+
+DEFAULT_REGISTRY_FN = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.registry.json')
+
+
+def load_registry(fn: str = DEFAULT_REGISTRY_FN) -> dict:
+    if not os.path.exists(fn):
+        return {'functions': {}, 'flows': {}}
+    with open(fn, 'r') as f:
+        registry = json.load(f)
+    registry.setdefault('functions', {})
+    registry.setdefault('flows', {})
+    return registry
+
+
+def save_registry(registry: dict, fn: str = DEFAULT_REGISTRY_FN):
+    tmp_fn = fn + '.tmp'
+    with open(tmp_fn, 'w') as f:
+        json.dump(registry, f, indent=2, sort_keys=True)
+    os.replace(tmp_fn, fn)
+
+
+def function_hash(func: t.Callable) -> str:
+    """Hash the source code of a function. Whitespace-only indentation changes (eg moving it into a class) don't count."""
+    src = textwrap.dedent(inspect.getsource(func))
+    return hashlib.sha256(f'{func.__name__}\n{src}'.encode('utf-8')).hexdigest()
+
+
+def definition_hash(*docs) -> str:
+    """Hash one or more JSON documents in canonical form, so that key order and formatting don't matter"""
+    canonical = json.dumps(docs, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def lookup(registry: dict, kind: str, name: str, content_hash: str) -> (str, bool):
+    """
+    Returns (known_id, is_current).
+        known_id is None if this name was never registered; is_current is True if the stored hash matches.
+    """
+    entry = registry[kind].get(name)
+    if not entry:
+        return None, False
+    return entry['id'], entry['hash'] == content_hash
+
+
+def remember(registry: dict, kind: str, name: str, resource_id: str, content_hash: str):
+    registry[kind][name] = {'id': resource_id, 'hash': content_hash}
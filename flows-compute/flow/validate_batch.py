@@ -0,0 +1,166 @@
+"""
+Run the file validation function over many dataset folders at once, without starting a flow per folder.
+
+`make_flow.py` validates exactly one folder per flow run. That's the right shape for "a user uploaded a dataset",
+    but when catching up on a backlog of thousands of existing folders (already on the compute host's filesystem),
+    it's much faster to submit the compute function directly. The Compute SDK's `Executor` batches task submissions
+    for us; this script keeps a bounded number of tasks outstanding so we don't queue 10^4 tasks at once, and records
+    each result as soon as it completes.
+
+Input is a text file with one folder `path` per line (relative to `gcs_root`, same as the `path` kwarg of the
+    validation function). Output is a JSON lines report: one line per folder, plus a final summary line.
+
+This script is called via CLI, eg:
+    python validate_batch.py ENDPOINT_ID /share/gcs-demo folders.txt --report report.jsonl -v
+"""
+import argparse
+from concurrent.futures import FIRST_COMPLETED, wait
+import json
+import logging
+import sys
+import time
+import typing as t
+
+from make_flow import DEMO_CLIENT_ID, _file_validation_func, ensure_function
+import registry
+from apecx_common import tracing  # make_flow puts the repository root on sys.path
+
+if t.TYPE_CHECKING:
+    from globus_compute_sdk import Executor
+
+
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('endpoint_id', help='A compute endpoint that can read the dataset folders')
+    parser.add_argument('gcs_root', help='The filesystem path where the compute endpoint can read collection files')
+    parser.add_argument('paths', help='File with one dataset folder path per line (use - for stdin)')
+    parser.add_argument('--function-id', help='A previously registered validation function. If omitted, the one from the local registry is used (or registered).')
+    parser.add_argument('--client-id', default=DEMO_CLIENT_ID, help='The Globus oauth native/thick client ID to use')
+    parser.add_argument('--report', default='validation_report.jsonl', help='Where to write the JSON lines report')
+    parser.add_argument(
+        '--max-outstanding',
+        type=int,
+        default=256,
+        help='Max tasks submitted but not yet finished. Set near the number of workers the endpoint can run.'
+    )
+    parser.add_argument('--batch-size', type=int, default=128, help='Max tasks sent to the Compute API per request')
+    parser.add_argument('-v', help='Verbose output', action='store_true')
+    parser.add_argument('--trace', help=tracing.TRACE_HELP)
+    return parser.parse_args()
+
+
+def iter_paths(fn: str):
+    """Stream folder paths, so that a backlog list of any size doesn't need to fit in memory"""
+    f = sys.stdin if fn == '-' else open(fn, 'r')
+    try:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                yield line
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def summarize_result(path: str, fut) -> dict:
+    """Flatten one task result into a report line"""
+    try:
+        result = fut.result()
+    except Exception as e:
+        # The task itself failed (eg missing gcs_root, endpoint worker died). Keep going with the rest of the batch.
+        return {'path': path, 'status': 'error', 'message': f'{type(e).__name__}: {e}'}
+
+    data = result.get('data') or {}
+    return {
+        'path': path,
+        'status': result.get('status'),
+        'message': result.get('message'),
+        'size': data.get('size'),
+        'counts': data.get('counts'),
+        'errors': data.get('errors'),
+        'manifest_sha256': data.get('manifest_sha256'),
+    }
+
+
+def validate_many(executor: 'Executor', func_id: str, gcs_root: str, paths, report_file, max_outstanding: int = 256) -> dict:
+    """
+    Submit one validation task per path, with at most `max_outstanding` in flight, and write results as they complete
+
+    Returns summary counts by status.
+    """
+    summary = {}
+    outstanding = {}
+    start = time.monotonic()
+    n_done = 0
+
+    def drain(return_when):
+        nonlocal n_done
+        done, _ = wait(outstanding, return_when=return_when)
+        for fut in done:
+            line = summarize_result(outstanding.pop(fut), fut)
+            report_file.write(json.dumps(line) + '\n')
+            summary[line['status']] = summary.get(line['status'], 0) + 1
+            n_done += 1
+        if n_done and n_done % 100 == 0:
+            logger.info(f'{n_done} folders validated ({n_done / (time.monotonic() - start):.1f}/s)')
+
+    for path in paths:
+        while len(outstanding) >= max_outstanding:
+            drain(FIRST_COMPLETED)
+        fut = executor.submit_to_registered_function(func_id, kwargs={'gcs_root': gcs_root, 'path': path})
+        outstanding[fut] = path
+
+    while outstanding:
+        drain(FIRST_COMPLETED)
+
+    elapsed = time.monotonic() - start
+    return {
+        'summary': True,
+        'n_folders': n_done,
+        'by_status': summary,
+        'elapsed_sec': round(elapsed, 3),
+        'folders_per_sec': round(n_done / elapsed, 3) if elapsed else None,
+    }
+
+
+if __name__ == '__main__':
+    args = parse_args()
+
+    if args.v:
+        logging.basicConfig(level=logging.INFO)
+    tracing.enable(args.trace)
+
+    from globus_compute_sdk import Client as ComputeClient, Executor
+    from globus_sdk import UserApp
+
+    app = UserApp(client_id=args.client_id)
+    cc = ComputeClient(app=app)
+
+    if args.function_id:
+        func_id = args.function_id
+    else:
+        # Shares the registry with make_flow.py, so an unchanged function is not registered again
+        reg = registry.load_registry()
+        func_id = ensure_function(cc, _file_validation_func, reg)
+        registry.save_registry(reg)
+
+    with open(args.report, 'w') as report, \
+            Executor(endpoint_id=args.endpoint_id, client=cc, batch_size=args.batch_size) as gce, \
+            tracing.span('validate_many', endpoint_id=args.endpoint_id) as span:
+        # The compute SDK doesn't use the shared SDK transport, so its calls are not traced individually
+        summary = validate_many(
+            gce,
+            func_id,
+            args.gcs_root,
+            iter_paths(args.paths),
+            report,
+            max_outstanding=args.max_outstanding,
+        )
+        span.set(folders=summary['n_folders'], **{f'status.{k}': v for k, v in summary['by_status'].items()})
+        report.write(json.dumps(summary) + '\n')
+
+    print(f"Validated {summary['n_folders']} folders in {summary['elapsed_sec']}s: {summary['by_status']}")
+    print(f'See per-folder results in {args.report}')
@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+"""
+Build a static, sharded search index from GMetaList files, so that a static portal can search public records
+    without calling the Globus Search API
+
+Globus Search is the right tool for anything with permissions, facets, or data that changes often. But some demo
+    datasets (like the ones in `portals-example/data`) are small, public, and rarely updated. For those, every
+    keystroke in the search box costs a round trip that isn't really needed. Instead, we can pre-compute an inverted
+    index once, upload it next to the portal, and let the browser look up terms itself.
+
+Only records with `"visible_to": ["public"]` are indexed. The output is a folder of gzipped JSON files:
+
+    manifest.json                    Entry point: shard layout, tokenizer settings, and a map of shard -> filename.
+                                         Its size depends on the number of shards, not the number of documents.
+    terms/<shard>.<hash>.json.gz     {term: [[doc_id, term_frequency], ...]} for every term that hashes to this shard
+    docs/<shard>.<hash>.json.gz      {doc_id: {subject, content}} for a fixed-size block of document IDs
+
+A browser client loads `manifest.json`, tokenizes the query the same way, hashes each term with 32 bit FNV-1a
+    (UTF-8 bytes) modulo `term_shards`, and fetches only the shards it needs (decompressing via
+    `DecompressionStream('gzip')`). Shard filenames include a content hash, so they can be cached forever; only the
+    manifest needs a short cache lifetime. The tokenizer in JavaScript (also recorded in the manifest):
+
+    text.toLowerCase().match(/[\p{L}\p{N}]+/gu).filter(t => [...t].length >= 2)
+
+    Python's `[^\W_]+` matches approximately what `[\p{L}\p{N}]` does: runs of Unicode letters and numbers. Known
+    differences:
+
+    * Unicode versions. Each side uses its own character database: Python's is `unicodedata.unidata_version`
+        (recorded in the manifest), a browser's is whatever its JavaScript engine ships. Characters added to Unicode
+        in between are letters on one side and unassigned (so, separators) on the other.
+    * Python defines `\w` by `str.isalnum()`, not by category. In CPython 3.11 that is exactly the L and N categories
+        (plus `_`, excluded above), but other versions and implementations are not obliged to agree.
+    * Marks (`\p{M}`) and connector punctuation other than `_` are separators on both sides, so words in scripts
+        that use combining marks (eg many Indic scripts) are split at each mark, in the browser and the builder alike.
+
+    Count the length in code points (`[...t].length`), not UTF-16 units (`t.length`), or some non-Latin terms will be
+    dropped.
+
+Rebuilds are incremental: document IDs are kept stable between runs, and a shard file is only rewritten when its
+    contents actually changed. Unchanged shards keep their old filename, so browsers keep their cached copy. Shards
+    that the previous manifest used are kept for one more build, so that a browser with that manifest cached can still
+    fetch them.
+
+The document ID assignments are build-side state, not something browsers need. They are kept in a separate file, by default `<out>.state.json` next to the output folder, so that uploading the output
+    folder never publishes them. Keep that file between builds; without it, every document gets a new ID.
+
+This script is called via CLI, eg:
+    python build_static_index.py ../data/example_files.json ../data/example_proteins.json --out ./static-index --report
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import statistics
+import time
+import unicodedata
+
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FN = 'manifest.json'
+FORMAT_VERSION = 2
+
+TOKEN_RE = re.compile(r'[^\W_]+')
+# The same tokens in JavaScript: `text.match(new RegExp(TOKEN_RE_JS, 'gu'))`
+TOKEN_RE_JS = r'[\p{L}\p{N}]+'
+MIN_TOKEN_LENGTH = 2
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('inputs', nargs='+', help='One or more GMetaList files')
+    parser.add_argument('--out', help='Output folder for the index', required=True)
+    parser.add_argument('--state', help='Build state file, kept between builds (default: <out>.state.json)')
+    parser.add_argument('--term-shards', type=int, default=64, help='Number of term shards')
+    parser.add_argument('--docs-per-shard', type=int, default=500, help='Number of documents per doc store shard')
+    parser.add_argument(
+        '--field',
+        action='append',
+        dest='fields',
+        help='Content field to index (default: every text field). May be repeated; use dots for nested fields.'
+    )
+    parser.add_argument('--report', help='Print a size and lookup latency report', action='store_true')
+    parser.add_argument('-v', help='Verbose output', action='store_true')
+    return parser.parse_args()
+
+
+#######################
+# Tokenizing and hashing. These must match the browser client exactly, so keep them deliberately simple.
+def tokenize(text: str) -> list[str]:
+    return [t for t in TOKEN_RE.findall(text.lower()) if len(t) >= MIN_TOKEN_LENGTH]
+
+
+def fnv1a_32(term: str) -> int:
+    h = 0x811c9dc5
+    for b in term.encode('utf-8'):
+        h ^= b
+        h = (h * 0x01000193) & 0xffffffff
+    return h
+
+
+def term_shard(term: str, n_shards: int) -> int:
+    return fnv1a_32(term) % n_shards
+
+
+def iter_text(value, fields: list[str] = None):
+    """Yield the searchable strings in a record's content"""
+    if fields:
+        for field in fields:
+            v = value
+            for part in field.split('.'):
+                v = v.get(part) if isinstance(v, dict) else None
+            yield from iter_text(v)
+        return
+
+    if isinstance(value, str):
+        # URLs and file paths are mostly noise as search terms (every record would match "https")
+        if not value.startswith(('http://', 'https://')):
+            yield value
+    elif isinstance(value, list):
+        for v in value:
+            yield from iter_text(v)
+    elif isinstance(value, dict):
+        for v in value.values():
+            yield from iter_text(v)
+
+
+#######################
+# Reading records
+def is_public(record: dict) -> bool:
+    return 'public' in record.get('visible_to', [])
+
+
+def load_public_records(filenames: list[str]) -> dict:
+    """
+    Returns {doc_key: record} for every public record. The same subject may appear in more than one input
+        (or with several entry IDs), so the key includes both.
+    """
+    records = {}
+    skipped = 0
+    for fn in filenames:
+        with open(fn, 'r') as f:
+            payload = json.load(f)
+        for r in payload['ingest_data']['gmeta']:
+            if not is_public(r):
+                # Never ship private records to a static host, even in "hidden" form; anyone can download the files
+                skipped += 1
+                continue
+            key = r['subject'] if not r.get('id') else f"{r['subject']}#{r['id']}"
+            records[key] = r
+    logger.info(f'Loaded {len(records)} public records ({skipped} non-public records skipped)')
+    return records
+
+
+#######################
+# Building
+def assign_doc_ids(keys: list[str], previous_ids: dict) -> dict:
+    """Keep existing IDs stable, so that unchanged documents stay in unchanged doc shards"""
+    doc_ids = {k: previous_ids[k] for k in keys if k in previous_ids}
+    next_id = max(previous_ids.values(), default=-1) + 1
+    for k in sorted(keys):
+        if k not in doc_ids:
+            doc_ids[k] = next_id
+            next_id += 1
+    return doc_ids
+
+
+def build_postings(records: dict, doc_ids: dict, fields: list[str] = None) -> (dict, int):
+    """Returns ({term: [[doc_id, tf], ...]}, total number of tokens)"""
+    postings = {}
+    n_tokens = 0
+    for key, r in records.items():
+        doc_id = doc_ids[key]
+        counts = {}
+        for text in iter_text(r.get('content', {}), fields):
+            for token in tokenize(text):
+                counts[token] = counts.get(token, 0) + 1
+        n_tokens += sum(counts.values())
+        for token, tf in counts.items():
+            postings.setdefault(token, []).append([doc_id, tf])
+
+    for plist in postings.values():
+        plist.sort()
+    return postings, n_tokens
+
+
+def encode_shard(data: dict) -> bytes:
+    raw = json.dumps(data, separators=(',', ':'), sort_keys=True).encode('utf-8')
+    # mtime=0 makes output byte-for-byte reproducible, so content hashes (and browser caches) survive a rebuild
+    return gzip.compress(raw, compresslevel=9, mtime=0)
+
+
+def write_shard(out_dir: str, kind: str, shard: int, data: dict, previous_files: dict) -> (str, bool):
+    """Write one shard under a content-hashed name. Returns (relative filename, whether anything was written)."""
+    blob = encode_shard(data)
+    digest = hashlib.sha256(blob).hexdigest()[:16]
+    rel_fn = f'{kind}/{shard}.{digest}.json.gz'
+    if previous_files.get(str(shard)) == rel_fn and os.path.exists(os.path.join(out_dir, rel_fn)):
+        return rel_fn, False
+
+    fn = os.path.join(out_dir, rel_fn)
+    os.makedirs(os.path.dirname(fn), exist_ok=True)
+    with open(fn, 'wb') as f:
+        f.write(blob)
+    return rel_fn, True
+
+
+def default_state_fn(out_dir: str) -> str:
+    return os.path.abspath(out_dir).rstrip(os.sep) + '.state.json'
+
+
+def load_json(fn: str) -> dict:
+    if not os.path.exists(fn):
+        return {}
+    with open(fn, 'r') as f:
+        return json.load(f)
+
+
+def shard_files(manifest: dict) -> set:
+    return set(manifest.get('term_files', {}).values()) | set(manifest.get('doc_files', {}).values())
+
+
+def write_json(fn: str, data: dict):
+    """Replace a file atomically, so that readers (browsers, or the next build) never see half of it"""
+    tmp_fn = fn + '.tmp'
+    with open(tmp_fn, 'w') as f:
+        json.dump(data, f, separators=(',', ':'))
+    os.replace(tmp_fn, fn)
+
+
+def build_index(filenames: list[str], out_dir: str, term_shards: int = 64, docs_per_shard: int = 500,
+                fields: list[str] = None, state_fn: str = None) -> dict:
+    """Build (or incrementally update) the static index, and return the new manifest"""
+    state_fn = state_fn or default_state_fn(out_dir)
+    previous = load_json(os.path.join(out_dir, MANIFEST_FN))
+    # Browsers may have the manifest we are about to replace cached for a while: keep the shards it points to
+    replaced = shard_files(previous)
+    state = load_json(state_fn)
+    if previous.get('version') != FORMAT_VERSION or state.get('version') != FORMAT_VERSION:
+        if previous or state:
+            logger.info('Existing index uses an older format; rebuilding everything')
+        previous = {}
+        state = {}
+    elif (previous['term_shards'] != term_shards or previous['docs_per_shard'] != docs_per_shard
+          or previous.get('fields') != fields):
+        # Shard layout changed: every shard would move anyway
+        logger.info('Shard layout changed; rebuilding everything')
+        previous = {}
+        state = {}
+
+    records = load_public_records(filenames)
+    doc_ids = assign_doc_ids(list(records), state.get('doc_ids', {}))
+    postings, n_tokens = build_postings(records, doc_ids, fields)
+
+    # Group terms and docs into shards
+    term_groups = {i: {} for i in range(term_shards)}
+    for term, plist in postings.items():
+        term_groups[term_shard(term, term_shards)][term] = plist
+
+    doc_groups = {}
+    for key, r in records.items():
+        doc_id = doc_ids[key]
+        doc_groups.setdefault(doc_id // docs_per_shard, {})[str(doc_id)] = {
+            'subject': r['subject'],
+            'content': r.get('content', {}),
+        }
+
+    written = 0
+    term_files = {}
+    for shard, data in term_groups.items():
+        term_files[str(shard)], changed = write_shard(out_dir, 'terms', shard, data, previous.get('term_files', {}))
+        written += changed
+
+    doc_files = {}
+    for shard, data in sorted(doc_groups.items()):
+        doc_files[str(shard)], changed = write_shard(out_dir, 'docs', shard, data, previous.get('doc_files', {}))
+        written += changed
+
+    manifest = {
+        'version': FORMAT_VERSION,
+        'hash': 'fnv1a32',
+        'token_pattern': TOKEN_RE.pattern,
+        'token_pattern_js': TOKEN_RE_JS,
+        'unicode_version': unicodedata.unidata_version,
+        'min_token_length': MIN_TOKEN_LENGTH,
+        'fields': fields,
+        'term_shards': term_shards,
+        'docs_per_shard': docs_per_shard,
+        'n_docs': len(records),
+        'n_terms': len(postings),
+        'avg_doc_length': n_tokens / len(records) if records else 0,
+        'term_files': term_files,
+        'doc_files': doc_files,
+    }
+    write_json(state_fn, {'version': FORMAT_VERSION, 'doc_ids': doc_ids})
+    # Write the manifest last: until it is replaced, clients keep using the old (still present) shard files
+    write_json(os.path.join(out_dir, MANIFEST_FN), manifest)
+
+    stale = remove_stale_shards(out_dir, shard_files(manifest) | replaced)
+    logger.info(f'Wrote {written} changed shard(s), removed {stale} stale shard(s)')
+    return manifest
+
+
+def remove_stale_shards(out_dir: str, keep: set) -> int:
+    removed = 0
+    for kind in ('terms', 'docs'):
+        folder = os.path.join(out_dir, kind)
+        if not os.path.isdir(folder):
+            continue
+        for name in os.listdir(folder):
+            rel_fn = f'{kind}/{name}'
+            if rel_fn not in keep:
+                os.remove(os.path.join(out_dir, rel_fn))
+                removed += 1
+    return removed
+
+
+#######################
+# Querying: a reference implementation of what the browser client does, used for the report and for debugging
+def read_shard(out_dir: str, rel_fn: str) -> dict:
+    with open(os.path.join(out_dir, rel_fn), 'rb') as f:
+        return json.loads(gzip.decompress(f.read()))
+
+
+def query(out_dir: str, manifest: dict, text: str, limit: int = 10) -> list[dict]:
+    """Rank documents containing all query terms with a simple tf-idf score, then fetch their stored content"""
+    terms = tokenize(text)
+    if not terms:
+        return []
+
+    n_docs = manifest['n_docs']
+    scores = None
+    for term in set(terms):
+        shard = read_shard(out_dir, manifest['term_files'][str(term_shard(term, manifest['term_shards']))])
+        plist = shard.get(term, [])
+        idf = math.log(1 + n_docs / (1 + len(plist)))
+        term_scores = {doc_id: tf * idf for doc_id, tf in plist}
+        if scores is None:
+            scores = term_scores
+        else:
+            # AND semantics: narrow down to docs that contain every term
+            scores = {d: s + term_scores[d] for d, s in scores.items() if d in term_scores}
+
+    ranked = sorted(scores.items(), key=lambda kv: -kv[1])[:limit]
+    results = []
+    doc_shards = {}
+    for doc_id, score in ranked:
+        shard_no = doc_id // manifest['docs_per_shard']
+        if shard_no not in doc_shards:
+            doc_shards[shard_no] = read_shard(out_dir, manifest['doc_files'][str(shard_no)])
+        results.append({'score': score, **doc_shards[shard_no][str(doc_id)]})
+    return results
+
+
+def size_report(out_dir: str, manifest: dict, sample_terms: int = 200) -> dict:
+    """Summarize what a browser would download, and how long a lookup takes once the bytes have arrived"""
+    def sizes(files: dict) -> list[int]:
+        return [os.path.getsize(os.path.join(out_dir, fn)) for fn in files.values()]
+
+    term_sizes = sizes(manifest['term_files'])
+    doc_sizes = sizes(manifest['doc_files'])
+    manifest_size = os.path.getsize(os.path.join(out_dir, MANIFEST_FN))
+
+    # Time a sample of single-term queries: shard read + decompress + parse + rank + doc fetch
+    terms = sorted({t for fn in manifest['term_files'].values() for t in read_shard(out_dir, fn)})
+    step = max(1, len(terms) // sample_terms)
+    latencies = []
+    for term in terms[::step]:
+        start = time.perf_counter()
+        query(out_dir, manifest, term)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    def pct(values, p):
+        return statistics.quantiles(values, n=100)[p - 1] if len(values) > 1 else (values[0] if values else 0)
+
+    return {
+        'n_docs': manifest['n_docs'],
+        'n_terms': manifest['n_terms'],
+        'manifest_bytes': manifest_size,
+        'term_shards': len(term_sizes),
+        'term_shard_bytes_total': sum(term_sizes),
+        'term_shard_bytes_max': max(term_sizes, default=0),
+        'doc_shards': len(doc_sizes),
+        'doc_shard_bytes_total': sum(doc_sizes),
+        'doc_shard_bytes_max': max(doc_sizes, default=0),
+        # Worst case for a one-term query: one term shard plus one doc shard (after the manifest is cached)
+        'single_term_query_bytes_max': max(term_sizes, default=0) + max(doc_sizes, default=0),
+        'lookup_ms_p50': round(pct(latencies, 50), 3),
+        'lookup_ms_p95': round(pct(latencies, 95), 3),
+        'lookup_samples': len(latencies),
+    }
+
+
+if __name__ == '__main__':
+    args = parse_args()
+
+    if args.v:
+        logging.basicConfig(level=logging.INFO)
+
+    os.makedirs(args.out, exist_ok=True)
+    manifest = build_index(
+        args.inputs,
+        args.out,
+        term_shards=args.term_shards,
+        docs_per_shard=args.docs_per_shard,
+        fields=args.fields,
+        state_fn=args.state,
+    )
+    print(f"Indexed {manifest['n_docs']} public records ({manifest['n_terms']} terms) into {args.out}")
+
+    if args.report:
+        for k, v in size_report(args.out, manifest).items():
+            print(f'{k}: {v}')
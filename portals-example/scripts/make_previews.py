@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Generate small "preview" versions of the assets embedded by a static search portal, and rewrite a GMetaList to use them
+
+The portal renders whatever `preview_url` points at. That's great for a 2 KB CSV, but a 12 MP photo or a
+    50k-row table makes the first page load crawl. This script builds lightweight derivatives once, ahead of time:
+
+* Images become thumbnails (longest side capped, eg 512px)
+* Tables (CSV/TSV) are truncated to the first few rows
+* Plotly JSON files keep every trace, but long data arrays are downsampled
+
+Derivatives are stored content-addressed (the filename is the sha256 of the derivative bytes), so the output folder
+    can be uploaded to a Globus collection (or any static host) and cached forever. A small index file remembers
+    which source produced which derivative, so re-running the script only re-processes assets that changed.
+
+Sources can be read from a local folder (eg a staging copy of the collection) or downloaded via HTTPS.
+    See `transfer-data/scripts/download_via_https.py` for how to find the HTTPS URL for a collection.
+
+This script is called via CLI, eg:
+    python make_previews.py ../data/example_files.json previews.json --store ./previews --base-url https://example.data.globus.org/previews
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import hashlib
+import io
+import json
+import logging
+import os
+import tempfile
+import urllib.parse
+
+
+logger = logging.getLogger(__name__)
+
+# The index lives alongside the derivatives, so the store folder is self-describing and can be synced as one unit
+INDEX_FN = 'index.json'
+
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.gif', '.webp', '.bmp', '.tif', '.tiff'}
+TABLE_EXTENSIONS = {'.csv', '.tsv'}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('input', help='A GMetaList file, eg `data/example_files.json`')
+    parser.add_argument('output', help='Where to write the rewritten GMetaList')
+    parser.add_argument('--store', help='Folder that holds the derivative files', required=True)
+    parser.add_argument('--base-url', help='The public URL where the contents of `--store` will be served', required=True)
+    parser.add_argument(
+        '--local-root',
+        help='Read sources from this folder instead of downloading them. URL paths are resolved relative to this folder.'
+    )
+    parser.add_argument(
+        '--field',
+        action='append',
+        dest='fields',
+        help='Content field(s) holding an asset URL to rewrite (default: preview_url). May be repeated.'
+    )
+    parser.add_argument('--max-px', type=int, default=512, help='Longest side of an image thumbnail')
+    parser.add_argument('--max-rows', type=int, default=50, help='Number of table rows to keep (including header)')
+    parser.add_argument('--max-points', type=int, default=2000, help='Max data points kept per plotly trace array')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Size of the process pool')
+    parser.add_argument('-v', help='Verbose output', action='store_true')
+    return parser.parse_args()
+
+
+#######################
+# Choosing and building derivatives. These run inside worker processes, so they must be top-level (picklable) functions.
+def derivative_kind(url: str) -> str:
+    """Decide how to shrink a file, based on its name. Returns None for things we leave alone (PDFs, code, etc)."""
+    path = urllib.parse.urlparse(url).path.lower()
+    ext = os.path.splitext(path)[1]
+    if ext in IMAGE_EXTENSIONS:
+        return 'image'
+    elif ext in TABLE_EXTENSIONS:
+        return 'table'
+    elif ext == '.json' and 'plotly' in os.path.basename(path):
+        # Same naming convention used by `search/scripts/ris-to-globus.py` to find plots
+        return 'plot'
+    return None
+
+
+def make_thumbnail(data: bytes, max_px: int) -> (bytes, str):
+    # Pillow is only needed for images; import here so the rest of the pipeline works without it
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as img:
+        img.thumbnail((max_px, max_px))
+        # Keep transparency for logos and icons; JPEG is much smaller for photos
+        if img.mode in ('RGBA', 'LA', 'P'):
+            fmt, ext = 'PNG', '.png'
+        else:
+            fmt, ext = 'JPEG', '.jpg'
+            img = img.convert('RGB')
+        out = io.BytesIO()
+        img.save(out, format=fmt, optimize=True)
+    return out.getvalue(), ext
+
+
+def make_table_head(data: bytes, max_rows: int, ext: str) -> (bytes, str):
+    # Split on raw newlines rather than parsing: a preview does not need to understand quoting, and this never loads
+    #   more than the requested number of rows into new objects
+    lines = data.split(b'\n', max_rows)
+    if len(lines) > max_rows:
+        # The last piece is everything after the rows we keep
+        lines.pop()
+    elif lines[-1] == b'':
+        # The whole file fit, and it already ended in a newline
+        lines.pop()
+    if not lines:
+        return b'', ext
+    return b'\n'.join(lines) + b'\n', ext
+
+
+def downsample(values: list, max_points: int) -> list:
+    if len(values) <= max_points:
+        return values
+    # Keep a regular stride, plus the final point so that the x axis range is preserved
+    step = -(-len(values) // max_points)
+    sampled = values[::step]
+    if (len(values) - 1) % step:
+        sampled.append(values[-1])
+    return sampled
+
+
+def make_plot_preview(data: bytes, max_points: int) -> (bytes, str):
+    plot = json.loads(data)
+    traces = plot.get('data', []) if isinstance(plot, dict) else []
+    for trace in traces:
+        for key, value in trace.items():
+            # Only touch the big parallel arrays (x, y, z, text, marker sizes...); leave names and settings alone
+            if isinstance(value, list) and len(value) > max_points:
+                trace[key] = downsample(value, max_points)
+    return json.dumps(plot, separators=(',', ':')).encode('utf-8'), '.json'
+
+
+def build_derivative(kind: str, data: bytes, source_ext: str, options: dict) -> (bytes, str):
+    if kind == 'image':
+        return make_thumbnail(data, options['max_px'])
+    elif kind == 'table':
+        return make_table_head(data, options['max_rows'], source_ext)
+    elif kind == 'plot':
+        return make_plot_preview(data, options['max_points'])
+    raise ValueError(f'Unknown derivative type: {kind}')
+
+
+#######################
+# Fetching sources
+def local_path_for(url: str, local_root: str) -> str:
+    """Map `https://host/some/file.png` to `{local_root}/some/file.png`"""
+    rel = urllib.parse.unquote(urllib.parse.urlparse(url).path).lstrip('/')
+    return os.path.join(local_root, rel)
+
+
+def fetch_source(url: str, local_root: str = None, previous: dict = None) -> (bytes, dict):
+    """
+    Read the source file, unless we can tell cheaply that it has not changed since the last run.
+
+    Returns (data, stamp). `data` is None when the previous result can be reused.
+        The stamp records whatever cheap change-detection info is available (size + mtime, or HTTP ETag).
+    """
+    previous = previous or {}
+    if local_root:
+        fn = local_path_for(url, local_root)
+        st = os.stat(fn)
+        stamp = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+        if previous.get('stamp') == stamp:
+            return None, stamp
+        with open(fn, 'rb') as f:
+            return f.read(), stamp
+
+    # Only remote files need an HTTP client; a local mirror (eg a nightly cron job) skips the import entirely
+    import requests
+
+    headers = {}
+    if etag := previous.get('stamp', {}).get('etag'):
+        # GCS HTTPS servers support conditional requests, so an unchanged file costs one tiny round trip
+        headers['If-None-Match'] = etag
+    resp = requests.get(url, headers=headers, timeout=60)
+    if resp.status_code == requests.codes.not_modified:
+        return None, previous['stamp']
+    resp.raise_for_status()
+    return resp.content, {'etag': resp.headers.get('ETag')}
+
+
+def process_asset(url: str, kind: str, options: dict, previous: dict = None) -> dict:
+    """
+    Worker entry point: fetch one source and build its derivative.
+
+    Returns an index entry: {url, kind, stamp, source_sha256, derivative}
+    """
+    data, stamp = fetch_source(url, local_root=options['local_root'], previous=previous)
+    if data is None:
+        logger.debug(f'Source unchanged (by stamp), skipping {url}')
+        return {**previous, 'stamp': stamp, 'skipped': True}
+
+    source_sha256 = hashlib.sha256(data).hexdigest()
+    if previous and previous.get('source_sha256') == source_sha256:
+        # File was touched (or re-served with a new ETag), but the bytes are the same
+        return {**previous, 'stamp': stamp, 'skipped': True}
+
+    source_ext = os.path.splitext(urllib.parse.urlparse(url).path)[1].lower()
+    derived, ext = build_derivative(kind, data, source_ext, options)
+
+    digest = hashlib.sha256(derived).hexdigest()
+    # Fan out into sub-folders so that a big portal doesn't put 10^5 files in a single directory
+    rel_fn = f'{digest[:2]}/{digest}{ext}'
+    out_fn = os.path.join(options['store'], rel_fn)
+    if not os.path.exists(out_fn):
+        os.makedirs(os.path.dirname(out_fn), exist_ok=True)
+        # Write to a temp name first: a crash mid-write must never leave a truncated file under a "final" hash name
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(out_fn), delete=False) as f:
+            f.write(derived)
+        # Temp files are created owner-only; derivatives are meant to be published
+        os.chmod(f.name, 0o644)
+        os.replace(f.name, out_fn)
+
+    return {
+        'url': url,
+        'kind': kind,
+        'stamp': stamp,
+        'source_sha256': source_sha256,
+        'source_size': len(data),
+        'derivative': rel_fn,
+        'derivative_size': len(derived),
+        'skipped': False,
+    }
+
+
+#######################
+# Index and record rewriting
+def load_index(store: str) -> dict:
+    fn = os.path.join(store, INDEX_FN)
+    if not os.path.exists(fn):
+        return {}
+    with open(fn, 'r') as f:
+        return json.load(f)
+
+
+def save_index(store: str, index: dict):
+    fn = os.path.join(store, INDEX_FN)
+    tmp_fn = fn + '.tmp'
+    with open(tmp_fn, 'w') as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+    os.replace(tmp_fn, fn)
+
+
+def option_key(kind: str, options: dict) -> str:
+    """Changing the thumbnail size (etc) must invalidate old derivatives of that kind, even if sources are unchanged"""
+    relevant = {
+        'image': ('max_px',),
+        'table': ('max_rows',),
+        'plot': ('max_points',),
+    }[kind]
+    return ','.join(f'{k}={options[k]}' for k in relevant)
+
+
+def find_assets(records: list[dict], fields: list[str]) -> dict:
+    """Collect the unique asset URLs referenced by records (several records may share one file)"""
+    assets = {}
+    for r in records:
+        content = r.get('content', {})
+        for field in fields:
+            url = content.get(field)
+            if url and (kind := derivative_kind(url)):
+                assets[url] = kind
+    return assets
+
+
+def rewrite_records(records: list[dict], fields: list[str], index: dict, base_url: str) -> int:
+    """Point each asset field at its derivative, and keep the original URL available for "download full size" links"""
+    count = 0
+    for r in records:
+        content = r.get('content', {})
+        for field in fields:
+            url = content.get(field)
+            entry = index.get(url)
+            if not entry:
+                continue
+            content[f'{field}_original'] = url
+            content[field] = urllib.parse.urljoin(base_url.rstrip('/') + '/', entry['derivative'])
+            count += 1
+    return count
+
+
+def run_pipeline(records: list[dict], fields: list[str], options: dict, workers: int = None) -> dict:
+    """Build any missing derivatives and return the updated index"""
+    index = load_index(options['store'])
+    assets = find_assets(records, fields)
+
+    results = {}
+    failures = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        for url, kind in assets.items():
+            previous = index.get(url)
+            if previous and (previous.get('options') != option_key(kind, options)
+                             or not os.path.exists(os.path.join(options['store'], previous['derivative']))):
+                # Settings changed, or someone cleaned out the store: rebuild from scratch
+                previous = None
+            futures[pool.submit(process_asset, url, kind, options, previous)] = url
+
+        for fut in as_completed(futures):
+            url = futures[fut]
+            try:
+                entry = fut.result()
+            except Exception:
+                # A single broken link (the demo dataset deliberately includes a 404) should not sink the whole batch
+                logger.exception(f'Could not build a preview for {url}; the record will keep its original URL')
+                failures += 1
+                continue
+            entry['options'] = option_key(entry['kind'], options)
+            results[url] = entry
+
+    built = sum(1 for e in results.values() if not e.pop('skipped'))
+    logger.info(f'{len(assets)} assets: {built} built, {len(results) - built} unchanged, {failures} failed')
+
+    # Keep entries for assets not referenced by this input file: one store can serve several GMetaLists
+    index.update(results)
+    save_index(options['store'], index)
+    return index
+
+
+if __name__ == '__main__':
+    args = parse_args()
+
+    if args.v:
+        logging.basicConfig(level=logging.INFO)
+
+    fields = args.fields or ['preview_url']
+    options = {
+        'store': os.path.abspath(args.store),
+        'local_root': args.local_root,
+        'max_px': args.max_px,
+        'max_rows': args.max_rows,
+        'max_points': args.max_points,
+    }
+    os.makedirs(options['store'], exist_ok=True)
+
+    with open(args.input, 'r') as f:
+        payload = json.load(f)
+    records = payload['ingest_data']['gmeta']
+
+    index = run_pipeline(records, fields, options, workers=args.workers)
+    n_rewritten = rewrite_records(records, fields, index, args.base_url)
+
+    with open(args.output, 'w') as f:
+        json.dump(payload, f, indent=2)
+
+    print(f'Rewrote {n_rewritten} asset links in {args.output}. Upload the contents of {args.store} to {args.base_url}')
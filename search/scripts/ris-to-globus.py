@@ -8,11 +8,16 @@ Demonstrates data cleanup, then adds a few specialized and silly things to suppo
 import argparse
 from datetime import datetime, timezone
 import json
+import os
 import random
+import sys
 import urllib.parse
 
 import rispy
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from apecx_common import tracing  # noqa: E402
+
 
 def parse_args():
     parser = argparse.ArgumentParser()
@@ -23,6 +28,7 @@ def parse_args():
     # In initial demo, sample file field needs a little help to be used as a webapp embed. Can webapp be smarter?
     parser.add_argument('--base-url', help="The HTTPS URL for this Globus endpoint (see app.globus.org to get yours)", required=True)
     parser.add_argument('--group-id', help="The uuid of a private globus group. Used to demonstrate permissions, for any file tagged `hidden``")  # Optional. If omitted, principal sets queries won't work for this demo.
+    parser.add_argument('--trace', help=tracing.TRACE_HELP)
     return parser.parse_args()
 
 
@@ -166,24 +172,29 @@ def to_gingest_payload(records: list[dict]) -> dict:
 if __name__ == '__main__':
     args = parse_args()
     globus_admin_group_urn = f'urn:globus:groups:id:{args.group_id or ""}'
+    tracing.enable(args.trace)
 
-    with open(args.input, 'r') as f:
+    with tracing.span('read_ris', path=args.input) as span, open(args.input, 'r') as f:
         ris_entries = rispy.load(f)  # type: list[dict]
+        span.set(bytes=f.tell(), entries=len(ris_entries))
 
     records = []
-    for r in ris_entries:
-        # Build record data, then add globus search permissions rules
-        t = cleanup_citation(args.base_url, r)
-        t = build_record(t)
-        t = citation_to_gingest(t, admin_group_urn=globus_admin_group_urn)
-        records.append(t)
+    with tracing.span('build_records') as span:
+        for r in ris_entries:
+            # Build record data, then add globus search permissions rules
+            t = cleanup_citation(args.base_url, r)
+            t = build_record(t)
+            t = citation_to_gingest(t, admin_group_urn=globus_admin_group_urn)
+            records.append(t)
+        span.set(records=len(records))
 
     # Add wrapper for globus ingest payload
     res = to_gingest_payload(records)
 
     out_fn= args.output
 
-    with open(args.output, 'w') as f:
+    with tracing.span('write_output', path=out_fn) as span, open(args.output, 'w') as f:
         json.dump(res, f, indent=2)
+        span.set(bytes=f.tell())
 
     print(f'Wrote {len(records)} records to {out_fn}')
@@ -9,18 +9,14 @@ A simple example that uses the Globus Python SDK to perform a search.
 Call via CLI
 """
 import argparse
+import asyncio
 import json
 import os.path
+import sys
 
-from globus_sdk import (
-    SearchClient, UserApp
-)
-
-def str_ne(value):
-    """Validator rejects empty strings"""
-    if not value:
-        raise ValueError("Must not be an empty string")
-    return value
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from apecx_common import aio, tracing  # noqa: E402
+from apecx_common.args import str_ne  # noqa: E402
 
 def parse_args():
     parser = argparse.ArgumentParser()
@@ -30,35 +26,45 @@ def parse_args():
         type=str_ne,
         help='The Globus oauth native/thick client ID to use for user credential requests'
     )
+    parser.add_argument('--trace', help=tracing.TRACE_HELP)
     return parser.parse_args()
 
 
-if __name__ == '__main__':
-    args = parse_args()
-    search_index = args.search_index
+async def run_queries(search_index: str, client_id: str):
+    from globus_sdk import SearchClient, UserApp
 
     # Compares the results of a search index query using an authenticated vs unauthenticated query
-    unauthenticated = SearchClient()
-
-    your_account = UserApp("authenticated", client_id=args.client_id)
-    authenticated = SearchClient(app=your_account)
+    unauthenticated = aio.AsyncClient(SearchClient())
 
-    # If you follow the tutorial, extra results will be added that are private to authenticated users,
-    # Demonstrate that the same query can yield different results for a search term with a hidden record
-    unauth_query = unauthenticated.search(search_index, "darpa")  # expect 1 result for unauthenticated
-    auth_query = authenticated.search(search_index, "darpa")  # expect 2 results: some entries are only visible when logged in
+    your_account = UserApp("authenticated", client_id=client_id)
+    authenticated = aio.AsyncClient(SearchClient(app=your_account))
+    aio.ensure_login(your_account)
 
-    print('Number of results (unauthenticated): {}'.format(unauth_query.data['total']))
-    print('Number of results (authenticated): {}'.format(auth_query.data['total']))
-
-    # Now filter by principal sets and show how authenticated query results change!
     q_fn = os.path.abspath(os.path.join(os.path.dirname(__file__), '../queries/filter_principal_sets.json'))
     with open(q_fn, 'r') as f:
         role_query_doc = json.load(f)
 
-    role_query = authenticated.post_search(search_index, role_query_doc)
+    # The three queries don't depend on each other, so send them all at once
+    return await asyncio.gather(
+        # If you follow the tutorial, extra results will be added that are private to authenticated users,
+        # Demonstrate that the same query can yield different results for a search term with a hidden record
+        unauthenticated.search(search_index, "darpa"),  # expect 1 result for unauthenticated
+        authenticated.search(search_index, "darpa"),  # expect 2 results: some entries are only visible when logged in
+        # Now filter by principal sets and show how authenticated query results change!
+        authenticated.post_search(search_index, role_query_doc),
+    )
 
 
+if __name__ == '__main__':
+    args = parse_args()
+    search_index = args.search_index
+    tracing.enable(args.trace)
+
+    unauth_query, auth_query, role_query = asyncio.run(run_queries(search_index, args.client_id))
+
+    print('Number of results (unauthenticated): {}'.format(unauth_query.data['total']))
+    print('Number of results (authenticated): {}'.format(auth_query.data['total']))
+
     print('Number of results (authenticated, curators principal set only): {}'.format(role_query.data['total']))
     first_result = role_query.data['gmeta'][0]['entries'][0]
     print('Query matched principal sets for: ', first_result['matched_principal_sets'])
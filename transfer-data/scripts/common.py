@@ -2,36 +2,22 @@
 Common functions used by multiple demos
 """
 import logging
+import os
+import sys
 import typing as ty
 
-from globus_sdk import TransferData, TransferClient
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+# Argument validators now live with the other shared helpers; re-exported here for the scripts that import them from us
+from apecx_common.args import parse_target, str_ne  # noqa: E402,F401
 
-logger = logging.getLogger(__name__)
-
-
-def str_ne(value):
-    """Validator rejects empty strings"""
-    if not value:
-        raise ValueError("Must not be an empty string")
-    return value
+if ty.TYPE_CHECKING:
+    # The SDK is slow to import, so the scripts load it only after parsing their arguments (and answering `--help`)
+    from globus_sdk import TransferData, TransferClient
 
-
-def parse_target(location: str) -> (str, str):
-    """
-    Allow CLI-friendly `source:path` syntax for copies. Path is required.
-    """
-    loc = location.split(':')
-    if len(loc) != 2:
-        # Mapped collections present the path on the filesystem, rather than just the directories a user can see
-        # So
-        # We want to be careful to avoid requesting a transfer of "way too much" by accident, so user must always specify path
-        raise ValueError("Must specify `source:path`")
-
-    coll, path = loc
-    return coll, path
+logger = logging.getLogger(__name__)
 
 
-def requires_data_access_scope(client: TransferClient, coll_id: str) -> bool:
+def requires_data_access_scope(client: 'TransferClient', coll_id: str) -> bool:
     """
     Determine if this collection requires special extra auth permissions before
         we can use this script to create a transfer. Non-HA GCSv5 mapped collections require extra data access scopes.
@@ -60,10 +46,12 @@ def requires_data_access_scope(client: TransferClient, coll_id: str) -> bool:
     return (r.data['high_assurance'] is False) and (r.data['entity_type'] == 'GCSv5_mapped_collection')
 
 
-def build_transfer_options(s_coll, s_path, d_coll, d_path) -> TransferData:
+def build_transfer_options(s_coll, s_path, d_coll, d_path) -> 'TransferData':
     """
     Build base options for the transfer, moving data from one source to one destination.
     """
+    from globus_sdk import TransferData
+
     tdata = TransferData(
         source_endpoint=s_coll,
         destination_endpoint=d_coll,
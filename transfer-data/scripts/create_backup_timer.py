@@ -18,14 +18,9 @@ This script is called via CLI.
 """
 import argparse
 import logging
-
-from globus_sdk import (
-    UserApp,
-    RecurringTimerSchedule,
-    TimersClient,
-    TransferData,
-    TransferTimer, TransferClient,
-)
+import os
+import sys
+import typing as t
 
 from common import (
     build_transfer_options,
@@ -34,6 +29,12 @@ from common import (
     str_ne,
 )
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from apecx_common import aio, tracing  # noqa: E402
+
+if t.TYPE_CHECKING:
+    from globus_sdk import TimersClient, TransferData
+
 logger = logging.getLogger(__name__)
 
 
@@ -48,11 +49,12 @@ def parse_args():
     parser.add_argument('source', help='Source UUID:path', type=parse_target)
     parser.add_argument('dest', help='Source UUID:path', type=parse_target)
     parser.add_argument('-v', help='Verbose output', action='store_true')
+    parser.add_argument('--trace', help=tracing.TRACE_HELP)
 
     return parser.parse_args()
 
 
-def add_transfer_scopes(client: TimersClient, coll_id: str) -> TimersClient:
+def add_transfer_scopes(client: 'TimersClient', coll_id: str) -> 'TimersClient':
     """
     If (and only if) something is a non-HA GCSv5 mapped collection, special extra login scopes are required.
     https://globus-sdk-python.readthedocs.io/en/stable/services/transfer.html#globus_sdk.TransferClient.add_app_data_access_scope
@@ -65,26 +67,34 @@ def add_transfer_scopes(client: TimersClient, coll_id: str) -> TimersClient:
     return client.add_app_transfer_data_access_scope(coll_id)
 
 
-def create_client(client_id: str, s_coll: str, d_coll: str) -> TimersClient:
+def create_client(client_id: str, s_coll: str, d_coll: str) -> 'TimersClient':
     """Create the access client and set required user permissions"""
+    from globus_sdk import TimersClient, TransferClient, UserApp
+
     app = UserApp(client_id=client_id)
 
     # This script needs two clients: one to see if this is a mapped collection, and another to handle transfer stuff
-    transfer_client = TransferClient(app=app)
-    timers_client = TimersClient(app=app)
-
-    if requires_data_access_scope(transfer_client, s_coll):
+    transfer_client = aio.share_connections(TransferClient(app=app))
+    timers_client = aio.share_connections(TimersClient(app=app))
+
+    # The two lookups are independent, so make them at the same time (after a single login)
+    aio.ensure_login(app)
+    s_mapped, d_mapped = aio.run_concurrently(
+        lambda: requires_data_access_scope(transfer_client, s_coll),
+        lambda: requires_data_access_scope(transfer_client, d_coll),
+    )
+    if s_mapped:
         logger.warning(f'Collection {s_coll} is a mapped collection, and your consent may expire and cause timers to fail. We strongly recommend guest collections for timers.')
         add_transfer_scopes(timers_client, s_coll)
 
-    if requires_data_access_scope(transfer_client, d_coll):
+    if d_mapped:
         logger.warning(
             f'Collection {d_coll} is a mapped collection, and your consent may expire and cause timers to fail. We strongly recommend guest collections for timers.')
         add_transfer_scopes(timers_client, d_coll)
     return timers_client
 
 
-def add_demo_filters(options: TransferData) -> TransferData:
+def add_demo_filters(options: 'TransferData') -> 'TransferData':
     """
     Add some upload filters that are only relevant to this demo. Separated out for clarity.
 
@@ -103,6 +113,9 @@ if __name__ == "__main__":
     if args.v:
         # Verbose mode: make sure to output logs to console
         logging.basicConfig(level=logging.DEBUG)
+    tracing.enable(args.trace)
+
+    from globus_sdk import RecurringTimerSchedule, TransferTimer
 
     s_coll, s_path = args.source
     d_coll, d_path = args.dest
@@ -12,10 +12,7 @@ For small files like data tables or pictures, the file can then be embedded dire
 import argparse
 import logging
 import os.path
-
-import requests
-
-from globus_sdk import TransferClient, UserApp
+import sys
 
 from common import (
     parse_target,
@@ -23,6 +20,9 @@ from common import (
     str_ne,
 )
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from apecx_common import scheduler, tracing  # noqa: E402
+
 
 logger = logging.getLogger(__name__)
 
@@ -35,12 +35,15 @@ def parse_args():
     )
     parser.add_argument('source', help='Guest Collection UUID:path', type=parse_target)
     parser.add_argument('-v', help='Verbose output', action='store_true')
+    parser.add_argument('--trace', help=tracing.TRACE_HELP)
     return parser.parse_args()
 
 
 def create_client(client_id, coll_id: str):
+    from globus_sdk import TransferClient, UserApp
+
     app = UserApp(client_id=client_id)
-    client = TransferClient(app=app)
+    client = scheduler.install(TransferClient(app=app))
 
     if requires_data_access_scope(client, coll_id):
         # Engage "zero subtlety" mode. Public data sharing portals shouldn't use highly access-restricted mapped collections.
@@ -55,28 +58,39 @@ def download_file(base_url: str, remote_path: str, local_filename: str):
     Download a file locally. The actual API has nuances aimed at web browsers (like content-disposition headers);
         we don't cover those in this simple demo. Consult the docs to see the full range of useful options available.
     """
+    # Imported here rather than at the top, so that `--help` doesn't wait for it
+    import requests
+
     # This may fail if there is no such file!
     if not remote_path.startswith('/'):
         remote_path = '/' + remote_path
 
     url = base_url + remote_path
 
-    try:
-        # Globus works with big data! Use streaming downloads instead of fitting it all into memory
-        resp = requests.get(url, stream=True)
-    except Exception as e:
-        logger.exception(f'Unknown download failure at URL {url}')
-        return False
-
-    if resp.status_code != requests.codes.ok:
-        # File not found will yield 404.
-        # Connection refused errors are possible if server firewall rules are not configured
-        logger.error(f'Download of {url} failed with status code {resp.status_code}')
-        return False
-
-    with open(local_filename, 'wb') as f:
-        for chunk in resp.iter_content(chunk_size=16 * 1024):
-            f.write(chunk)
+    with tracing.span('download_file', url=url) as span:
+        try:
+            # Globus works with big data! Use streaming downloads instead of fitting it all into memory
+            resp = requests.get(url, stream=True)
+        except Exception as e:
+            logger.exception(f'Unknown download failure at URL {url}')
+            span.set(error=str(e))
+            return False
+
+        span.set(**{'http.status_code': resp.status_code})
+        scheduler.observe(resp)
+        if resp.status_code != requests.codes.ok:
+            # File not found will yield 404.
+            # Connection refused errors are possible if server firewall rules are not configured
+            logger.error(f'Download of {url} failed with status code {resp.status_code}')
+            return False
+
+        size = chunks = 0
+        with open(local_filename, 'wb') as f:
+            for chunk in resp.iter_content(chunk_size=16 * 1024):
+                f.write(chunk)
+                size += len(chunk)
+                chunks += 1
+        span.set(**{'http.response.body.size': size}, chunks=chunks)
     return True
 
 
@@ -85,6 +99,7 @@ if __name__ == '__main__':
 
     if args.v:
         logging.basicConfig(level=logging.INFO)
+    tracing.enable(args.trace)
 
     s_coll, s_path = args.source
 
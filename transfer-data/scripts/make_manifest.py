@@ -0,0 +1,213 @@
+"""
+Hash every file in a staging folder (in parallel) and write the `manifest.json` expected by the flows demo validator
+
+Our uploads use `verify_checksum=True` and `sync_level="checksum"` (see `common.build_transfer_options`), and the
+    `validate_in_place` flow expects a `manifest.json` listing each file. Producing both by hand doesn't scale, and
+    naively re-hashing a multi-terabyte staging area on every run takes hours. This script:
+
+* Walks the staging folder, and hashes files on a thread pool (hashlib releases the GIL while hashing large buffers,
+    so threads really do run in parallel), reading with large `readinto` buffers to avoid per-chunk allocations. Each
+    thread allocates its buffer once and reuses it for every file, so a folder of many small files stays cheap.
+* Remembers (path, size, mtime) -> checksum in a small sqlite cache, so files that haven't changed since the last
+    run are never read again
+* Writes `manifest.json`: a JSON list of `{"path", "size", "checksum", "checksum_algorithm"}` entries, with paths
+    relative to the staging folder
+
+MD5 is the default because it is what Globus Transfer uses for checksum verification.
+
+This script is called via CLI, eg:
+    python make_manifest.py /data/staging/dataset-042 -v
+"""
+import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FN = 'manifest.json'
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'apecx-demos')
+
+# One read buffer per hashing thread
+_buffers = threading.local()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('staging', help='The folder to describe')
+    parser.add_argument('--output', help=f'Where to write the manifest (default: <staging>/{MANIFEST_FN})')
+    parser.add_argument('--algorithm', default='md5', help='Any hashlib algorithm (default: md5, as used by Globus)')
+    parser.add_argument('--cache', help='Checksum cache file (default: one per staging folder, under ~/.cache)')
+    parser.add_argument('--workers', type=int, default=min(32, (os.cpu_count() or 1) * 2), help='Hashing threads')
+    parser.add_argument('--buffer-mb', type=int, default=8, help='Read buffer size per thread, in MiB')
+    parser.add_argument('--include-hidden', help='Include dotfiles and dot-folders', action='store_true')
+    parser.add_argument('-v', help='Verbose output', action='store_true')
+    args = parser.parse_args()
+    if args.buffer_mb <= 0:
+        parser.error('--buffer-mb must be at least 1')
+    return args
+
+
+def walk_files(root: str, include_hidden: bool = False, exclude: set = None):
+    """Yield (relative path, size, mtime_ns) for every regular file, in a stable (sorted) order"""
+    exclude = exclude or set()
+    stack = ['']
+    while stack:
+        rel_dir = stack.pop()
+        with os.scandir(os.path.join(root, rel_dir)) as it:
+            entries = sorted(it, key=lambda e: e.name)
+        subdirs = []
+        for entry in entries:
+            if not include_hidden and entry.name.startswith('.'):
+                continue
+            rel = os.path.join(rel_dir, entry.name) if rel_dir else entry.name
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(rel)
+            elif entry.is_file(follow_symlinks=False) and rel not in exclude:
+                # scandir already has the stat info on most platforms; no extra syscall
+                st = entry.stat(follow_symlinks=False)
+                yield rel, st.st_size, st.st_mtime_ns
+        # Reverse so that popping from the stack visits sub-folders in sorted order
+        stack.extend(reversed(subdirs))
+
+
+def hash_file(fn: str, algorithm: str, buffer_size: int) -> str:
+    if buffer_size <= 0:
+        # readinto() would read nothing, and every file would get the checksum of an empty file
+        raise ValueError('buffer_size must be positive')
+    h = hashlib.new(algorithm)
+    # Allocating (and zeroing) 8 MiB per file would cost more than hashing a small file; reuse this thread's buffer
+    if getattr(_buffers, 'size', None) != buffer_size:
+        _buffers.buf = bytearray(buffer_size)
+        _buffers.view = memoryview(_buffers.buf)
+        _buffers.size = buffer_size
+    buf, view = _buffers.buf, _buffers.view
+    with open(fn, 'rb', buffering=0) as f:
+        while n := f.readinto(buf):
+            h.update(view[:n])
+    return h.hexdigest()
+
+
+#######################
+# Checksum cache
+def default_cache_fn(staging: str) -> str:
+    key = hashlib.sha1(os.path.realpath(staging).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(DEFAULT_CACHE_DIR, f'manifest-{key}.sqlite')
+
+
+def open_cache(fn: str) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(os.path.abspath(fn)), exist_ok=True)
+    db = sqlite3.connect(fn)
+    db.execute(
+        'CREATE TABLE IF NOT EXISTS checksums ('
+        'path TEXT, algorithm TEXT, size INTEGER, mtime_ns INTEGER, checksum TEXT, PRIMARY KEY (path, algorithm))'
+    )
+    return db
+
+
+def cached_checksum(db: sqlite3.Connection, path: str, algorithm: str, size: int, mtime_ns: int) -> str:
+    row = db.execute(
+        'SELECT checksum FROM checksums WHERE path = ? AND algorithm = ? AND size = ? AND mtime_ns = ?',
+        (path, algorithm, size, mtime_ns)
+    ).fetchone()
+    return row[0] if row else None
+
+
+#######################
+def build_manifest(staging: str, output_fn: str, db: sqlite3.Connection, algorithm: str = 'md5', workers: int = 8,
+                   buffer_size: int = 8 * 1024 * 1024, include_hidden: bool = False) -> dict:
+    """Hash everything that changed, write the manifest, and return stats"""
+    hashlib.new(algorithm)  # Fail fast on a typo, before walking 50 TB
+    tmp_fn = output_fn + '.tmp'
+    # Never describe the manifest itself (or its partial copy from this run)
+    exclude = {os.path.relpath(output_fn, staging), os.path.relpath(tmp_fn, staging)}
+    stats = {'files': 0, 'bytes': 0, 'hashed_files': 0, 'hashed_bytes': 0}
+    start = time.monotonic()
+
+    def make_entry(rel, size, checksum):
+        return {'path': rel, 'size': size, 'checksum': checksum, 'checksum_algorithm': algorithm}
+
+    def hash_entry(rel, size):
+        return make_entry(rel, size, hash_file(os.path.join(staging, rel), algorithm, buffer_size))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool, open(tmp_fn, 'w') as out:
+        # Results are written in walk order, keeping a bounded window of hashes in flight. Memory use doesn't depend on
+        #   the number of files, and the manifest is byte-for-byte identical between runs if nothing changed.
+        window = deque()
+        first = True
+
+        def emit(entry, mtime_ns, hashed):
+            nonlocal first
+            out.write(('[\n' if first else ',\n') + json.dumps(entry))
+            first = False
+            stats['files'] += 1
+            stats['bytes'] += entry['size']
+            if hashed:
+                stats['hashed_files'] += 1
+                stats['hashed_bytes'] += entry['size']
+                db.execute(
+                    'INSERT OR REPLACE INTO checksums VALUES (?, ?, ?, ?, ?)',
+                    (entry['path'], algorithm, entry['size'], mtime_ns, entry['checksum'])
+                )
+
+        def drain_one():
+            item, mtime_ns, hashed = window.popleft()
+            emit(item.result() if hashed else item, mtime_ns, hashed)
+
+        for rel, size, mtime_ns in walk_files(staging, include_hidden=include_hidden, exclude=exclude):
+            checksum = cached_checksum(db, rel, algorithm, size, mtime_ns)
+            if checksum is not None:
+                window.append((make_entry(rel, size, checksum), mtime_ns, False))
+            else:
+                window.append((pool.submit(hash_entry, rel, size), mtime_ns, True))
+            while len(window) > workers * 4:
+                drain_one()
+            if stats['files'] and stats['files'] % 10000 == 0:
+                db.commit()
+        while window:
+            drain_one()
+
+        out.write('[]\n' if first else '\n]\n')
+    db.commit()
+    os.replace(tmp_fn, output_fn)
+
+    stats['elapsed_sec'] = time.monotonic() - start
+    return stats
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    if args.v:
+        logging.basicConfig(level=logging.INFO)
+
+    staging = os.path.abspath(args.staging)
+    output_fn = args.output or os.path.join(staging, MANIFEST_FN)
+    cache_fn = args.cache or default_cache_fn(staging)
+    logger.info(f'Using checksum cache {cache_fn}')
+
+    db = open_cache(cache_fn)
+    try:
+        stats = build_manifest(
+            staging,
+            output_fn,
+            db,
+            algorithm=args.algorithm,
+            workers=args.workers,
+            buffer_size=args.buffer_mb * 1024 * 1024,
+            include_hidden=args.include_hidden,
+        )
+    finally:
+        db.close()
+
+    gib = stats['hashed_bytes'] / 2 ** 30
+    rate = gib / stats['elapsed_sec'] if stats['elapsed_sec'] else 0
+    print(f"Wrote {stats['files']} entries to {output_fn}")
+    print(f"Hashed {stats['hashed_files']} changed files ({gib:.2f} GiB, {rate:.2f} GiB/s); "
+          f"{stats['files'] - stats['hashed_files']} unchanged files came from the cache")
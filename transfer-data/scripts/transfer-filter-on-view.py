@@ -15,32 +15,19 @@ This script is called via CLI.
 """
 import argparse
 import logging
-import time
+import os
+import sys
+import typing as t
 
-from globus_sdk import (
-    UserApp,
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from apecx_common import scheduler, tracing  # noqa: E402
+from apecx_common.args import parse_optional_target, str_ne  # noqa: E402
 
-    TransferClient,
-    TransferData,
-)
+if t.TYPE_CHECKING:
+    from globus_sdk import TransferClient
 
 logger = logging.getLogger(__name__)
 
-def str_ne(value):
-    """Validator rejects empty strings"""
-    if not value:
-        raise ValueError("Must not be an empty string")
-    return value
-
-
-def parse_target(location: str):
-    """Allow CLI-friendly `source[:path]` syntax for copies, where path is optional"""
-    loc = location.split(':')
-    coll = loc[0]
-    path = loc[1] if len(loc) > 1 else '/'
-    return coll, path
-
-
 def parse_args():
     parser = argparse.ArgumentParser()
     parser.add_argument(
@@ -49,12 +36,15 @@ def parse_args():
         help='The Globus oauth native/thick client ID to use for user credential requests'
     )
     parser.add_argument('source', help='Source UUID[:path]')
+    parser.add_argument('--trace', help=tracing.TRACE_HELP)
     return parser.parse_args()
 
 
-def create_client(client_id: str, s_coll: str) -> TransferClient:
+def create_client(client_id: str, s_coll: str) -> 'TransferClient':
+    from globus_sdk import TransferClient, UserApp
+
     app = UserApp(client_id=client_id)
-    client = TransferClient(app=app)
+    client = scheduler.install(TransferClient(app=app))
     # TODO: This is quite the footnote: https://globus-sdk-python.readthedocs.io/en/stable/services/transfer.html#globus_sdk.TransferClient.add_app_data_access_scope
     #   What do we do for HA / guest collections? (delve into the abyss)
     # For now will only accept a mapped collection- we can either check type in script or, better, implement access alternative here
@@ -64,7 +54,8 @@ def create_client(client_id: str, s_coll: str) -> TransferClient:
 
 if __name__ == "__main__":
     args = parse_args()
-    s_coll, s_path = parse_target(args.source)
+    tracing.enable(args.trace)
+    s_coll, s_path = parse_optional_target(args.source)
 
     client = create_client(args.client_id, s_coll)
 
@@ -13,14 +13,10 @@ This script is called via CLI
 """
 import argparse
 import logging
+import os
+import sys
 import time
-
-from globus_sdk import (
-    UserApp,
-
-    TransferClient,
-    TransferData,
-)
+import typing as t
 
 # This demo intended to be run from within the scripts folder to avoid import issues
 from common import (
@@ -30,10 +26,17 @@ from common import (
     str_ne,
 )
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from apecx_common import aio, scheduler, tracing  # noqa: E402
+
+if t.TYPE_CHECKING:
+    # The SDK is slow to import: load it only once the arguments are parsed, so that `--help` answers immediately
+    from globus_sdk import TransferClient, TransferData
+
 logger = logging.getLogger(__name__)
 
 
-def add_transfer_scopes(client: TransferClient, coll_id: str) -> TransferClient:
+def add_transfer_scopes(client: 'TransferClient', coll_id: str) -> 'TransferClient':
     """
     If (and only if) something is a non-HA GCSv5 mapped collection, special extra login scopes are required.
     https://globus-sdk-python.readthedocs.io/en/stable/services/transfer.html#globus_sdk.TransferClient.add_app_data_access_scope
@@ -56,22 +59,31 @@ def parse_args():
     parser.add_argument('source', help='Source UUID:path', type=parse_target)
     parser.add_argument('dest', help='Destination UUID:path', type=parse_target)
     parser.add_argument('-v', help='Verbose output', action='store_true')
+    parser.add_argument('--trace', help=tracing.TRACE_HELP)
     return parser.parse_args()
 
 
-def create_client(client_id: str, s_coll: str, d_coll: str) -> TransferClient:
+def create_client(client_id: str, s_coll: str, d_coll: str) -> 'TransferClient':
+    from globus_sdk import TransferClient, UserApp
+
     app = UserApp(client_id=client_id)
-    client = TransferClient(app=app)
+    client = aio.share_connections(TransferClient(app=app))
 
-    if requires_data_access_scope(client, s_coll):
+    # The two lookups are independent, so make them at the same time (after a single login)
+    aio.ensure_login(app)
+    s_mapped, d_mapped = aio.run_concurrently(
+        lambda: requires_data_access_scope(client, s_coll),
+        lambda: requires_data_access_scope(client, d_coll),
+    )
+    if s_mapped:
         add_transfer_scopes(client, s_coll)
 
-    if requires_data_access_scope(client, d_coll):
+    if d_mapped:
         add_transfer_scopes(client, d_coll)
     return client
 
 
-def add_demo_filters(options: TransferData) -> TransferData:
+def add_demo_filters(options: 'TransferData') -> 'TransferData':
     """
     Add some upload filters that are only relevant to this demo. Separated out for clarity.
 
@@ -90,16 +102,27 @@ def add_demo_filters(options: TransferData) -> TransferData:
     return options
 
 
-def report_result(client: TransferClient, task_id, delay_sec=15, max_sec=3600) -> str:
+def report_result(client: 'TransferClient', task_id, delay_sec=15, max_sec=3600) -> str:
     """Poll server every n seconds until transfer status resolves, up max interval.
         This is a very short demo, so we picked short times; in the real world, prefer much slower polling, or
          use something like a Globus flow that handles the details internally
 
     See status list: https://docs.globus.org/api/transfer/task/
     """
+    from globus_sdk import GlobusAPIError
+
     elapsed = 0
     while True and elapsed < max_sec:
-        resp = client.get_task(task_id)
+        try:
+            resp = client.get_task(task_id)
+        except GlobusAPIError as e:
+            if e.http_status not in scheduler.THROTTLE_STATUSES:
+                raise e
+            # Still throttled after the scheduler's retries: the task is unaffected, so just check again later
+            logger.warning(f'Transfer is busy ({e.http_status}); will check task {task_id} again in {delay_sec}s')
+            elapsed += delay_sec
+            time.sleep(delay_sec)
+            continue
 
         s = resp.data['status']
         if s == 'INACTIVE':
@@ -123,6 +146,7 @@ if __name__ == "__main__":
     if args.v:
         # Verbose mode: make sure to output logs to console
         logging.basicConfig(level=logging.DEBUG)
+    tracing.enable(args.trace)
 
     s_coll, s_path = args.source
     d_coll, d_path = args.dest
@@ -138,5 +162,9 @@ if __name__ == "__main__":
 
     # For the demo script, we check result by long polling. But in the real world, no need!
     #   You'll get emailed a status report when the task is completed.
-    polled_result = report_result(client, task_id)
+    with tracing.span('report_result', task_id=task_id) as span:
+        polled_result = report_result(client, task_id)
+        span.set(task_status=polled_result)
     print(f"Transfer task '{task_id}' complete! Final task status is: ", polled_result)
+    if args.v:
+        print(scheduler.format_stats())